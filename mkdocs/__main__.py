@@ -10,6 +10,7 @@ from mkdocs import __version__
 from mkdocs import utils
 from mkdocs import exceptions
 from mkdocs import config
+from mkdocs import timing
 from mkdocs.commands import build, gh_deploy, new, serve, add
 
 log = logging.getLogger(__name__)
@@ -89,6 +90,12 @@ remote_name_help = ("The remote name to commit to for Github Pages. This "
 force_help = "Force the push to the repository."
 create_directory_help = "Create directory if not exist before creating file in it. Default is True"
 template_directory_help = "The directory to read template file. Relative path"
+jobs_help = ("The number of worker processes used to build the pages "
+             "(default: 1).")
+profile_help = ("Write the time spent in each stage of the build and on "
+                "each page to this JSON file.")
+search_report_help = ("Report the size of the search index and the pages and "
+                      "sections with the most text.")
 
 
 @click.group(context_settings={'help_option_names': ['-h', '--help']})
@@ -109,8 +116,10 @@ def cli():
 @click.option('--livereload', 'livereload', flag_value='livereload', help=reload_help, default=True)
 @click.option('--no-livereload', 'livereload', flag_value='no-livereload', help=no_reload_help)
 @click.option('--dirtyreload', 'livereload', flag_value='dirty', help=dirty_reload_help)
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help=jobs_help)
+@click.option('--profile', type=click.Path(), help=profile_help)
 @common_options
-def serve_command(dev_addr, config_file, strict, theme, theme_dir, livereload):
+def serve_command(dev_addr, config_file, strict, theme, theme_dir, livereload, jobs, profile):
     """Run the builtin development server"""
 
     logging.getLogger('tornado').setLevel(logging.WARNING)
@@ -126,7 +135,9 @@ def serve_command(dev_addr, config_file, strict, theme, theme_dir, livereload):
             strict=strict,
             theme=theme,
             theme_dir=theme_dir,
-            livereload=livereload
+            livereload=livereload,
+            jobs=jobs,
+            profile=profile
         )
     except (exceptions.ConfigurationError, socket.error) as e:  # pragma: no cover
         # Avoid ugly, unhelpful traceback
@@ -140,26 +151,38 @@ def serve_command(dev_addr, config_file, strict, theme, theme_dir, livereload):
 @click.option('-t', '--theme', type=click.Choice(theme_choices), help=theme_help)
 @click.option('-e', '--theme-dir', type=click.Path(), help=theme_dir_help)
 @click.option('-d', '--site-dir', type=click.Path(), help=site_dir_help)
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help=jobs_help)
+@click.option('--profile', type=click.Path(), help=profile_help)
+@click.option('--search-report', is_flag=True, help=search_report_help)
 @common_options
-def build_command(clean, config_file, strict, theme, theme_dir, site_dir):
+def build_command(clean, config_file, strict, theme, theme_dir, site_dir, jobs, profile,
+                  search_report):
     """Build the MkDocs documentation"""
 
     # Don't override config value if user did not specify --strict flag
     # Conveniently, load_config drops None values
     strict = strict or None
 
+    timer = timing.BuildTimer() if profile else None
+
     try:
-        build.build(config.load_config(
-            config_file=config_file,
-            strict=strict,
-            theme=theme,
-            theme_dir=theme_dir,
-            site_dir=site_dir
-        ), dirty=not clean)
+        with timing.timed(timer and timer.stages, 'config'):
+            cfg = config.load_config(
+                config_file=config_file,
+                strict=strict,
+                theme=theme,
+                theme_dir=theme_dir,
+                site_dir=site_dir
+            )
+        build.build(cfg, dirty=not clean, jobs=jobs, timer=timer,
+                    search_report=search_report)
     except exceptions.ConfigurationError as e:  # pragma: no cover
         # Avoid ugly, unhelpful traceback
         raise SystemExit('\n' + str(e))
 
+    if timer is not None:
+        timer.write(profile)
+
 
 @cli.command(name="json")
 @click.option('-c', '--clean/--dirty', is_flag=True, default=True, help=clean_help)
@@ -202,8 +225,9 @@ def json_command(clean, config_file, strict, site_dir):
 @click.option('-b', '--remote-branch', help=remote_branch_help)
 @click.option('-r', '--remote-name', help=remote_name_help)
 @click.option('--force', is_flag=True, help=force_help)
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help=jobs_help)
 @common_options
-def gh_deploy_command(config_file, clean, message, remote_branch, remote_name, force):
+def gh_deploy_command(config_file, clean, message, remote_branch, remote_name, force, jobs):
     """Deploy your documentation to GitHub Pages"""
     try:
         cfg = config.load_config(
@@ -211,7 +235,7 @@ def gh_deploy_command(config_file, clean, message, remote_branch, remote_name, f
             remote_branch=remote_branch,
             remote_name=remote_name
         )
-        build.build(cfg, dirty=not clean)
+        build.build(cfg, dirty=not clean, jobs=jobs)
         gh_deploy.gh_deploy(cfg, message=message, force=force)
     except exceptions.ConfigurationError as e:  # pragma: no cover
         # Avoid ugly, unhelpful traceback
@@ -2,8 +2,8 @@ require([
     base_url + '/mkdocs/js/mustache.min.js',
     base_url + '/mkdocs/js/lunr.min.js',
     'text!search-results-template.mustache',
-    'text!../search_index.json',
-], function (Mustache, lunr, results_template, data) {
+    'text!../search/manifest.json',
+], function (Mustache, lunr, results_template, manifest) {
    "use strict";
 
     function getSearchTerm()
@@ -20,25 +20,205 @@ require([
         }
     }
 
-    var index = lunr(function () {
-        this.field('title', {boost: 10});
-        this.field('text');
-        this.ref('location');
-    });
+    function loadJSON(path, callback){
+        require(['text!../search/' + path], function (data) {
+            callback(JSON.parse(data));
+        });
+    }
+
+    /*
+     * The first 200 characters of the text of a document. In a compact index
+     * the document of a page is followed by those of its sections, whose
+     * text it doesn't repeat.
+     */
+    function summarize(docs, i){
+        var doc = docs[i];
+        var text = doc.text;
+        for (var j = i + 1; j <= i + (doc.sections || 0) && text.length < 200; j++){
+            text += (text ? '\n' : '') + docs[j].title + '\n' + docs[j].text;
+        }
+        return text.substring(0, 200);
+    }
+
+    /*
+     * Search the whole index, which is loaded up front.
+     */
+    function IndexSearch(path){
+        var self = this;
+        this.queue = [];
+
+        loadJSON(path, function (data) {
+            var index;
+            var documents = {};
 
-    data = JSON.parse(data);
-    var documents = {};
+            if (data.index){
+                // The index is prebuilt by MkDocs.
+                index = lunr.Index.load(data.index);
+            } else {
+                index = lunr(function () {
+                    this.field('title', {boost: 10});
+                    this.field('text');
+                    this.ref('location');
+                });
+            }
+
+            for (var i=0; i < data.docs.length; i++){
+                var doc = data.docs[i];
+                if (!data.index){
+                    index.add(doc);
+                }
+                documents[doc.location] = doc;
+                doc.summary = summarize(data.docs, i);
+            }
 
-    for (var i=0; i < data.docs.length; i++){
-        var doc = data.docs[i];
-        doc.location = base_url + doc.location;
-        index.add(doc);
-        documents[doc.location] = doc;
+            self.search = function (query, callback) {
+                callback(index.search(query).map(function (result) {
+                    return documents[result.ref];
+                }));
+            };
+            self.queue.forEach(function (args) {
+                self.search.apply(self, args);
+            });
+            self.queue = null;
+        });
     }
 
-    var search = function(){
+    IndexSearch.prototype.search = function (query, callback) {
+        // Wait for the index to load.
+        this.queue.push([query, callback]);
+    };
+
+    /*
+     * Search an index in shards by the first character of each term, which
+     * are only fetched when a query needs them. The results are scored like
+     * lunr.js does, but only by the terms of the query.
+     */
+    function ShardedSearch(manifest){
+        this.manifest = manifest;
+        this.pipeline = lunr.Pipeline.load(manifest.pipeline);
+        this.shards = {};
+        this.chunks = {};
+    }
+
+    ShardedSearch.prototype.load = function (cache, paths, callback) {
+        var pending = paths.filter(function (path, i) {
+            return !(path in cache) && paths.indexOf(path) == i;
+        });
+        var count = pending.length;
+        if (!count){
+            return callback();
+        }
+        pending.forEach(function (path) {
+            loadJSON(path, function (data) {
+                cache[path] = data;
+                count--;
+                if (!count){
+                    callback();
+                }
+            });
+        });
+    };
+
+    /*
+     * The first character of a term, which names its shard. A character
+     * outside the Basic Multilingual Plane is kept whole, as in the shards
+     * MkDocs writes, rather than only its first UTF-16 code unit.
+     */
+    function shardKey(term){
+        var code = term.charCodeAt(0);
+        if (code >= 0xD800 && code <= 0xDBFF && term.length > 1){
+            return term.slice(0, 2);
+        }
+        return term.charAt(0);
+    }
+
+    ShardedSearch.prototype.search = function (query, callback) {
+        var self = this;
+        var terms = this.pipeline.run(lunr.tokenizer(query));
+        var shards = this.manifest.shards;
+        if (!terms.length || terms.some(function (term) {
+            return shards.indexOf(shardKey(term)) == -1;
+        })){
+            return callback([]);
+        }
+
+        var paths = terms.map(function (term) {
+            return 'terms-' + shardKey(term) + '.json';
+        });
+        this.load(this.shards, paths, function () {
+            self.score(terms, paths, callback);
+        });
+    };
+
+    ShardedSearch.prototype.score = function (terms, paths, callback) {
+        var self = this;
+        var count = this.manifest.docs.count;
+        var scores = {};
+        var matches = null;
+
+        terms.forEach(function (term, i) {
+            var shard = self.shards[paths[i]];
+            var found = {};
+            Object.keys(shard).forEach(function (token) {
+                if (token.lastIndexOf(term, 0) !== 0){
+                    return;
+                }
+                var postings = shard[token];
+                var idf = 1 + Math.log(count / postings.length);
+                // Longer terms which start with the query term count less.
+                var similarity = 1;
+                if (token !== term){
+                    similarity = 1 / Math.log(Math.max(3, token.length - term.length));
+                }
+                for (var j = 0; j < postings.length; j++){
+                    var doc = postings[j][0];
+                    found[doc] = true;
+                    scores[doc] = (scores[doc] || 0) + postings[j][1] * idf * similarity;
+                }
+            });
+            // Like lunr.js, documents must match all terms of the query.
+            if (matches === null){
+                matches = found;
+            } else {
+                Object.keys(matches).forEach(function (doc) {
+                    if (!found[doc]){
+                        delete matches[doc];
+                    }
+                });
+            }
+        });
+
+        var results = Object.keys(matches).map(Number).sort(function (a, b) {
+            return scores[b] - scores[a];
+        });
+        var size = this.manifest.docs.chunk_size;
+        var chunks = results.map(function (doc) {
+            return 'docs-' + Math.floor(doc / size) + '.json';
+        });
+        this.load(this.chunks, chunks, function () {
+            callback(results.map(function (doc, i) {
+                return self.chunks[chunks[i]][doc % size];
+            }));
+        });
+    };
+
+    manifest = JSON.parse(manifest);
+    var index;
+    if (manifest.shards){
+        index = new ShardedSearch(manifest);
+    } else {
+        index = new IndexSearch(manifest.index);
+    }
+
+    var search_input = document.getElementById('mkdocs-search-query');
+    var latest_query = null;
+
+    var display = function(query, results){
+        // Results of a previous query may arrive late.
+        if (query !== latest_query){
+            return;
+        }
 
-        var query = document.getElementById('mkdocs-search-query').value;
         var search_results = document.getElementById("mkdocs-search-results");
         while (search_results.firstChild) {
             search_results.removeChild(search_results.firstChild);
@@ -48,15 +228,15 @@ require([
             return;
         }
 
-        var results = index.search(query);
-
         if (results.length > 0){
             for (var i=0; i < results.length; i++){
-                var result = results[i];
-                doc = documents[result.ref];
-                doc.base_url = base_url;
-                doc.summary = doc.text.substring(0, 200);
-                var html = Mustache.to_html(results_template, doc);
+                var doc = results[i];
+                var html = Mustache.to_html(results_template, {
+                    base_url: base_url,
+                    location: base_url + doc.location,
+                    title: doc.title,
+                    summary: doc.summary
+                });
                 search_results.insertAdjacentHTML('beforeend', html);
             }
         } else {
@@ -72,10 +252,21 @@ require([
                 jQuery('#mkdocs_search_modal').modal('hide');
             });
         }
-
     };
 
-    var search_input = document.getElementById('mkdocs-search-query');
+    var search = function(){
+
+        var query = search_input.value;
+        latest_query = query;
+
+        if(query === ''){
+            return display(query, []);
+        }
+
+        index.search(query, function (results) {
+            display(query, results);
+        });
+    };
 
     var term = getSearchTerm();
     if (term){
@@ -0,0 +1,509 @@
+# coding: utf-8
+
+"""
+Deals with the state kept between builds.
+
+Pages are only built again by a dirty build when one of their inputs has
+changed since the previous build. For each page the build state records a hash
+of its source file, the config, the templates used to render it and the site
+navigation.
+
+When a `cache_dir` is configured, the result of converting the Markdown of each
+page is also kept there, so it can be reused by any later build with the same
+source and Markdown configuration.
+
+The compiled theme templates are kept in the `cache_dir` too, or else in a
+temporary directory of the user.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import logging
+import marshal
+import os
+import sys
+import tempfile
+import types
+
+import jinja2.loaders
+import jinja2.meta
+import markdown
+
+import mkdocs
+from mkdocs import toc, utils
+
+log = logging.getLogger(__name__)
+
+
+def _json_default(obj):
+    # Sub configs are a `UserDict`, anything else is only included by name.
+    if isinstance(obj, utils.UserDict):
+        return obj.data
+    return utils.text_type(obj)
+
+
+def content_hash(content):
+    """
+    Return a hash of the given text or bytes.
+    """
+    if isinstance(content, utils.text_type):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def file_hash(path):
+    """
+    Return a hash of the content of a file, or None if it doesn't exist.
+    """
+    try:
+        with io.open(path, 'rb') as f:
+            return content_hash(f.read())
+    except IOError:
+        return None
+
+
+def data_hash(data):
+    """
+    Return a hash of JSON serializable data, such as the config.
+    """
+    return content_hash(json.dumps(data, sort_keys=True, default=_json_default))
+
+
+def _write_atomic(path, content):
+    """
+    Write the bytes to a file through a temporary file, so other build
+    processes never read an incomplete file. Errors are ignored, as the file
+    is only a cache.
+    """
+    output_dir = os.path.dirname(path)
+    try:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    except OSError:
+        # Another process may have created the directory in the meantime.
+        if not os.path.isdir(output_dir):
+            return
+        fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # On Windows, the file may exist already if another process wrote it
+        # first.
+        os.remove(temp_path)
+
+
+# The settings which don't change the output of the pages, so building the
+# same site into another directory doesn't build all pages again.
+_UNHASHED_SETTINGS = ('site_dir', 'cache_dir')
+
+
+def config_fingerprint(config):
+    """
+    Return a hash of the config and of the versions of MkDocs and Markdown,
+    which all change the output of every page.
+    """
+    settings = dict((key, value) for key, value in config.items()
+                    if key not in _UNHASHED_SETTINGS)
+    versions = [mkdocs.__version__, getattr(markdown, 'version', None)]
+    return data_hash([settings, versions])
+
+
+def nav_fingerprint(site_navigation):
+    """
+    Return a hash of the structure, titles and URLs of the site navigation.
+    """
+    # Rather than `str()`, which fails on Python 2 for titles which aren't
+    # ASCII, use the unicode text of the items.
+    return content_hash(''.join(item.indent_print() for item in site_navigation))
+
+
+class TemplateFingerprints(object):
+    """
+    Hashes of the templates in a Jinja2 environment, including all of the
+    templates they extend, include or import.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self._sources = {}
+        self._fingerprints = {}
+
+    def _source(self, name):
+        """
+        Return the hash of a template and the names it references. A name of
+        None means a template name is only known when rendering.
+        """
+        if name not in self._sources:
+            try:
+                source = self.env.loader.get_source(self.env, name)[0]
+            except jinja2.TemplateNotFound:
+                self._sources[name] = (None, [])
+            else:
+                refs = jinja2.meta.find_referenced_templates(self.env.parse(source))
+                self._sources[name] = (content_hash(source), list(refs))
+        return self._sources[name]
+
+    def _all_templates(self):
+        return sorted(name for name in self.env.loader.list_templates()
+                      if utils.is_template_file(name))
+
+    def fingerprint(self, name):
+        """
+        Return a hash of the template `name` and all the templates it uses.
+        """
+        if name in self._fingerprints:
+            return self._fingerprints[name]
+
+        seen = {}
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            if current is None:
+                # The templates used can't be determined, depend on all of them.
+                pending.extend(self._all_templates())
+                seen[current] = None
+                continue
+            seen[current], refs = self._source(current)
+            pending.extend(refs)
+
+        seen.pop(None, None)
+        self._fingerprints[name] = data_hash(sorted(seen.items()))
+        return self._fingerprints[name]
+
+
+class BuildState(object):
+    """
+    The inputs of every page from the previous build, stored in the site_dir.
+
+    The anchors of every page and its links to the anchors of other pages are
+    stored too, so a dirty build can check the links of all pages, see
+    `relative_path_ext.AnchorIndex`.
+    """
+
+    filename = '.mkdocs_build_state.json'
+    version = 3
+
+    def __init__(self, site_dir, pages=None, anchors=None):
+        self.path = os.path.join(site_dir, self.filename)
+        self.pages = pages or {}
+        self.anchors = anchors or {}
+
+    @classmethod
+    def load(cls, site_dir):
+        """
+        Load the state of the previous build. If there is no state, or it
+        can't be read, an empty state is returned so all pages are built.
+        """
+        state = cls(site_dir)
+        try:
+            with io.open(state.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return state
+
+        if data.get('version') == cls.version:
+            state.pages = data['pages']
+            state.anchors = data['anchors']
+        return state
+
+    def is_current(self, input_path, inputs):
+        """
+        Return True if the page was built with the same inputs as given.
+        """
+        return self.pages.get(input_path) == inputs
+
+    def update(self, input_path, inputs):
+        self.pages[input_path] = inputs
+
+    def get_anchors(self, input_path):
+        """
+        Return the anchors of the page and its links to anchors as a tuple,
+        or None if they weren't recorded.
+        """
+        data = self.anchors.get(input_path)
+        if data is None:
+            return None
+        return data['anchors'], data['links']
+
+    def update_anchors(self, input_path, anchors, links):
+        self.anchors[input_path] = {
+            'anchors': sorted(anchors),
+            'links': [list(link) for link in links],
+        }
+
+    def prune(self, input_paths):
+        """
+        Forget all pages except the given ones, which are in the site now.
+        """
+        input_paths = set(input_paths)
+        for path in list(self.pages):
+            if path not in input_paths:
+                del self.pages[path]
+        for path in list(self.anchors):
+            if path not in input_paths:
+                del self.anchors[path]
+
+    def save(self):
+        data = {'version': self.version, 'pages': self.pages, 'anchors': self.anchors}
+        output = json.dumps(data, sort_keys=True)
+        utils.write_file(output.encode('utf-8'), self.path, skip_unchanged=True)
+
+
+def search_entry_dir(config):
+    """
+    Return the directory to keep the search index entries of the pages of the
+    site in, see `SearchEntryStore`. This is a directory in the `cache_dir`
+    if set, or else in the temporary directory, for the `site_dir`.
+    """
+    if config['cache_dir'] is None:
+        base_dir = os.path.join(tempfile.gettempdir(), 'mkdocs_search_entries')
+    else:
+        base_dir = os.path.join(config['cache_dir'], 'search_entries')
+    return os.path.join(base_dir, content_hash(os.path.abspath(config['site_dir'])))
+
+
+class SearchEntryStore(object):
+    """
+    The search index entries of every page, stored in a directory outside of
+    the site, see `search_entry_dir`, so a dirty build can write the complete
+    search index without building the pages which are unchanged.
+
+    The entries of a page are kept by its input path together with a hash of
+    the inputs of the page which the build state records, so they are only
+    used for the same inputs.
+    """
+
+    version = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _filename(self, input_path, inputs):
+        return '{0}-{1}.json'.format(
+            content_hash(input_path), data_hash([self.version, inputs]))
+
+    def has(self, input_path, inputs):
+        return os.path.isfile(os.path.join(
+            self.directory, self._filename(input_path, inputs)))
+
+    def get(self, input_path, inputs):
+        """
+        Return the entries of the page if they were stored for the same
+        inputs, or else None.
+        """
+        path = os.path.join(self.directory, self._filename(input_path, inputs))
+        try:
+            with io.open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def set(self, input_path, inputs, entries):
+        path = os.path.join(self.directory, self._filename(input_path, inputs))
+        if not os.path.isfile(path):
+            output = json.dumps(entries, sort_keys=True)
+            _write_atomic(path, output.encode('utf-8'))
+
+    def prune(self, pages):
+        """
+        Remove the entries of all pages except the given tuples of an input
+        path and inputs, which are in the site now.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        keep = set(self._filename(input_path, inputs) for input_path, inputs in pages)
+        for filename in os.listdir(self.directory):
+            if filename not in keep:
+                os.remove(os.path.join(self.directory, filename))
+
+
+def _toc_to_data(items):
+    data = []
+    for item in items:
+        link = {'title': item.title, 'url': item.url,
+                'children': _toc_to_data(item.children)}
+        if getattr(item, 'active', False):
+            link['active'] = True
+        data.append(link)
+    return data
+
+
+def _toc_from_data(data):
+    items = []
+    for link in data:
+        item = toc.AnchorLink(link['title'], link['url'])
+        item.children = _toc_from_data(link['children'])
+        if link.get('active'):
+            item.active = True
+        items.append(item)
+    return items
+
+
+class MarkdownCache(object):
+    """
+    An on-disk cache of converted Markdown.
+
+    Each entry holds the HTML, the link URLs which are resolved per page, the
+    table of contents and the meta-data of a page. Entries are keyed by the
+    Markdown source together with the Markdown extensions, their configs and
+    the versions of MkDocs and Markdown.
+    """
+
+    version = 1
+
+    def __init__(self, cache_dir, config):
+        self.cache_dir = os.path.join(cache_dir, 'markdown')
+        self.fingerprint = data_hash([
+            self.version,
+            config['markdown_extensions'],
+            config['mdx_configs'],
+            mkdocs.__version__,
+            getattr(markdown, 'version', None),
+        ])
+
+    def _path(self, markdown_source):
+        key = content_hash(self.fingerprint + '\0' + markdown_source)
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, markdown_source):
+        """
+        Return a tuple of the HTML, the links, the table of contents and the
+        meta-data for the Markdown source, or None if it isn't cached.
+        """
+        try:
+            with io.open(self._path(markdown_source), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        table_of_contents = toc.TableOfContents('', items=_toc_from_data(data['toc']))
+        return data['html'], data['links'], table_of_contents, data['meta']
+
+    def set(self, markdown_source, html, links, table_of_contents, meta):
+        data = {
+            'html': html,
+            'links': links,
+            'toc': _toc_to_data(table_of_contents),
+            'meta': meta,
+        }
+        output = json.dumps(data, sort_keys=True).encode('utf-8')
+        _write_atomic(self._path(markdown_source), output)
+
+
+def template_cache_dir(config):
+    """
+    Return the directory to keep compiled templates in. This is a directory in
+    the `cache_dir` if set, or else the temporary directory Jinja2 uses for its
+    bytecode cache by default. Return None if it can't be used.
+    """
+    if config['cache_dir'] is None:
+        try:
+            return jinja2.FileSystemBytecodeCache().directory
+        except RuntimeError as e:
+            log.debug("Not caching compiled templates: %s", e)
+            return None
+
+    directory = os.path.join(config['cache_dir'], 'jinja')
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if not os.path.isdir(directory):
+                log.debug("Not caching compiled templates: %s", e)
+                return None
+    return directory
+
+
+class TemplateLoader(jinja2.FileSystemLoader):
+    """
+    Loads templates from the search path like a `FileSystemLoader`, but the
+    templates shipped with MkDocs are loaded from precompiled modules in the
+    `cache_dir`. They are compiled the first time each template is used.
+
+    A precompiled template is found by the modification time and size of its
+    file, so unlike the Jinja2 bytecode cache the source isn't read at all.
+    Templates of other themes may change at any time, so they are loaded by
+    the `FileSystemLoader` and only use the bytecode cache.
+
+    The navigation templates of the builtin themes render each item only once
+    with `nav_fragments`, a `nav.NavFragments` instance, if given.
+    """
+
+    version = 1
+
+    builtin_dir = os.path.dirname(os.path.abspath(mkdocs.__file__))
+
+    def __init__(self, searchpath, cache_dir=None, nav_fragments=None):
+        super(TemplateLoader, self).__init__(searchpath)
+        self.cache_dir = cache_dir
+        self.nav_fragments = nav_fragments
+
+    def _find_builtin(self, template):
+        """
+        Return the filename of the template if it is shipped with MkDocs.
+        """
+        pieces = jinja2.loaders.split_template_path(template)
+        for searchpath in self.searchpath:
+            filename = os.path.join(searchpath, *pieces)
+            if os.path.isfile(filename):
+                if os.path.abspath(filename).startswith(self.builtin_dir + os.sep):
+                    return filename
+                return None
+        return None
+
+    def load(self, environment, name, globals=None):
+        filename = self._find_builtin(name)
+        if filename is None or self.cache_dir is None:
+            template = super(TemplateLoader, self).load(environment, name, globals)
+        else:
+            template = self._load_precompiled(environment, name, filename, globals)
+
+        if filename is not None and self.nav_fragments is not None:
+            path = os.path.relpath(os.path.abspath(filename), self.builtin_dir)
+            self.nav_fragments.wrap(template, path)
+        return template
+
+    def _load_precompiled(self, environment, name, filename, globals):
+        stat = os.stat(filename)
+        key = data_hash([
+            self.version,
+            filename,
+            stat.st_mtime,
+            stat.st_size,
+            mkdocs.__version__,
+            jinja2.__version__,
+            # The format of compiled Python code differs between versions.
+            sys.version,
+        ])
+        path = os.path.join(self.cache_dir, 'mkdocs_{0}.cache'.format(key))
+
+        code = None
+        try:
+            # On Python 2, `marshal.load` only accepts builtin file objects.
+            with io.open(path, 'rb') as f:
+                code = marshal.loads(f.read())
+        except (IOError, EOFError, ValueError):
+            pass
+
+        if not isinstance(code, types.CodeType):
+            with io.open(filename, 'r', encoding=self.encoding) as f:
+                source = f.read()
+            code = environment.compile(source, name, filename)
+            _write_atomic(path, marshal.dumps(code))
+
+        def uptodate():
+            try:
+                return os.path.getmtime(filename) == stat.st_mtime
+            except OSError:
+                return False
+
+        return environment.template_class.from_code(
+            environment, code, globals or {}, uptodate)
@@ -5,14 +5,19 @@ from datetime import datetime
 from calendar import timegm
 import io
 import logging
+import multiprocessing
 import os
 
 from jinja2.exceptions import TemplateNotFound
+from jinja2.runtime import Context
 import jinja2
 import json
+import markdown
+from markdown.treeprocessors import Treeprocessor
 
-from mkdocs import nav, search, utils
+from mkdocs import cache, exceptions, nav, search, timing, toc, utils
 from mkdocs.utils import filters
+from mkdocs import relative_path_ext
 from mkdocs.relative_path_ext import RelativePathExtension
 import mkdocs
 
@@ -41,23 +46,123 @@ def get_complete_paths(config, page):
     return input_path, output_path
 
 
-def convert_markdown(markdown_source, config, site_navigation=None):
+class _TreeCapture(Treeprocessor):
+    """
+    Keeps the element tree once all other treeprocessors have run.
+    """
+
+    root = None
+
+    def run(self, root):
+        self.root = root
+
+
+class MarkdownConverter(object):
+    """
+    Converts the Markdown source of pages to HTML as per the config.
+
+    The Markdown instance and its extensions are only set up once and reset
+    between pages. The links are resolved against the site navigation of each
+    page after the conversion, so the converted Markdown can also be reused
+    from the `markdown_cache`.
+
+    After a page is converted, `tree` is the element tree of its HTML, if it
+    holds all of the content. It is None when the page was cached, or when
+    any raw HTML or extension postprocessor only changed the serialized HTML.
+    `links` are the local links of the page, as written in the Markdown.
+    """
+
+    # These postprocessors only restore placeholders in the HTML.
+    plain_postprocessors = frozenset(['raw_html', 'amp_substitute', 'unescape'])
+
+    def __init__(self, config, markdown_cache=None):
+        self.strict = config['strict']
+        self.markdown_cache = markdown_cache
+        self.relpath = RelativePathExtension(None, self.strict, deferred=True)
+        self.toc = toc.TableOfContentsExtension()
+        self.md = markdown.Markdown(
+            extensions=[self.relpath] + config['markdown_extensions'] + [self.toc],
+            extension_configs=config['mdx_configs'] or {}
+        )
+        self._tree_capture = _TreeCapture(self.md)
+        self.md.treeprocessors.add('mkdocs_tree', self._tree_capture, '_end')
+        self._plain = set(self.md.postprocessors.keys()) <= self.plain_postprocessors
+        self.tree = None
+        self.links = []
+        # Some extensions, such as abbr, add inline patterns while converting
+        # a page, which `reset()` doesn't remove.
+        self._inline_patterns = set(self.md.inlinePatterns.keys())
+
+    def reset(self):
+        self.md.reset()
+        for key in list(self.md.inlinePatterns.keys()):
+            if key not in self._inline_patterns:
+                del self.md.inlinePatterns[key]
+        # On completely blank markdown files, no Meta or toc properties are
+        # added to the generated document.
+        self.md.Meta = {}
+        self.md.toc = ''
+        self._tree_capture.root = None
+        self.tree = None
+
+    def _convert(self, markdown_source):
+        self.reset()
+        html_content = self.md.convert(markdown_source)
+        if self._plain and not self.md.htmlStash.rawHtmlBlocks:
+            self.tree = self._tree_capture.root
+        table_of_contents = self.toc.table_of_contents()
+        return html_content, list(self.relpath.links), table_of_contents, self.md.Meta
+
+    def convert(self, markdown_source, site_navigation=None):
+        """
+        Return a tuple of the HTML as a string, the parsed table of contents,
+        and a dictionary of any metadata that was specified in the Markdown
+        source.
+        """
+        cached = None
+        self.tree = None
+        self.links = []
+        if self.markdown_cache is not None:
+            cached = self.markdown_cache.get(markdown_source)
+
+        if cached is None:
+            html_content, links, table_of_contents, meta = self._convert(markdown_source)
+            if self.markdown_cache is not None:
+                self.markdown_cache.set(markdown_source, html_content, links,
+                                        table_of_contents, meta)
+        else:
+            html_content, links, table_of_contents, meta = cached
+
+        self.links = links
+        html_content = relative_path_ext.replace_link_placeholders(
+            html_content, links, site_navigation, self.strict)
+        return html_content, table_of_contents, meta
+
+
+def get_converter(config):
+    """
+    Return a `MarkdownConverter` for the config, which uses the cache of
+    converted Markdown if a `cache_dir` is set.
+    """
+    markdown_cache = None
+    if config['cache_dir'] is not None:
+        markdown_cache = cache.MarkdownCache(config['cache_dir'], config)
+    return MarkdownConverter(config, markdown_cache)
+
+
+def convert_markdown(markdown_source, config, site_navigation=None,
+                     converter=None):
     """
     Convert the Markdown source file to HTML as per the config and
     site_navigation. Return a tuple of the HTML as a string, the parsed table
     of contents, and a dictionary of any metadata that was specified in the
     Markdown file.
-    """
-
-    extensions = [
-        RelativePathExtension(site_navigation, config['strict'])
-    ] + config['markdown_extensions']
 
-    return utils.convert_markdown(
-        markdown_source=markdown_source,
-        extensions=extensions,
-        extension_configs=config['mdx_configs']
-    )
+    Pass a `converter` from `get_converter` to reuse it for many pages.
+    """
+    if converter is None:
+        converter = MarkdownConverter(config)
+    return converter.convert(markdown_source, site_navigation)
 
 
 def get_global_context(nav, config):
@@ -151,7 +256,18 @@ def get_page_context(page, content, toc, meta, config):
     }
 
 
-def build_template(template_name, env, config, site_navigation=None):
+def write_output(content, output_path, outputs=None):
+    """
+    Write the content of an output file of the site, unless the file has the
+    same content already. When given, `outputs` records the path with True if
+    it was written and False if it was skipped.
+    """
+    written = utils.write_file(content, output_path, skip_unchanged=True)
+    if outputs is not None:
+        outputs[output_path] = written
+
+
+def build_template(template_name, env, config, site_navigation=None, outputs=None):
 
     log.debug("Building template: %s", template_name)
 
@@ -166,11 +282,17 @@ def build_template(template_name, env, config, site_navigation=None):
 
     output_content = template.render(context)
     output_path = os.path.join(config['site_dir'], template_name)
-    utils.write_file(output_content.encode('utf-8'), output_path)
+    write_output(output_content.encode('utf-8'), output_path, outputs)
     return True
 
 
-def _build_page(page, config, site_navigation, env, dump_json, dirty=False):
+def _build_page(page, config, site_navigation, env, dump_json, dirty=False,
+                converter=None, outputs=None, timings=None):
+
+    # Render the page against a view of the navigation from this page, which
+    # leaves the shared navigation untouched.
+    nav_view = site_navigation.view(page)
+    page = nav_view.page
 
     # Get the input/output paths
     input_path, output_path = get_complete_paths(config, page)
@@ -183,13 +305,15 @@ def _build_page(page, config, site_navigation, env, dump_json, dirty=False):
         raise
 
     # Process the markdown text
-    html_content, table_of_contents, meta = convert_markdown(
-        markdown_source=input_content,
-        config=config,
-        site_navigation=site_navigation
-    )
+    with timing.timed(timings, 'markdown'):
+        html_content, table_of_contents, meta = convert_markdown(
+            markdown_source=input_content,
+            config=config,
+            site_navigation=nav_view,
+            converter=converter
+        )
 
-    context = get_global_context(site_navigation, config)
+    context = get_global_context(nav_view, config)
     context.update(get_page_context(
         page, html_content, table_of_contents, meta, config
     ))
@@ -210,9 +334,18 @@ def _build_page(page, config, site_navigation, env, dump_json, dirty=False):
             )
 
     # Render the template.
-    output_content = template.render(context)
+    with timing.timed(timings, 'render'):
+        output_content = template.render(context)
 
     # Write the output file.
+    with timing.timed(timings, 'write'):
+        _write_page(output_path, output_content, context, dump_json, outputs)
+    page.release_content()
+
+    return html_content, table_of_contents, meta, template.name
+
+
+def _write_page(output_path, output_content, context, dump_json, outputs):
     if dump_json:
         json_context = {
             'content': context['content'],
@@ -221,14 +354,12 @@ def _build_page(page, config, site_navigation, env, dump_json, dirty=False):
             'language': 'en',
         }
         json_output = json.dumps(json_context, indent=4).encode('utf-8')
-        utils.write_file(json_output, output_path.replace('.html', '.json'))
+        write_output(json_output, output_path.replace('.html', '.json'), outputs)
     else:
-        utils.write_file(output_content.encode('utf-8'), output_path)
-
-    return html_content, table_of_contents, meta
+        write_output(output_content.encode('utf-8'), output_path, outputs)
 
 
-def build_extra_templates(extra_templates, config, site_navigation=None):
+def build_extra_templates(extra_templates, config, site_navigation=None, outputs=None):
 
     log.debug("Building extra_templates page")
 
@@ -245,139 +376,414 @@ def build_extra_templates(extra_templates, config, site_navigation=None):
 
         output_content = template.render(context)
         output_path = os.path.join(config['site_dir'], extra_template)
-        utils.write_file(output_content.encode('utf-8'), output_path)
+        write_output(output_content.encode('utf-8'), output_path, outputs)
+
+
+# TODO: remove DeprecationContext in v1.0 when all deprecated vars have been removed
+_deprecated_vars = {
+    'page_title': 'page.title',
+    'content': 'page.content',
+    'toc': 'page.toc',
+    'meta': 'page.meta',
+    'canonical_url': 'page.canonical_url',
+    'previous_page': 'page.previous_page',
+    'next_page': 'page.next_page',
+    'current_page': 'page',
+    'include_nav': 'nav|length>1',
+    'include_next_prev': '(page.next_page or page.previous_page)',
+    'site_name': 'config.site_name',
+    'site_author': 'config.site_author',
+    'page_description': 'config.site_description',
+    'repo_url': 'config.repo_url',
+    'repo_name': 'config.repo_name',
+    'site_url': 'config.site_url',
+    'copyright': 'config.copyright',
+    'google_analytics': 'config.google_analytics',
+    'homepage_url': 'nav.homepage.url',
+    'favicon': '{{ base_url }}/img/favicon.ico',
+}
+
+
+class DeprecationContext(Context):
+    def resolve(self, key):
+        """ Log a warning when accessing any deprecated variable name. """
+        if key in _deprecated_vars:
+            log.warn(
+                "Template variable warning: '{0}' is being deprecated "
+                "and will not be available in a future version. Use "
+                "'{1}' instead.".format(key, _deprecated_vars[key])
+            )
+        return super(DeprecationContext, self).resolve(key)
+# TODO: end remove DeprecationContext
 
 
-def build_pages(config, dump_json=False, dirty=False):
+def get_environment(config):
     """
-    Builds all the pages and writes them into the build directory.
+    Create the Jinja2 environment used to render the theme templates.
+    """
+    cache_dir = cache.template_cache_dir(config)
+    loader = cache.TemplateLoader(config['theme_dir'] + [config['mkdocs_templates'], ],
+                                  cache_dir, nav.NavFragments())
+    bytecode_cache = None
+    if cache_dir is not None:
+        bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+    env = jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache)
+    env.context_class = DeprecationContext
+    env.filters['tojson'] = filters.tojson
+    return env
+
+
+def _build_and_index_page(page, config, site_navigation, env, dump_json,
+                          converter=None):
     """
+    Build a single page and return a dict with the search index entries for
+    it, the name of the template used to render it, the output files, see
+    `write_output`, the timings of the stages, see `timing.timed`, and the
+    anchors of the page and its links to anchors, see `AnchorIndex`.
+    """
+    try:
+        log.debug("Building page %s", page.input_path)
+        outputs = {}
+        timings = {}
+        with timing.timed(timings, 'page'):
+            build_result = _build_page(page, config, site_navigation, env,
+                                       dump_json, converter=converter,
+                                       outputs=outputs, timings=timings)
+            html_content, table_of_contents, _, template_name = build_result
+            with timing.timed(timings, 'search'):
+                search_index = search.SearchIndex(
+                    compact=config['compact_search_index'],
+                    exclude_tags=config['search_exclude_tags'])
+                search_index.add_entry_from_context(
+                    page, html_content, table_of_contents,
+                    tree=converter.tree if converter is not None else None)
+        file_context = nav.FileContext()
+        file_context.set_current_path(page.input_path)
+        links = converter.links if converter is not None else []
+        return {'entries': search_index.entries, 'template': template_name,
+                'outputs': outputs, 'timings': timings,
+                'anchors': sorted(relative_path_ext.page_anchors(
+                    html_content, converter.tree if converter is not None else None)),
+                'links': relative_path_ext.fragment_links(links, file_context)}
+    except Exception:
+        log.error("Error building page %s", page.input_path)
+        raise
+
+
+# State of a build worker process, see `_build_pages_parallel`.
+_worker = {}
+
+
+def _init_worker(config, dump_json):
     site_navigation = nav.SiteNavigation(config['pages'], config['use_directory_urls'])
-    loader = jinja2.FileSystemLoader(config['theme_dir'] + [config['mkdocs_templates'], ])
-    env = jinja2.Environment(loader=loader)
-
-    # TODO: remove DeprecationContext in v1.0 when all deprecated vars have been removed
-    from jinja2.runtime import Context
-    deprecated_vars = {
-        'page_title': 'page.title',
-        'content': 'page.content',
-        'toc': 'page.toc',
-        'meta': 'page.meta',
-        'canonical_url': 'page.canonical_url',
-        'previous_page': 'page.previous_page',
-        'next_page': 'page.next_page',
-        'current_page': 'page',
-        'include_nav': 'nav|length>1',
-        'include_next_prev': '(page.next_page or page.previous_page)',
-        'site_name': 'config.site_name',
-        'site_author': 'config.site_author',
-        'page_description': 'config.site_description',
-        'repo_url': 'config.repo_url',
-        'repo_name': 'config.repo_name',
-        'site_url': 'config.site_url',
-        'copyright': 'config.copyright',
-        'google_analytics': 'config.google_analytics',
-        'homepage_url': 'nav.homepage.url',
-        'favicon': '{{ base_url }}/img/favicon.ico',
-    }
+    _worker.update(
+        config=config,
+        site_navigation=site_navigation,
+        env=get_environment(config),
+        dump_json=dump_json,
+        converter=get_converter(config)
+    )
 
-    class DeprecationContext(Context):
-        def resolve(self, key):
-            """ Log a warning when accessing any deprecated variable name. """
-            if key in deprecated_vars:
-                log.warn(
-                    "Template variable warning: '{0}' is being deprecated "
-                    "and will not be available in a future version. Use "
-                    "'{1}' instead.".format(key, deprecated_vars[key])
-                )
-            return super(DeprecationContext, self).resolve(key)
 
-    env.context_class = DeprecationContext
-    # TODO: end remove DeprecationContext
+def _build_page_in_worker(index):
+    """
+    Build the page at `index` in the site navigation within a worker process.
+    """
+    site_navigation = _worker['site_navigation']
+    page = site_navigation.pages[index]
+    return _build_and_index_page(page, _worker['config'], site_navigation,
+                                 _worker['env'], _worker['dump_json'],
+                                 _worker['converter'])
 
-    env.filters['tojson'] = filters.tojson
-    search_index = search.SearchIndex()
+
+def _build_pages_parallel(config, indexes, dump_json, jobs):
+    """
+    Build the pages at the given nav indexes with a pool of `jobs` worker
+    processes. The results are yielded per page as they are done, in the same
+    order as the indexes.
+    """
+    pool = multiprocessing.Pool(jobs, _init_worker, (config, dump_json))
+    try:
+        # Hand out pages in small batches so one slow page doesn't hold up the
+        # rest of a large chunk.
+        chunksize = max(1, len(indexes) // (jobs * 8))
+        for result in pool.imap(_build_page_in_worker, indexes, chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def build_pages(config, dump_json=False, dirty=False, jobs=1, outputs=None,
+                timer=None):
+    """
+    Builds all the pages and writes them into the build directory.
+
+    When `jobs` is greater than one, the pages are converted and rendered by
+    that many worker processes. The output files are recorded in `outputs`,
+    see `write_output`, and the time spent in `timer`, a `timing.BuildTimer`.
+    """
+    stages = timer.stages if timer is not None else None
+
+    site_navigation = nav.SiteNavigation(config['pages'], config['use_directory_urls'])
+    env = get_environment(config)
+    converter = get_converter(config)
 
     # Force absolute URLs in the nav of error pages and account for the
     # possability that the docs root might be different than the server root.
     # See https://github.com/mkdocs/mkdocs/issues/77
-    site_navigation.url_context.force_abs_urls = True
-    default_base = site_navigation.url_context.base_path
-    site_navigation.url_context.base_path = utils.urlparse(config['site_url']).path
-    build_template('404.html', env, config, site_navigation)
-    # Reset nav behavior to the default
-    site_navigation.url_context.force_abs_urls = False
-    site_navigation.url_context.base_path = default_base
+    error_url_context = nav.URLContext(
+        base_path=utils.urlparse(config['site_url']).path, force_abs_urls=True)
+    root_view = site_navigation.view()
+
+    with timing.timed(stages, 'templates'):
+        build_template('404.html', env, config,
+                       site_navigation.view(url_context=error_url_context), outputs)
+
+        if not build_template('search.html', env, config, root_view, outputs):
+            log.debug("Search is enabled but the theme doesn't contain a "
+                      "search.html file. Assuming the theme implements search "
+                      "within a modal.")
+
+        build_template('sitemap.xml', env, config, root_view, outputs)
+
+        build_extra_templates(config['extra_templates'], config, root_view, outputs)
+
+    # The inputs of each page are recorded in the build state. When --dirty is
+    # used, only build the pages where any of them changed since the previous
+    # build of the output. The search index entries of the other pages are
+    # taken from the entry store, which dirty builds keep outside of the
+    # site_dir, and their anchors from the build state.
+    entry_store = None
+    if dirty and not dump_json:
+        build_state = cache.BuildState.load(config['site_dir'])
+        entry_store = cache.SearchEntryStore(cache.search_entry_dir(config))
+    else:
+        build_state = cache.BuildState(config['site_dir'])
+    templates = cache.TemplateFingerprints(env)
+    site_inputs = {
+        'config': cache.config_fingerprint(config),
+        'nav': cache.nav_fingerprint(site_navigation),
+    }
 
-    if not build_template('search.html', env, config, site_navigation):
-        log.debug("Search is enabled but the theme doesn't contain a "
-                  "search.html file. Assuming the theme implements search "
-                  "within a modal.")
+    indexes = []
+    page_inputs = []
+    for index, page in enumerate(site_navigation.pages):
+        input_path, output_path = get_complete_paths(config, page)
+        inputs = dict(site_inputs, source=cache.file_hash(input_path))
+        page_inputs.append(inputs)
+        previous = build_state.pages.get(page.input_path)
+        if dirty and previous is not None and os.path.exists(output_path):
+            template_name = previous.get('template')
+            inputs.update(template=template_name,
+                          templates=templates.fingerprint(template_name))
+            if (build_state.is_current(page.input_path, inputs) and
+                    build_state.get_anchors(page.input_path) is not None and
+                    entry_store is not None and
+                    entry_store.has(page.input_path, inputs)):
+                continue
+        indexes.append(index)
+    built = set(indexes)
 
-    build_template('sitemap.xml', env, config, site_navigation)
+    if jobs > 1 and len(indexes) > 1:
+        log.debug("Building %d pages with %d jobs.", len(indexes), jobs)
+        results = _build_pages_parallel(config, indexes, dump_json, jobs)
+    else:
+        results = (
+            _build_and_index_page(site_navigation.pages[index], config,
+                                  site_navigation, env, dump_json,
+                                  converter)
+            for index in indexes
+        )
 
-    build_extra_templates(config['extra_templates'], config, site_navigation)
+    # The search index is written while the pages are built, so the entries
+    # of all pages aren't kept in memory.
+    json_output_path = os.path.join(config['site_dir'], search.INDEX_PATH)
+    manifest_path = os.path.join(config['site_dir'], search.MANIFEST_PATH)
+    search_writer = search.SearchIndexWriter(
+        json_output_path, text_length=config['search_text_length'],
+        normalize=config['search_normalize'])
+    shard_writer = None
+    anchor_index = relative_path_ext.AnchorIndex()
+    if config['shard_search_index']:
+        shard_writer = search.ShardedSearchIndexWriter(
+            os.path.dirname(manifest_path), normalize=config['search_normalize'])
+    try:
+        for index, page in enumerate(site_navigation.pages):
+            inputs = page_inputs[index]
+            if index in built:
+                result = next(results)
+                _add_page_result(page, result, inputs, templates, build_state,
+                                 outputs, timer)
+                entries = result['entries']
+            else:
+                entries = None
+            anchor_index.add_page(page.input_path, *build_state.get_anchors(page.input_path))
+            with timing.timed(stages, 'search_index'):
+                if entry_store is not None:
+                    if entries is None:
+                        entries = entry_store.get(page.input_path, inputs) or []
+                    else:
+                        entry_store.set(page.input_path, inputs, entries)
+                search_writer.extend(entries)
+                if shard_writer is not None:
+                    shard_writer.extend(entries)
+
+        with timing.timed(stages, 'search_index'):
+            written = search_writer.close()
+            if shard_writer is not None:
+                search_outputs = shard_writer.close()
+            else:
+                search_outputs = {}
+                write_output(search.generate_manifest().encode('utf-8'),
+                             manifest_path, search_outputs)
+    except Exception:
+        search_writer.discard()
+        raise
+    finally:
+        # Stop the worker processes of a parallel build.
+        results.close()
+    if outputs is not None:
+        outputs[json_output_path] = written
+        outputs.update(search_outputs)
+
+    log.debug("Built %d of %d pages.", len(indexes), len(site_navigation.pages))
+    log.debug("Relative URL cache: %d hits, %d misses.",
+              nav.relative_urls.hits, nav.relative_urls.misses)
+    log.debug("Link cache: %d hits, %d misses.",
+              relative_path_ext.resolved_links.hits, relative_path_ext.resolved_links.misses)
+
+    if not dump_json:
+        build_state.prune(page.input_path for page in site_navigation.pages)
+        build_state.save()
+    if entry_store is not None:
+        entry_store.prune((page.input_path, page_inputs[index])
+                          for index, page in enumerate(site_navigation.pages))
+
+    anchor_index.check(config['strict'])
+
+
+def _add_page_result(page, result, inputs, templates, build_state, outputs, timer):
+    """
+    Record the result of building a page, see `_build_and_index_page`.
+    """
+    if outputs is not None:
+        outputs.update(result['outputs'])
+    if timer is not None:
+        timer.add_page(page.input_path, result['timings'])
 
-    for page in site_navigation.walk_pages():
+    inputs.update(template=result['template'],
+                  templates=templates.fingerprint(result['template']))
+    build_state.update(page.input_path, inputs)
+    build_state.update_anchors(page.input_path, result['anchors'], result['links'])
 
-        try:
 
-            # When --dirty is used, only build the page if the markdown has been modified since the
-            # previous build of the output.
-            input_path, output_path = get_complete_paths(config, page)
-            if dirty and (utils.modified_time(input_path) < utils.modified_time(output_path)):
-                continue
+def copy_media(config, dirty=False, outputs=None):
+    """
+    Copy the static assets of the themes and the docs_dir into the site_dir,
+    skipping the files which are unchanged. The output files are recorded in
+    `outputs`, see `write_output`.
+    """
+    # Reversed as we want to take the media files from the builtin theme
+    # and then from the custom theme_dir so that the custom versions take
+    # precedence. Only the final version of each file is copied.
+    media = {}
+    for theme_dir in reversed(config['theme_dir']):
+        log.debug("Copying static assets from theme: %s", theme_dir)
+        media.update((relative_path, source_path) for source_path, relative_path in
+                     utils.media_files(theme_dir, exclude=['*.py', '*.pyc', '*.html']))
 
-            log.debug("Building page %s", page.input_path)
-            build_result = _build_page(page, config, site_navigation, env,
-                                       dump_json)
-            html_content, table_of_contents, _ = build_result
-            search_index.add_entry_from_context(
-                page, html_content, table_of_contents)
-        except Exception:
-            log.error("Error building page %s", page.input_path)
-            raise
+    log.debug("Copying static assets from the docs dir.")
+    media.update((relative_path, source_path) for source_path, relative_path in
+                 utils.media_files(config['docs_dir']))
 
-    search_index = search_index.generate_search_index()
-    json_output_path = os.path.join(config['site_dir'], 'mkdocs', 'search_index.json')
-    utils.write_file(search_index.encode('utf-8'), json_output_path)
+    for relative_path, source_path in sorted(media.items()):
+        output_path = os.path.join(config['site_dir'], relative_path)
 
+        # Do not copy when using --dirty if the file has not been modified.
+        # Copies keep the modification time of the source, see `copy_file`.
+        if dirty and (utils.modified_time(source_path) <= utils.modified_time(output_path)):
+            written = False
+        else:
+            written = utils.copy_file(source_path, output_path, skip_unchanged=True)
+        if outputs is not None:
+            outputs[output_path] = written
 
-def build(config, live_server=False, dump_json=False, dirty=False):
+
+def build(config, live_server=False, dump_json=False, dirty=False, jobs=1,
+          timer=None, search_report=False):
     """
     Perform a full site build.
+
+    The pages are built with `jobs` worker processes, see `build_pages`.
+    Output files which are unchanged since the previous build are not written
+    again. Unless the build is dirty, any other files in the site directory
+    are removed afterwards. The time spent in each stage of the build is
+    recorded in `timer`, a `timing.BuildTimer`, if given.
+
+    If `search_report` is True, statistics of the search index are logged,
+    see `search.SearchIndexReport`. The build fails if the search index is
+    larger than the `search_index_budget`.
     """
-    if not dirty:
-        log.info("Cleaning site directory")
-        utils.clean_directory(config['site_dir'])
-    else:
+    stages = timer.stages if timer is not None else None
+
+    if dirty:
         # Warn user about problems that may occur with --dirty option
-        log.warning("A 'dirty' build is being performed, this will likely lead to inaccurate navigation and other"
-                    " links within your site. This option is designed for site development purposes only.")
+        log.warning("A 'dirty' build is being performed. Only the pages which changed since the previous build are"
+                    " built. This option is designed for site development purposes only.")
 
     if not live_server:
         log.info("Building documentation to directory: %s", config['site_dir'])
         if dirty and site_directory_contains_stale_files(config['site_dir']):
             log.info("The directory contains stale files. Use --clean to remove them.")
 
+    outputs = {}
     if dump_json:
-        build_pages(config, dump_json=True, dirty=dirty)
-        return
+        build_pages(config, dump_json=True, dirty=dirty, jobs=jobs,
+                    outputs=outputs, timer=timer)
+    else:
+        with timing.timed(stages, 'media'):
+            copy_media(config, dirty=dirty, outputs=outputs)
 
-    # Reversed as we want to take the media files from the builtin theme
-    # and then from the custom theme_dir so that the custom versions take
-    # precedence.
-    for theme_dir in reversed(config['theme_dir']):
-        log.debug("Copying static assets from theme: %s", theme_dir)
-        utils.copy_media_files(
-            theme_dir, config['site_dir'], exclude=['*.py', '*.pyc', '*.html'], dirty=dirty
-        )
+        log.debug("Building markdown pages.")
+        build_pages(config, dirty=dirty, jobs=jobs, outputs=outputs,
+                    timer=timer)
 
-    log.debug("Copying static assets from the docs dir.")
-    utils.copy_media_files(config['docs_dir'], config['site_dir'], dirty=dirty)
+    if not dirty:
+        log.info("Cleaning site directory")
+        with timing.timed(stages, 'clean'):
+            removed = utils.remove_stale_files(config['site_dir'], outputs)
+        log.debug("Removed %d stale files.", removed)
+
+    written = len([path for path, path_written in outputs.items() if path_written])
+    log.info("Wrote %d files, skipped %d unchanged files.", written, len(outputs) - written)
+
+    if not dump_json:
+        if search_report:
+            report = search.SearchIndexReport(os.path.join(config['site_dir'], search.INDEX_PATH))
+            for line in report.summary():
+                log.info(line)
+        check_search_index_budget(config, live_server)
 
-    log.debug("Building markdown pages.")
-    build_pages(config, dirty=dirty)
+
+def check_search_index_budget(config, live_server=False):
+    """
+    Raise `SearchIndexTooLarge` if the search index is larger than the
+    `search_index_budget`. The development server only logs a warning.
+    """
+    budget = config['search_index_budget']
+    if budget is None:
+        return
+    index_path = os.path.join(config['site_dir'], search.INDEX_PATH)
+    size = os.path.getsize(index_path)
+    if size <= budget:
+        return
+    msg = ("The search index {0} is {1} bytes, which is more than the "
+           "search_index_budget of {2} bytes.").format(index_path, size, budget)
+    if live_server:
+        log.warning(msg)
+    else:
+        raise exceptions.SearchIndexTooLarge(msg)
 
 
 def site_directory_contains_stale_files(site_directory):
@@ -4,6 +4,7 @@ import subprocess
 import os
 
 import mkdocs
+from mkdocs import cache
 from mkdocs.utils import ghp_import
 
 log = logging.getLogger(__name__)
@@ -65,8 +66,10 @@ def gh_deploy(config, message=None, force=False):
     log.info("Copying '%s' to '%s' branch and pushing to GitHub.",
              config['site_dir'], config['remote_branch'])
 
+    # The state of the build is only used by later builds.
     result, error = ghp_import.ghp_import(config['site_dir'], message, remote_name,
-                                          remote_branch, force)
+                                          remote_branch, force,
+                                          exclude=[cache.BuildState.filename])
     if not result:
         log.error("Failed to deploy to GitHub with error: \n%s", error)
         raise SystemExit(1)
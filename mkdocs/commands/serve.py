@@ -4,7 +4,8 @@ import logging
 import shutil
 import tempfile
 
-from os.path import isfile, join
+from os.path import getmtime, isfile, join
+from mkdocs import search, timing
 from mkdocs.commands.build import build
 from mkdocs.config import load_config
 
@@ -29,6 +30,41 @@ def _get_handler(site_dir, StaticFileHandler):
     return WebHandler
 
 
+def _get_search_handler(site_dir):
+    """
+    Return a handler which answers `/search?q=` with the results of searching
+    the search index of the site as JSON, see `mkdocs.search_engine`. The
+    index is loaded again when it was rebuilt.
+    """
+
+    from tornado import web
+    from mkdocs.search_engine import SearchEngine
+
+    index_path = join(site_dir, search.INDEX_PATH)
+    loaded = {}
+
+    class SearchHandler(web.RequestHandler):
+
+        def get(self):
+            if not isfile(index_path):
+                raise web.HTTPError(404)
+            mtime = getmtime(index_path)
+            if loaded.get('mtime') != mtime:
+                loaded.update(mtime=mtime, engine=SearchEngine.load(index_path))
+
+            query = self.get_argument('q', '')
+            try:
+                limit = int(self.get_argument('limit', 0)) or None
+            except ValueError:
+                raise web.HTTPError(400)
+            self.write({
+                'query': query,
+                'results': loaded['engine'].search(query, limit=limit),
+            })
+
+    return SearchHandler
+
+
 def _livereload(host, port, config, builder, site_dir):
 
     # We are importing here for anyone that has issues with livereload. Even if
@@ -41,7 +77,10 @@ def _livereload(host, port, config, builder, site_dir):
         def get_web_handlers(self, script):
             handlers = super(LiveReloadServer, self).get_web_handlers(script)
             # replace livereload handler
-            return [(handlers[0][0], _get_handler(site_dir, livereload.handlers.StaticFileHandler), handlers[0][2],)]
+            return [
+                (r"/search", _get_search_handler(site_dir)),
+                (handlers[0][0], _get_handler(site_dir, livereload.handlers.StaticFileHandler), handlers[0][2],),
+            ]
 
     server = LiveReloadServer()
 
@@ -63,6 +102,7 @@ def _static_server(host, port, site_dir):
     from tornado import web
 
     application = web.Application([
+        (r"/search", _get_search_handler(site_dir)),
         (r"/(.*)", _get_handler(site_dir, web.StaticFileHandler), {
             "path": site_dir,
             "default_filename": "index.html"
@@ -79,13 +119,16 @@ def _static_server(host, port, site_dir):
 
 
 def serve(config_file=None, dev_addr=None, strict=None, theme=None,
-          theme_dir=None, livereload='livereload'):
+          theme_dir=None, livereload='livereload', jobs=1, profile=None):
     """
     Start the MkDocs development server
 
     By default it will serve the documentation on http://localhost:8000/ and
     it will rebuild the documentation and refresh the page automatically
     whenever a file is edited.
+
+    If `profile` is given, the timings of each build are written to it, see
+    `mkdocs.timing`.
     """
 
     # Create a temporary build directory, and set some options to serve it
@@ -93,17 +136,22 @@ def serve(config_file=None, dev_addr=None, strict=None, theme=None,
 
     def builder():
         log.info("Building documentation...")
-        config = load_config(
-            config_file=config_file,
-            dev_addr=dev_addr,
-            strict=strict,
-            theme=theme,
-            theme_dir=theme_dir
-        )
+        timer = timing.BuildTimer() if profile else None
+        with timing.timed(timer and timer.stages, 'config'):
+            config = load_config(
+                config_file=config_file,
+                dev_addr=dev_addr,
+                strict=strict,
+                theme=theme,
+                theme_dir=theme_dir
+            )
         config['site_dir'] = tempdir
         live_server = livereload in ['dirty', 'livereload']
         dirty = livereload == 'dirty'
-        build(config, live_server=live_server, dirty=dirty)
+        build(config, live_server=live_server, dirty=dirty, jobs=jobs,
+              timer=timer)
+        if timer is not None:
+            timer.write(profile)
         return config
 
     try:
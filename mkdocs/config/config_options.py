@@ -6,6 +6,11 @@ from mkdocs import utils, legacy
 from mkdocs.config.base import Config, ValidationError
 
 
+class Address(namedtuple('Address', 'host port')):
+    def __str__(self):
+        return '{0}:{1}'.format(self.host, self.port)
+
+
 class BaseConfigOption(object):
 
     def __init__(self):
@@ -175,10 +180,6 @@ class IpAddress(OptionallyRequired):
         except:
             raise ValidationError("'{0}' is not a valid port".format(port))
 
-        class Address(namedtuple('Address', 'host port')):
-            def __str__(self):
-                return '{0}:{1}'.format(self.host, self.port)
-
         return Address(host, port)
 
 
@@ -366,6 +367,31 @@ class Theme(OptionallyRequired):
         )
 
 
+class Choices(OptionallyRequired):
+    """
+    Choices Config Option
+
+    Validate a list of values, each of which must be one of the choices.
+    """
+
+    def __init__(self, choices, **kwargs):
+        super(Choices, self).__init__(**kwargs)
+        self.choices = choices
+
+    def run_validation(self, value):
+        if not isinstance(value, list):
+            raise ValidationError(
+                "Expected a list but recieved: {0}".format(type(value)))
+
+        for item in value:
+            if item not in self.choices:
+                raise ValidationError(
+                    "Unrecognised value '{0}'. The values must be one of: "
+                    "{1}".format(item, ', '.join(self.choices)))
+
+        return value
+
+
 class Extras(OptionallyRequired):
     """
     Extras Config Option
@@ -45,6 +45,10 @@ DEFAULT_SCHEMA = (
     # The directory where the site will be built to
     ('site_dir', config_options.SiteDir(default='site')),
 
+    # A directory to keep data between builds in, such as the converted
+    # Markdown of every page. Caching is disabled when it isn't set.
+    ('cache_dir', config_options.Dir()),
+
     # The directory of a theme to use if not using one of the builtin MkDocs
     # themes.
     ('theme_dir', config_options.ThemeDir(exists=True)),
@@ -98,6 +102,24 @@ DEFAULT_SCHEMA = (
     ('include_nav', config_options.NumPages()),
     ('include_next_prev', config_options.NumPages()),
 
+    # Write the search index as shards which are only fetched as needed by
+    # the search of the builtin themes.
+    ('shard_search_index', config_options.Type(bool, default=False)),
+
+    # Write the entries of pages without the text of their sections, and cut
+    # the text of every entry to this many characters.
+    ('compact_search_index', config_options.Type(bool, default=False)),
+    ('search_text_length', config_options.Type(int)),
+
+    # Fail the build when the search index is larger than this many bytes.
+    ('search_index_budget', config_options.Type(int)),
+
+    # Leave the text of these HTML tags out of the search index, and normalize
+    # the text of each entry and the terms of the search index.
+    ('search_exclude_tags', config_options.Type(list, default=[])),
+    ('search_normalize', config_options.Choices(
+        ['whitespace', 'stop_words', 'stem'], default=['stop_words', 'stem'])),
+
     # PyMarkdown extension names.
     ('markdown_extensions', config_options.MarkdownExtensions(
         builtins=['meta', 'toc', 'tables', 'fenced_code'],
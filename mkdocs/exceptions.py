@@ -12,3 +12,11 @@ class ConfigurationError(MkDocsException):
 
 class MarkdownNotFound(MkDocsException):
     """A linked local Markdown file isn't found in the table of contents."""
+
+
+class AnchorNotFound(MkDocsException):
+    """A link to a local Markdown file points to an anchor which isn't in it."""
+
+
+class SearchIndexTooLarge(MkDocsException):
+    """The search index is larger than the `search_index_budget`."""
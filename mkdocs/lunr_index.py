@@ -0,0 +1,313 @@
+# coding: utf-8
+
+"""
+Builds a search index in the serialized format of lunr.js 0.7.0, as shipped in
+`assets/search/mkdocs/js/lunr.min.js`.
+
+The index is loaded by the browser with `lunr.Index.load`, rather than each
+document being added on every page load. Text is tokenized, trimmed, filtered
+for stop words and stemmed exactly like lunr.js does, so the terms in the index
+match those of the queries the browser runs through the same pipeline.
+"""
+
+from __future__ import unicode_literals
+
+import re
+
+VERSION = '0.7.0'
+
+_separator_re = re.compile(r'[\s\-]+', re.UNICODE)
+
+# JavaScript's `\W` only knows about ASCII word characters.
+_leading_re = re.compile(r'^[^A-Za-z0-9_]+')
+_trailing_re = re.compile(r'[^A-Za-z0-9_]+$')
+
+STOP_WORDS = frozenset([
+    'a', 'able', 'about', 'across', 'after', 'all', 'almost', 'also', 'am',
+    'among', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'because', 'been',
+    'but', 'by', 'can', 'cannot', 'could', 'dear', 'did', 'do', 'does',
+    'either', 'else', 'ever', 'every', 'for', 'from', 'get', 'got', 'had',
+    'has', 'have', 'he', 'her', 'hers', 'him', 'his', 'how', 'however', 'i',
+    'if', 'in', 'into', 'is', 'it', 'its', 'just', 'least', 'let', 'like',
+    'likely', 'may', 'me', 'might', 'most', 'must', 'my', 'neither', 'no',
+    'nor', 'not', 'of', 'off', 'often', 'on', 'only', 'or', 'other', 'our',
+    'own', 'rather', 'said', 'say', 'says', 'she', 'should', 'since', 'so',
+    'some', 'than', 'that', 'the', 'their', 'them', 'then', 'there', 'these',
+    'they', 'this', 'tis', 'to', 'too', 'twas', 'us', 'wants', 'was', 'we',
+    'were', 'what', 'when', 'where', 'which', 'while', 'who', 'whom', 'why',
+    'will', 'with', 'would', 'yet', 'you', 'your',
+])
+
+
+def tokenize(text):
+    """
+    Split text into lowercase tokens like `lunr.tokenizer`.
+    """
+    if text is None:
+        return []
+    return _separator_re.split(text.strip().lower())
+
+
+def trimmer(token):
+    return _trailing_re.sub('', _leading_re.sub('', token))
+
+
+def stop_word_filter(token):
+    if token in STOP_WORDS:
+        return None
+    return token
+
+
+# The Porter stemmer of lunr.js, which differs slightly from the reference
+# implementation, so it is ported as is.
+_step2list = {
+    'ational': 'ate', 'tional': 'tion', 'enci': 'ence', 'anci': 'ance',
+    'izer': 'ize', 'bli': 'ble', 'alli': 'al', 'entli': 'ent', 'eli': 'e',
+    'ousli': 'ous', 'ization': 'ize', 'ation': 'ate', 'ator': 'ate',
+    'alism': 'al', 'iveness': 'ive', 'fulness': 'ful', 'ousness': 'ous',
+    'aliti': 'al', 'iviti': 'ive', 'biliti': 'ble', 'logi': 'log',
+}
+_step3list = {
+    'icate': 'ic', 'ative': '', 'alize': 'al', 'iciti': 'ic', 'ical': 'ic',
+    'ful': '', 'ness': '',
+}
+
+_c = '[^aeiou]'
+_v = '[aeiouy]'
+_C = _c + '[^aeiouy]*'
+_V = _v + '[aeiou]*'
+
+_re_mgr0 = re.compile('^(' + _C + ')?' + _V + _C)
+_re_meq1 = re.compile('^(' + _C + ')?' + _V + _C + '(' + _V + ')?$')
+_re_mgr1 = re.compile('^(' + _C + ')?' + _V + _C + _V + _C)
+_re_s_v = re.compile('^(' + _C + ')?' + _v)
+
+_re_1a = re.compile(r'^(.+?)(ss|i)es$')
+_re2_1a = re.compile(r'^(.+?)([^s])s$')
+_re_1b = re.compile(r'^(.+?)eed$')
+_re2_1b = re.compile(r'^(.+?)(ed|ing)$')
+_re_1b_2 = re.compile(r'.$')
+_re2_1b_2 = re.compile(r'(at|bl|iz)$')
+_re3_1b_2 = re.compile(r'([^aeiouylsz])\1$')
+_re4_1b_2 = re.compile('^' + _C + _v + '[^aeiouwxy]$')
+_re_1c = re.compile(r'^(.+?[^aeiou])y$')
+_re_2 = re.compile(r'^(.+?)(ational|tional|enci|anci|izer|bli|alli|entli|eli|ousli|ization|ation|ator|alism|iveness|'
+                   r'fulness|ousness|aliti|iviti|biliti|logi)$')
+_re_3 = re.compile(r'^(.+?)(icate|ative|alize|iciti|ical|ful|ness)$')
+_re_4 = re.compile(r'^(.+?)(al|ance|ence|er|ic|able|ible|ant|ement|ment|ent|ou|ism|ate|iti|ous|ive|ize)$')
+_re2_4 = re.compile(r'^(.+?)(s|t)(ion)$')
+_re_5 = re.compile(r'^(.+?)e$')
+_re_5_1 = re.compile(r'll$')
+_re3_5 = re.compile('^' + _C + _v + '[^aeiouwxy]$')
+
+
+def stemmer(w):
+    if len(w) < 3:
+        return w
+
+    firstch = w[0]
+    if firstch == 'y':
+        w = 'Y' + w[1:]
+
+    # Step 1a
+    if _re_1a.search(w):
+        w = _re_1a.sub(r'\1\2', w, 1)
+    elif _re2_1a.search(w):
+        w = _re2_1a.sub(r'\1\2', w, 1)
+
+    # Step 1b
+    fp = _re_1b.search(w)
+    if fp:
+        if _re_mgr0.search(fp.group(1)):
+            w = _re_1b_2.sub('', w, 1)
+    else:
+        fp = _re2_1b.search(w)
+        if fp:
+            stem = fp.group(1)
+            if _re_s_v.search(stem):
+                w = stem
+                if _re2_1b_2.search(w):
+                    w += 'e'
+                elif _re3_1b_2.search(w):
+                    w = _re_1b_2.sub('', w, 1)
+                elif _re4_1b_2.search(w):
+                    w += 'e'
+
+    # Step 1c
+    fp = _re_1c.search(w)
+    if fp:
+        w = fp.group(1) + 'i'
+
+    # Step 2
+    fp = _re_2.search(w)
+    if fp:
+        stem, suffix = fp.group(1), fp.group(2)
+        if _re_mgr0.search(stem):
+            w = stem + _step2list[suffix]
+
+    # Step 3
+    fp = _re_3.search(w)
+    if fp:
+        stem, suffix = fp.group(1), fp.group(2)
+        if _re_mgr0.search(stem):
+            w = stem + _step3list[suffix]
+
+    # Step 4
+    fp = _re_4.search(w)
+    if fp:
+        stem = fp.group(1)
+        if _re_mgr1.search(stem):
+            w = stem
+    else:
+        fp = _re2_4.search(w)
+        if fp:
+            stem = fp.group(1) + fp.group(2)
+            if _re_mgr1.search(stem):
+                w = stem
+
+    # Step 5
+    fp = _re_5.search(w)
+    if fp:
+        stem = fp.group(1)
+        if _re_mgr1.search(stem) or (_re_meq1.search(stem) and not _re3_5.search(stem)):
+            w = stem
+
+    if _re_5_1.search(w) and _re_mgr1.search(w):
+        w = _re_1b_2.sub('', w, 1)
+
+    if firstch == 'y':
+        w = firstch + w[1:]
+
+    return w
+
+
+PIPELINE = [
+    ('trimmer', trimmer),
+    ('stopWordFilter', stop_word_filter),
+    ('stemmer', stemmer),
+]
+
+
+def load_pipeline(names):
+    """
+    Return the functions of the pipeline with the given names, in the given
+    order, like `lunr.Pipeline.load`.
+    """
+    functions = dict(PIPELINE)
+    return [(name, functions[name]) for name in names]
+
+
+def _sort_key(token):
+    # JavaScript compares strings by their UTF-16 code units.
+    return token.encode('utf-16-be')
+
+
+class Index(object):
+    """
+    A lunr.js index of documents with a title and a text field, referenced by
+    their location. The tokens are run through the functions of `pipeline`,
+    the whole `PIPELINE` by default.
+    """
+
+    fields = [
+        {'name': 'title', 'boost': 10},
+        {'name': 'text', 'boost': 1},
+    ]
+    ref = 'location'
+
+    def __init__(self, pipeline=None):
+        self.pipeline = PIPELINE if pipeline is None else pipeline
+        self._documents = {}
+        self._token_store = {'docs': {}}
+        self._token_count = 0
+        self._corpus_tokens = set()
+        # Most words occur many times, so each is only run through the
+        # pipeline once.
+        self._terms = {}
+
+    def _run_pipeline(self, tokens):
+        terms = []
+        for token in tokens:
+            try:
+                term = self._terms[token]
+            except KeyError:
+                term = token
+                for _, function in self.pipeline:
+                    term = function(term)
+                    if not term:
+                        break
+                self._terms[token] = term
+            if term:
+                terms.append(term)
+        return terms
+
+    def terms(self, text):
+        """
+        Return the terms of a text, as lunr.js indexes or queries them.
+        """
+        return self._run_pipeline(tokenize(text))
+
+    def term_frequencies(self, doc):
+        """
+        Return the terms of a document, a dict with the title, text and
+        location, as a list of tuples of each term and its frequency in the
+        document weighted by the boost of the fields, in the order of lunr.js.
+        """
+        field_counts = []
+        for field in self.fields:
+            terms = self.terms(doc.get(field['name']))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            field_counts.append((field['boost'], len(terms), counts))
+
+        doc_terms = set()
+        for _, _, counts in field_counts:
+            doc_terms.update(counts)
+
+        frequencies = []
+        for term in sorted(doc_terms, key=_sort_key):
+            tf = 0
+            for boost, length, counts in field_counts:
+                if length:
+                    tf += counts.get(term, 0) / float(length) * boost
+            frequencies.append((term, tf))
+        return frequencies
+
+    def add(self, doc):
+        """
+        Add a document, a dict with the title, text and location, like
+        `lunr.Index.add` does.
+        """
+        ref = doc[self.ref]
+        frequencies = self.term_frequencies(doc)
+        self._documents[ref] = [term for term, _ in frequencies]
+        self._corpus_tokens.update(self._documents[ref])
+
+        for term, tf in frequencies:
+            node = self._token_store
+            for char in term:
+                node = node.setdefault(char, {'docs': {}})
+            node['docs'][ref] = {'ref': ref, 'tf': tf}
+            self._token_count += 1
+
+    def to_json(self):
+        """
+        Return the index as the data `lunr.Index.load` expects.
+        """
+        return {
+            'version': VERSION,
+            'fields': self.fields,
+            'ref': self.ref,
+            'tokenizer': 'default',
+            'documentStore': {
+                'store': self._documents,
+                'length': len(self._documents),
+            },
+            'tokenStore': {
+                'root': self._token_store,
+                'length': self._token_count,
+            },
+            'corpusTokens': sorted(self._corpus_tokens, key=_sort_key),
+            'pipeline': [name for name, _ in self.pipeline],
+        }
@@ -7,9 +7,14 @@ This consists of building a set of interlinked page and header objects.
 """
 
 from __future__ import unicode_literals
+from collections import namedtuple
 import datetime
+import io
 import logging
 import os
+import re
+
+import jinja2.meta
 
 from mkdocs import utils, exceptions
 
@@ -26,6 +31,13 @@ def filename_to_title(filename):
     return utils.filename_to_title(filename)
 
 
+class Neighbourhood(namedtuple('Neighbourhood', 'previous_page next_page parent siblings')):
+    """
+    The items around a page in the site navigation, see
+    `SiteNavigation.neighbourhood`.
+    """
+
+
 class SiteNavigation(object):
     def __init__(self, pages_config, use_directory_urls=True):
         self.url_context = URLContext()
@@ -35,6 +47,17 @@ class SiteNavigation(object):
         self.homepage = self.pages[0] if self.pages else None
         self.use_directory_urls = use_directory_urls
 
+        # The pages by their input path, absolute URL and output path. If a
+        # page is listed more than once, the first one is used.
+        self.pages_by_input_path = {}
+        self.pages_by_url = {}
+        self.pages_by_output_path = {}
+        for page in self.pages:
+            self.pages_by_input_path.setdefault(page.input_path, page)
+            self.pages_by_url.setdefault(page.abs_url, page)
+            self.pages_by_output_path.setdefault(page.output_path, page)
+        self._source_files = set(self.pages_by_input_path)
+
     def __str__(self):
         return ''.join([str(item) for item in self])
 
@@ -68,10 +91,203 @@ class SiteNavigation(object):
 
     @property
     def source_files(self):
-        if not hasattr(self, '_source_files'):
-            self._source_files = set([page.input_path for page in self.pages])
         return self._source_files
 
+    def neighbourhood(self, input_path):
+        """
+        Return the `Neighbourhood` of the page with the given input path: the
+        previous and next page, the header it is in, which is None for a top
+        level page, and the items at the same level, including the page. None
+        is returned if the page isn't in the site navigation.
+
+        Unlike `walk_pages`, this doesn't go through the pages before it.
+        """
+        page = self.pages_by_input_path.get(input_path)
+        if page is None:
+            return None
+        if page.ancestors:
+            parent = page.ancestors[-1]
+            siblings = parent.children
+        else:
+            parent = None
+            siblings = self.nav_items
+        return Neighbourhood(page.previous_page, page.next_page, parent, siblings)
+
+    def view(self, page=None, url_context=None):
+        """
+        Return the site navigation as seen from the given page.
+
+        Unlike `walk_pages`, this doesn't change the state of the pages and
+        headers or the shared URL and file contexts, so several pages can be
+        rendered at the same time.
+        """
+        return NavigationView(self, page, url_context)
+
+
+class NavigationView(object):
+    """
+    An immutable view of the site navigation from a single page.
+
+    The view can be used in place of the `SiteNavigation` when rendering
+    templates and converting Markdown. The pages and headers it returns are
+    wrapped so that their `active` state and `url` are relative to the page
+    of the view. Without a page, nothing is active and URLs are relative to
+    the site root, unless a `URLContext` is given.
+    """
+
+    def __init__(self, site_navigation, page=None, url_context=None):
+        self.site_navigation = site_navigation
+        self.use_directory_urls = site_navigation.use_directory_urls
+
+        if url_context is None:
+            url_context = URLContext()
+            if page is not None:
+                url_context.set_current_url(page.abs_url)
+        self.url_context = url_context
+
+        self.file_context = FileContext()
+        if page is not None:
+            self.file_context.set_current_path(page.input_path)
+
+        self._active = set()
+        if page is not None:
+            self._active.add(page)
+            self._active.update(page.ancestors)
+
+        self._items = {}
+        self._page_urls = None
+        self.page = self.wrap(page)
+
+    def __str__(self):
+        return ''.join([str(item) for item in self])
+
+    def __iter__(self):
+        return iter(self.wrap_all(self.site_navigation.nav_items))
+
+    def __len__(self):
+        return len(self.site_navigation)
+
+    @property
+    def homepage(self):
+        return self.wrap(self.site_navigation.homepage)
+
+    @property
+    def pages(self):
+        return self.wrap_all(self.site_navigation.pages)
+
+    @property
+    def source_files(self):
+        return self.site_navigation.source_files
+
+    @property
+    def page_urls(self):
+        """
+        The URL of every page relative to the page of this view, by the
+        absolute URL of the page. The table is computed on first use, which
+        is worth it when rendering links to most pages, as in the navigation.
+        """
+        if self._page_urls is None:
+            make_relative = self.url_context.make_relative
+            self._page_urls = dict(
+                (page.abs_url, make_relative(page.abs_url))
+                for page in self.site_navigation.pages
+            )
+        return self._page_urls
+
+    def is_active(self, item):
+        return item in self._active
+
+    def wrap(self, item):
+        """
+        Return the given page or header as seen from this view.
+        """
+        if item is None:
+            return None
+        try:
+            return self._items[id(item)]
+        except KeyError:
+            view = self._items[id(item)] = ItemView(item, self)
+            return view
+
+    def wrap_all(self, items):
+        return [self.wrap(item) for item in items]
+
+
+class ItemView(object):
+    """
+    A page or header as seen from the page of a `NavigationView`.
+
+    All attributes are those of the underlying item, except for the ones which
+    depend on the current page. Setting an attribute, such as the `content` of
+    the page being rendered, sets it on the view only, so the state of a page
+    isn't shared between the views of several pages. Methods of the item,
+    such as `Page.set_canonical_url`, still change the item itself.
+    """
+
+    def __init__(self, item, view):
+        self.item = item
+        self.view = view
+
+    def __getattr__(self, name):
+        return getattr(self.item, name)
+
+    def __eq__(self, other):
+        return self.item is getattr(other, 'item', other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.item)
+
+    def __str__(self):
+        return self.indent_print()
+
+    def indent_print(self, depth=0):
+        indent = '    ' * depth
+        active_marker = ' [*]' if self.active else ''
+        if isinstance(self.item, Page):
+            title = self.title if (self.title is not None) else '[blank]'
+            return '%s%s - %s%s\n' % (indent, title, self.abs_url, active_marker)
+        ret = '%s%s%s\n' % (indent, self.title, active_marker)
+        for item in self.children:
+            ret += item.indent_print(depth + 1)
+        return ret
+
+    @property
+    def active(self):
+        return self.view.is_active(self.item)
+
+    @property
+    def url(self):
+        if not isinstance(self.item, Page):
+            raise AttributeError('url')
+        return self.view.url_context.make_relative(self.item.abs_url)
+
+    @property
+    def children(self):
+        return self.view.wrap_all(self.item.children)
+
+    @property
+    def ancestors(self):
+        return self.view.wrap_all(self.item.ancestors)
+
+    @property
+    def previous_page(self):
+        return self.view.wrap(self.item.previous_page)
+
+    @property
+    def next_page(self):
+        return self.view.wrap(self.item.next_page)
+
+    def release_content(self):
+        """
+        Drop the content and table of contents set on the view once the page
+        is written, see `Page.release_content`.
+        """
+        self.__dict__.pop('content', None)
+        self.__dict__.pop('toc', None)
+
 
 class URLContext(object):
     """
@@ -83,9 +299,9 @@ class URLContext(object):
     if the documentation is not hosted at the root path.
     """
 
-    def __init__(self):
-        self.base_path = '/'
-        self.force_abs_urls = False
+    def __init__(self, base_path='/', force_abs_urls=False):
+        self.base_path = base_path
+        self.force_abs_urls = force_abs_urls
 
     def set_current_url(self, current_url):
         self.base_path = os.path.dirname(current_url)
@@ -95,22 +311,90 @@ class URLContext(object):
         Given a URL path return it as a relative URL,
         given the context of the current page.
         """
-        if self.force_abs_urls:
-            abs_url = '%s/%s' % (self.base_path.rstrip('/'), utils.path_to_url(url.lstrip('/')))
-            return abs_url
+        return relative_urls.get(self.base_path, url, self.force_abs_urls)
+
+
+def _relpath(path, start):
+    """
+    Return a relative path like `os.path.relpath`. For absolute POSIX paths
+    without any '..' the path is split directly, which is a lot faster.
+    """
+    if (os.path.sep != '/' or not path.startswith('/') or not start.startswith('/') or
+            '..' in path or '..' in start):
+        return os.path.relpath(path, start=start)
+
+    path_list = [x for x in path.split('/') if x and x != '.']
+    start_list = [x for x in start.split('/') if x and x != '.']
+    i = 0
+    for path_part, start_part in zip(path_list, start_list):
+        if path_part != start_part:
+            break
+        i += 1
+    rel_list = ['..'] * (len(start_list) - i) + path_list[i:]
+    return '/'.join(rel_list) or '.'
+
+
+def _make_relative(base_path, url, force_abs_urls):
+    if force_abs_urls:
+        abs_url = '%s/%s' % (base_path.rstrip('/'), utils.path_to_url(url.lstrip('/')))
+        return abs_url
+
+    suffix = '/' if (url.endswith('/') and len(url) > 1) else ''
+    # Workaround for bug on `os.path.relpath()` in Python 2.6
+    if base_path == '/':
+        if url == '/':
+            # Workaround for static assets
+            return '.'
+        return url.lstrip('/')
+    # Under Python 2.6, relative_path adds an extra '/' at the end.
+    relative_path = _relpath(url, base_path)
+    relative_path = relative_path.rstrip('/') + suffix
+
+    return utils.path_to_url(relative_path)
+
+
+class RelativeURLCache(object):
+    """
+    A cache of the URLs returned by `URLContext.make_relative`, keyed by the
+    base path, the URL and whether absolute URLs are forced. The same URLs
+    are made relative over and over again while rendering the pages of a
+    site, for example in the navigation and for the extra CSS and JavaScript.
+
+    The number of hits and misses is counted. Once the cache holds `maxsize`
+    URLs, it is cleared.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._urls = {}
+
+    def __len__(self):
+        return len(self._urls)
+
+    def get(self, base_path, url, force_abs_urls=False):
+        key = (base_path, url, force_abs_urls)
+        try:
+            relative_url = self._urls[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            return relative_url
+
+        if len(self._urls) >= self.maxsize:
+            self._urls.clear()
+        relative_url = self._urls[key] = _make_relative(base_path, url, force_abs_urls)
+        return relative_url
 
-        suffix = '/' if (url.endswith('/') and len(url) > 1) else ''
-        # Workaround for bug on `os.path.relpath()` in Python 2.6
-        if self.base_path == '/':
-            if url == '/':
-                # Workaround for static assets
-                return '.'
-            return url.lstrip('/')
-        # Under Python 2.6, relative_path adds an extra '/' at the end.
-        relative_path = os.path.relpath(url, start=self.base_path)
-        relative_path = relative_path.rstrip('/') + suffix
+    def clear(self):
+        self._urls.clear()
+        self.hits = 0
+        self.misses = 0
 
-        return utils.path_to_url(relative_path)
+
+relative_urls = RelativeURLCache()
 
 
 class FileContext(object):
@@ -138,7 +422,120 @@ class FileContext(object):
         return os.path.normpath(os.path.join(self.base_path, path))
 
 
+# The URLs in the navigation fragments, which are replaced with the URL
+# relative to each page. See `NavFragments`.
+URL_PLACEHOLDER = '\x02mkdocs-url:%s\x03'
+URL_PLACEHOLDER_RE = re.compile('\x02mkdocs-url:([^\x03]*)\x03')
+
+
+class _PlaceholderURLContext(URLContext):
+
+    def make_relative(self, url):
+        return URL_PLACEHOLDER % url
+
+
+class NavFragments(object):
+    """
+    Renders the navigation templates of the builtin themes only once for each
+    item which isn't active, rather than once per page.
+
+    The templates render a single item of the navigation, along with all of
+    its children, and are included once per item. When an item doesn't
+    contain the current page, the HTML only differs between pages in the
+    URLs. These are rendered as placeholders and replaced with the URLs
+    relative to each page.
+    """
+
+    # The templates, relative to the MkDocs package, which render an item.
+    # Unless the item is active, they only use `page` to compare it with the
+    # item, so the output doesn't depend on it.
+    templates = [
+        os.path.join('themes', 'mkdocs', 'nav-sub.html'),
+        os.path.join('themes', 'readthedocs', 'nav.html'),
+    ]
+
+    def __init__(self):
+        self._fragments = {}
+        self._views = {}
+
+    def wrap(self, template, path):
+        """
+        Cache the output of the template when it renders a navigation item,
+        if it is one of the `templates` at `path`.
+        """
+        if path not in self.templates:
+            return
+
+        with io.open(template.filename, 'r', encoding='utf-8') as f:
+            ast = template.environment.parse(f.read())
+        # Any other variables used by the template are part of the key.
+        variables = jinja2.meta.find_undeclared_variables(ast)
+        variables = sorted(variables - set(['nav', 'nav_item', 'page']))
+        render = template.root_render_func
+
+        def root_render_func(context):
+            fragment = self._render(template, render, variables, context)
+            if fragment is None:
+                for event in render(context):
+                    yield event
+            else:
+                yield fragment
+
+        template.root_render_func = root_render_func
+
+    def _placeholder_view(self, site_navigation):
+        key = id(site_navigation)
+        if key not in self._views:
+            self._views[key] = NavigationView(
+                site_navigation, url_context=_PlaceholderURLContext())
+        return self._views[key]
+
+    def _render(self, template, render, variables, context):
+        view = context.get('nav')
+        nav_item = context.get('nav_item')
+        if not (isinstance(view, NavigationView) and isinstance(nav_item, ItemView)):
+            return None
+        if nav_item.active:
+            return None
+
+        key = [template.filename, id(view.site_navigation), id(nav_item.item)]
+        for name in variables:
+            key.append(context.get(name))
+        try:
+            key = tuple(key)
+            fragment = self._fragments.get(key)
+        except TypeError:
+            # A variable can't be part of the key.
+            return None
+
+        if fragment is None:
+            placeholder_view = self._placeholder_view(view.site_navigation)
+            placeholder_context = template.new_context(dict(
+                context.get_all(),
+                nav=placeholder_view,
+                nav_item=placeholder_view.wrap(nav_item.item)
+            ), shared=True)
+            fragment = ''.join(render(placeholder_context))
+            self._fragments[key] = fragment
+
+        page_urls = view.page_urls
+        make_relative = view.url_context.make_relative
+
+        def replace(match):
+            url = match.group(1)
+            if url in page_urls:
+                return page_urls[url]
+            return make_relative(url)
+
+        return URL_PLACEHOLDER_RE.sub(replace, fragment)
+
+
 class Page(object):
+    __slots__ = ('title', 'abs_url', 'active', 'url_context', 'update_date',
+                 'input_path', 'output_path', 'previous_page', 'next_page',
+                 'ancestors', 'canonical_url', 'edit_url', 'content', 'meta',
+                 'toc')
+
     def __init__(self, title, url, path, url_context):
 
         self.title = title
@@ -198,6 +595,18 @@ class Page(object):
         for ancestor in self.ancestors:
             ancestor.set_active(active)
 
+    def release_content(self):
+        """
+        Drop the rendered content and table of contents of the page once its
+        output is written, so they aren't kept for the rest of the build.
+
+        The build sets them on a view of the page, see `ItemView`, so this is
+        only needed by callers which render the page itself, for example with
+        `get_page_context`.
+        """
+        self.content = None
+        self.toc = None
+
     def set_canonical_url(self, base):
         if not base.endswith('/'):
             base += '/'
@@ -221,6 +630,8 @@ class Page(object):
 
 
 class Header(object):
+    __slots__ = ('title', 'children', 'active', 'ancestors')
+
     def __init__(self, title, children):
         self.title, self.children = title, children
         self.active = False
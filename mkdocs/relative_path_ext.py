@@ -40,44 +40,154 @@ from __future__ import unicode_literals
 
 import logging
 import os
+import re
 
 from markdown.extensions import Extension
 from markdown.treeprocessors import Treeprocessor
-from markdown.util import AMP_SUBSTITUTE
+from markdown.util import AMP_SUBSTITUTE, STX, ETX
 
 from mkdocs import utils
-from mkdocs.exceptions import MarkdownNotFound
+from mkdocs.exceptions import AnchorNotFound, MarkdownNotFound
 
 log = logging.getLogger(__name__)
 
 
-def _iter(node):
-    # TODO: Remove when dropping Python 2.6. Replace this
-    # function call with note.iter()
-    return [node] + node.findall('.//*')
+# The attribute holding the URL of each element which links to a file.
+_LINK_ATTRIBUTES = {'a': 'href', 'img': 'src'}
 
 
-def path_to_url(url, nav, strict):
+def _iter_links(node):
+    """
+    Yield the elements of the tree which link to a file, in document order,
+    along with the attribute holding the URL.
+    """
+    # TODO: Remove when dropping Python 2.6. Replace this with node.iter()
+    iterate = node.iter if hasattr(node, 'iter') else node.getiterator
+    for element in iterate():
+        key = _LINK_ATTRIBUTES.get(element.tag)
+        if key is not None:
+            yield element, key
+
+
+# When the links are resolved after the conversion, each URL which depends on
+# the page is replaced with a placeholder holding its index in the list of
+# links. See `RelativePathExtension`.
+LINK_PLACEHOLDER = STX + 'mkdocs-link:%d' + ETX
+LINK_PLACEHOLDER_RE = re.compile(STX + r'mkdocs-link:(\d+)' + ETX)
+
+
+def is_relative_url(url):
+    """
+    Return True if the URL is a local link, which `path_to_url` rewrites.
+    """
+    parts, target_file = _parse_link(url)
+    return parts is not None
 
-    scheme, netloc, path, params, query, fragment = (
-        utils.urlparse(url))
+
+def _escape_attrib(text):
+    # Escape the URL the same way Markdown serializes attribute values.
+    return (text.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def replace_link_placeholders(html, links, nav, strict):
+    """
+    Replace the link placeholders in the HTML with the URLs relative to the
+    current page of the site navigation.
+    """
+    def replace(match):
+        url = path_to_url(links[int(match.group(1))], nav, strict)
+        return _escape_attrib(url)
+
+    return LINK_PLACEHOLDER_RE.sub(replace, html)
+
+
+def _parse_link(url, file_context=None):
+    """
+    Return the parsed URL and, for links to Markdown files, the path of the
+    target file relative to the docs dir, given the file context of the
+    current page. The parsed URL is None unless `path_to_url` rewrites it.
+    """
+    parts = utils.urlparse(url)
+    scheme, netloc, path, params, query, fragment = parts
 
     if scheme or netloc or not path or AMP_SUBSTITUTE in url:
         # Ignore URLs unless they are a relative link to a markdown file.
         # AMP_SUBSTITUTE is used internally by Markdown only for email,which is
         # not a relative link. As urlparse errors on them, skip explicitly
+        return None, None
+
+    if file_context is None or not utils.is_markdown_file(path):
+        return parts, None
+
+    target_file = file_context.make_absolute(path)
+    if target_file.startswith(os.path.sep):
+        target_file = target_file[1:]
+    return parts, target_file
+
+
+class LinkCache(object):
+    """
+    A cache of the links parsed by `path_to_url`, keyed by the directory of
+    the current page and the URL as written. The pages of a directory often
+    link to the same pages, and `mkdocs serve` resolves the links of every
+    page again for each build, even when the HTML of the page is cached.
+
+    Only the parsing and the path of the target file are cached, so broken
+    links are still reported for every page containing them. The number of
+    hits and misses is counted. Once the cache holds `maxsize` links, it is
+    cleared.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._links = {}
+
+    def __len__(self):
+        return len(self._links)
+
+    def get(self, file_context, url):
+        key = (file_context.base_path, url)
+        try:
+            link = self._links[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            return link
+
+        if len(self._links) >= self.maxsize:
+            self._links.clear()
+        link = self._links[key] = _parse_link(url, file_context)
+        return link
+
+    def clear(self):
+        self._links.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+resolved_links = LinkCache()
+
+
+def path_to_url(url, nav, strict):
+
+    if nav:
+        parts, target_file = resolved_links.get(nav.file_context, url)
+    else:
+        parts, target_file = _parse_link(url)
+
+    if parts is None:
         return url
+    scheme, netloc, path, params, query, fragment = parts
 
-    if nav and not utils.is_markdown_file(path):
+    if nav and target_file is None:
         path = utils.create_relative_media_url(nav, path)
     elif nav:
         # If the site navigation has been provided, then validate
         # the internal hyperlink, making sure the target actually exists.
-        target_file = nav.file_context.make_absolute(path)
-
-        if target_file.startswith(os.path.sep):
-            target_file = target_file[1:]
-
         if target_file not in nav.source_files:
             source_file = nav.file_context.current_file
             msg = (
@@ -103,29 +213,126 @@ def path_to_url(url, nav, strict):
     return url
 
 
+def fragment_links(links, file_context):
+    """
+    Return the target file and the fragment of each of the links which point
+    to an anchor of a Markdown file, given the file context of the page they
+    are on. Each link is only returned once.
+    """
+    found = []
+    seen = set()
+    for url in links:
+        parts, target_file = resolved_links.get(file_context, url)
+        if target_file is None or not parts.fragment:
+            continue
+        link = (target_file, parts.fragment)
+        if link not in seen:
+            seen.add(link)
+            found.append(link)
+    return found
+
+
+# The start tags of HTML, and the attributes of a tag which name an anchor.
+_START_TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)(\s[^>]*)>')
+_ANCHOR_ATTRIBUTE_RE = re.compile(
+    r'\s(id|name)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.IGNORECASE)
+
+
+def page_anchors(html, tree=None):
+    """
+    Return the anchors of a page, which a URL fragment can point to: the `id`
+    of any element and the `name` of any `a` element. They are collected from
+    the element tree of the page if given, see `MarkdownConverter`, or else
+    from the start tags of its HTML, which also holds any raw HTML.
+    """
+    anchors = set()
+    if tree is not None:
+        # TODO: Remove when dropping Python 2.6. Replace this with tree.iter()
+        iterate = tree.iter if hasattr(tree, 'iter') else tree.getiterator
+        for element in iterate():
+            anchors.add(element.get('id'))
+            if element.tag == 'a':
+                anchors.add(element.get('name'))
+    else:
+        for match in _START_TAG_RE.finditer(html):
+            tag = match.group(1).lower()
+            for attribute in _ANCHOR_ATTRIBUTE_RE.finditer(match.group(2)):
+                key = attribute.group(1).lower()
+                if key == 'id' or tag == 'a':
+                    anchors.add(attribute.group(2) or attribute.group(3) or attribute.group(4))
+    anchors.discard(None)
+    anchors.discard('')
+    return anchors
+
+
+class AnchorIndex(object):
+    """
+    The anchors of every page of the site, see `page_anchors`, and the links
+    of every page to the anchors of other pages, see `fragment_links`.
+
+    Once all pages are added, the links are checked against the anchors in
+    one go, rather than parsing the HTML of the built site again.
+    """
+
+    def __init__(self):
+        self.anchors = {}
+        self.links = []
+
+    def add_page(self, input_path, anchors, links):
+        self.anchors[input_path] = set(anchors)
+        self.links.extend((input_path, target_file, fragment)
+                          for target_file, fragment in links)
+
+    def broken_links(self):
+        """
+        Return the source file, the target file and the fragment of each link
+        to an anchor which isn't in the target file. Links to files which
+        weren't added are ignored, as `path_to_url` reports them already.
+        """
+        return [(source_file, target_file, fragment)
+                for source_file, target_file, fragment in self.links
+                if target_file in self.anchors and
+                fragment not in self.anchors[target_file]]
+
+    def check(self, strict):
+        """
+        Report all broken links in a single message, which is raised as an
+        `AnchorNotFound` error in strict mode and logged as a warning
+        otherwise.
+        """
+        broken = self.broken_links()
+        if not broken:
+            return
+        msg = '\n'.join(
+            ['The following hyperlinks point to an anchor which is not in the linked page:'] +
+            ['  - "%s" links to "%s#%s"' % link for link in broken])
+        if strict:
+            raise AnchorNotFound(msg)
+        log.warning(msg)
+
+
 class RelativePathTreeprocessor(Treeprocessor):
 
-    def __init__(self, site_navigation, strict):
+    def __init__(self, site_navigation, strict, links=None):
         self.site_navigation = site_navigation
         self.strict = strict
+        self.links = links
 
     def run(self, root):
         """Update urls on anchors and images to make them relative
 
-        Iterates through the full document tree looking for specific
-        tags and then makes them relative based on the site navigation
+        Iterates lazily through the anchors and images of the document tree
+        and then makes them relative based on the site navigation
         """
 
-        for element in _iter(root):
-
-            if element.tag == 'a':
-                key = 'href'
-            elif element.tag == 'img':
-                key = 'src'
-            else:
-                continue
+        for element, key in _iter_links(root):
 
             url = element.get(key)
+            if self.links is not None:
+                if is_relative_url(url):
+                    element.set(key, LINK_PLACEHOLDER % len(self.links))
+                    self.links.append(url)
+                continue
             new_url = path_to_url(url, self.site_navigation, self.strict)
             element.set(key, new_url)
 
@@ -136,12 +343,24 @@ class RelativePathExtension(Extension):
     """
     The Extension class is what we pass to markdown, it then
     registers the Treeprocessor.
+
+    With `deferred` set, the links are not rewritten during the conversion.
+    Instead, they are collected in `links` and replaced with placeholders,
+    so the HTML doesn't depend on the page or the site navigation. The links
+    are then resolved with `replace_link_placeholders`.
     """
 
-    def __init__(self, site_navigation, strict):
+    def __init__(self, site_navigation, strict, deferred=False):
         self.site_navigation = site_navigation
         self.strict = strict
+        self.links = [] if deferred else None
 
     def extendMarkdown(self, md, md_globals):
-        relpath = RelativePathTreeprocessor(self.site_navigation, self.strict)
+        relpath = RelativePathTreeprocessor(self.site_navigation, self.strict,
+                                            self.links)
         md.treeprocessors.add("relpath", relpath, "_end")
+        md.registerExtension(self)
+
+    def reset(self):
+        if self.links is not None:
+            del self.links[:]
@@ -1,96 +1,237 @@
 from __future__ import unicode_literals
 
+import filecmp
+import gzip
+import io
 import json
-from mkdocs import utils
+import os
+import re
+
+from markdown import util as md_util
+
+from mkdocs import lunr_index, toc as toc_module, utils
 
 try:                                    # pragma: no cover
     from html.parser import HTMLParser  # noqa
 except ImportError:                     # pragma: no cover
     from HTMLParser import HTMLParser   # noqa
 
+# The search index is written without any whitespace to keep it small.
+JSON_SEPARATORS = (',', ':')
+
+# The search index, relative to the site_dir.
+INDEX_PATH = os.path.join('mkdocs', 'search_index.json')
+
+
+def _dumps(data):
+    return json.dumps(data, sort_keys=True, separators=JSON_SEPARATORS)
+
+
+def index_documents(entries):
+    """
+    Yield the documents to index for the entries of one or more pages.
+
+    In the compact format, the entry of a page only has the text before its
+    first section, and `sections` is the number of entries of its sections
+    which follow it. Their titles and text are added to the text of the page
+    again.
+    """
+    for position, entry in enumerate(entries):
+        count = entry.get('sections')
+        if count:
+            text = [entry['text']] if entry['text'] else []
+            for section in entries[position + 1:position + 1 + count]:
+                text.extend([section['title'], section['text']])
+            entry = dict(entry, text='\n'.join(text))
+        yield entry
+
+
+# The normalization steps which are functions of the lunr.js pipeline, and
+# the steps used unless others are given.
+_PIPELINE_STEPS = [('stop_words', 'stopWordFilter'), ('stem', 'stemmer')]
+DEFAULT_NORMALIZE = ('stop_words', 'stem')
+
+
+def normalize_text(text, steps):
+    """
+    Return the text of an entry as it is written to the search index, given
+    the normalization steps. `whitespace` collapses each run of whitespace
+    into a single space. The other steps only apply to the terms of the
+    prebuilt lunr.js index, see `index_pipeline`, so the text is left as is.
+    """
+    if 'whitespace' in steps:
+        return ' '.join(text.split())
+    return text
+
+
+def index_pipeline(steps):
+    """
+    Return the lunr.js pipeline of the prebuilt index, given the normalization
+    steps. The tokens are always trimmed, and `stop_words` removes the common
+    words and `stem` replaces each word with its stem. The pipeline is stored
+    in the index, so lunr.js runs the queries through the same functions.
+    """
+    return lunr_index.load_pipeline(
+        ['trimmer'] + [name for step, name in _PIPELINE_STEPS if step in steps])
+
+
+def _output_entry(entry, normalize, text_length):
+    """
+    Return the entry as it is written to the search index, with its text
+    normalized by the steps of `normalize`, see `normalize_text`, and cut to
+    `text_length` characters, unless it is None.
+    """
+    text = normalize_text(entry['text'], normalize)
+    if text_length is not None:
+        text = text[:text_length]
+    if text != entry['text']:
+        entry = dict(entry, text=text)
+    return entry
+
 
 class SearchIndex(object):
     """
     Search index is a collection of pages and sections (heading
     tags and their following content are sections).
+
+    When `compact` is True, the entry of a page refers to the entries of its
+    sections rather than repeating their text, see `index_documents`. The text of
+    each entry in the generated index is normalized by the steps of
+    `normalize`, see `normalize_text`, and cut to `text_length` characters,
+    unless it is None. The full text is indexed either way, with the pipeline
+    of `index_pipeline`. The text of the HTML tags in `exclude_tags` isn't
+    part of the entries at all.
     """
 
-    def __init__(self):
+    def __init__(self, compact=False, text_length=None, normalize=DEFAULT_NORMALIZE,
+                 exclude_tags=()):
         self._entries = []
+        self.compact = compact
+        self.text_length = text_length
+        self.normalize = normalize
+        self.exclude_tags = exclude_tags
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def extend(self, entries):
+        """
+        Add entries which were created by another index, for example in a
+        build worker process.
+        """
+        self._entries.extend(entries)
 
     def _find_toc_by_id(self, toc, id_):
         """
-        Given a table of contents and HTML ID, iterate through
-        and return the matched item in the TOC.
+        Given a table of contents and HTML ID, return the matched
+        item in the TOC.
         """
-        for toc_item in toc:
-            if toc_item.url[1:] == id_:
-                return toc_item
-            toc_item_r = self._find_toc_by_id(toc_item.children, id_)
-            if toc_item_r is not None:
-                return toc_item_r
+        anchors = getattr(toc, 'anchors', None)
+        if anchors is None:
+            anchors = toc_module.anchor_map(toc)
+        return anchors.get(id_)
 
     def _add_entry(self, title, text, loc):
         """
-        A simple wrapper to add an entry and ensure the contents
-        is UTF8 encoded.
+        A simple wrapper to add an entry and return it.
         """
-        self._entries.append({
+        entry = {
             'title': title,
-            'text': utils.text_type(text.strip().encode('utf-8'), encoding='utf-8'),
+            'text': text.strip(),
             'location': loc
-        })
+        }
+        self._entries.append(entry)
+        return entry
 
-    def add_entry_from_context(self, page, content, toc):
+    def add_entry_from_context(self, page, content, toc, tree=None):
         """
         Create a set of entries in the index for a page. One for
         the page itself and then one for each of its' heading
         tags.
+
+        If the element `tree` Python-Markdown built for the content is given,
+        the text is taken from it rather than parsing the HTML again.
         """
 
-        # Create the content parser and feed in the HTML for the
-        # full page. This handles all the parsing and prepares
-        # us to iterate through it.
-        parser = ContentParser()
-        parser.feed(content)
-        parser.close()
+        # Create the content parser and feed in the full page. This
+        # collects the text of the page and its sections in a single pass.
+        parser = None
+        if tree is not None:
+            parser = ContentParser(exclude_tags=self.exclude_tags)
+            if not parser.feed_tree(tree):
+                parser = None
+        if parser is None:
+            parser = ContentParser(exclude_tags=self.exclude_tags)
+            parser.feed(content)
+            parser.close()
 
         # Get the absolute URL for the page, this is then
         # prepended to the urls of the sections
         abs_url = page.abs_url
 
-        # Create an entry for the full page.
-        self._add_entry(
-            title=page.title,
-            text=self.strip_tags(content).rstrip('\n'),
-            loc=abs_url
-        )
+        # The sections are looked up by their ID in the table of contents.
+        if not isinstance(toc, toc_module.TableOfContents):
+            toc = toc_module.TableOfContents('', items=list(toc))
 
+        if not self.compact:
+            # Create an entry for the full page.
+            self._add_entry(
+                title=page.title,
+                text='\n'.join(parser.text).rstrip('\n'),
+                loc=abs_url
+            )
+            for section in parser.data:
+                self.create_entry_for_section(section, toc, abs_url)
+            return
+
+        # The page entry only keeps the text which isn't in the entry of a
+        # section.
+        page_entry = self._add_entry(title=page.title, text='', loc=abs_url)
+        count = len(self._entries)
+        text = list(parser.preface)
         for section in parser.data:
-            self.create_entry_for_section(section, toc, abs_url)
+            if not self.create_entry_for_section(section, toc, abs_url):
+                text.append(section.title or '')
+                text.extend(section.text)
+        page_entry['text'] = '\n'.join(text).strip()
+        page_entry['sections'] = len(self._entries) - count
 
     def create_entry_for_section(self, section, toc, abs_url):
         """
         Given a section on the page, the table of contents and
         the absolute url for the page create an entry in the
-        index
+        index. Return the entry, or None if the section isn't in the
+        table of contents.
         """
 
         toc_item = self._find_toc_by_id(toc, section.id)
 
         if toc_item is not None:
-            self._add_entry(
+            return self._add_entry(
                 title=toc_item.title,
                 text=u" ".join(section.text),
                 loc=abs_url + toc_item.url
             )
 
+    def generate_lunr_index(self):
+        """
+        Return the entries as a prebuilt lunr.js index, so they don't need to
+        be indexed by every browser which loads the search.
+        """
+        index = lunr_index.Index(index_pipeline(self.normalize))
+        for doc in index_documents(self._entries):
+            index.add(doc)
+        return index.to_json()
+
     def generate_search_index(self):
         """python to json conversion"""
         page_dicts = {
-            'docs': self._entries,
+            'docs': [_output_entry(entry, self.normalize, self.text_length)
+                     for entry in self._entries],
+            'index': self.generate_lunr_index(),
         }
-        return json.dumps(page_dicts, sort_keys=True, indent=4)
+        return _dumps(page_dicts)
 
     def strip_tags(self, html):
         """strip html tags from data"""
@@ -99,6 +240,285 @@ class SearchIndex(object):
         return s.get_data()
 
 
+class SearchIndexWriter(object):
+    """
+    Writes the search index to a file while the entries are added, for
+    example as each page is built, so the text of all entries isn't kept in
+    memory. Memory use isn't bounded though: the prebuilt lunr.js index,
+    with the frequency of every term in every entry, is kept until it is
+    written last, so it grows with the number of entries and terms.
+
+    The output is the same as that of `SearchIndex.generate_search_index` for
+    the same entries, `text_length` and `normalize`. It is written to a
+    temporary file first, which only replaces the index file when it differs.
+    """
+
+    def __init__(self, output_path, text_length=None, normalize=DEFAULT_NORMALIZE):
+        self.output_path = output_path
+        self.text_length = text_length
+        self.normalize = normalize
+        self._index = lunr_index.Index(index_pipeline(normalize))
+        self._file = None
+        self._temp_path = None
+        self._count = 0
+
+    def _open(self):
+        output_dir = os.path.dirname(self.output_path)
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        self._temp_path = self.output_path + '.tmp'
+        self._file = io.open(self._temp_path, 'wb')
+        self._write('{"docs":[')
+
+    def _write(self, data):
+        self._file.write(data.encode('utf-8'))
+
+    def extend(self, entries):
+        """
+        Add the entries of one or more pages and write them to the file.
+        """
+        if self._file is None:
+            self._open()
+        for entry, doc in zip(entries, index_documents(entries)):
+            if self._count:
+                self._write(',')
+            self._write(_dumps(_output_entry(entry, self.normalize, self.text_length)))
+            self._index.add(doc)
+            self._count += 1
+
+    def close(self):
+        """
+        Finish writing the search index. Return True if the file was written
+        and False if it was unchanged.
+        """
+        if self._file is None:
+            self._open()
+        self._write('],"index":')
+        self._write(_dumps(self._index.to_json()))
+        self._write('}')
+        self._file.close()
+        self._file = None
+        self._index = None
+
+        temp_path, self._temp_path = self._temp_path, None
+        if os.path.isfile(self.output_path) and filecmp.cmp(temp_path, self.output_path, shallow=False):
+            os.remove(temp_path)
+            return False
+        if os.path.exists(self.output_path):
+            # On Windows, a file can't be renamed to an existing path.
+            os.remove(self.output_path)
+        os.rename(temp_path, self.output_path)
+        return True
+
+    def discard(self):
+        """
+        Stop writing the search index, leaving any existing file as it is.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._temp_path is not None:
+            os.remove(self._temp_path)
+            self._temp_path = None
+
+
+def _gzip_size(path):
+    """
+    Return the size of the file at `path` after compressing it with gzip.
+    """
+    output = io.BytesIO()
+    compressed = gzip.GzipFile(fileobj=output, mode='wb')
+    with io.open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            compressed.write(chunk)
+    compressed.close()
+    return len(output.getvalue())
+
+
+class SearchIndexReport(object):
+    """
+    Statistics of a search index written by MkDocs: its size in bytes, also
+    after gzip, the number of entries, the size of the vocabulary of the
+    prebuilt lunr.js index and the pages and sections with the most text.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.bytes = os.path.getsize(path)
+        with io.open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.docs_bytes = len(_dumps(data['docs']).encode('utf-8'))
+        self.index_bytes = len(_dumps(data.get('index')).encode('utf-8'))
+        self.vocabulary = len(data.get('index', {}).get('corpusTokens', []))
+        # The location of a section has the anchor of its heading.
+        self.pages = []
+        self.sections = []
+        for entry in data['docs']:
+            size = (entry['location'], len(entry['text'].encode('utf-8')))
+            if '#' in entry['location']:
+                self.sections.append(size)
+            else:
+                self.pages.append(size)
+        self._gzip_bytes = None
+
+    @property
+    def gzip_bytes(self):
+        if self._gzip_bytes is None:
+            self._gzip_bytes = _gzip_size(self.path)
+        return self._gzip_bytes
+
+    def _largest(self, sizes, count):
+        return [{'location': location, 'bytes': size} for location, size in
+                sorted(sizes, key=lambda item: (-item[1], item[0]))[:count]]
+
+    def report(self, count=10):
+        return {
+            'bytes': self.bytes,
+            'gzip_bytes': self.gzip_bytes,
+            'docs_bytes': self.docs_bytes,
+            'index_bytes': self.index_bytes,
+            'entries': len(self.pages) + len(self.sections),
+            'pages': len(self.pages),
+            'sections': len(self.sections),
+            'vocabulary': self.vocabulary,
+            'largest_pages': self._largest(self.pages, count),
+            'largest_sections': self._largest(self.sections, count),
+        }
+
+    def summary(self, count=10):
+        """
+        Return the report as a list of lines.
+        """
+        report = self.report(count)
+        lines = [
+            'Search index: {0}'.format(self.path),
+            '{0:<30} {1:>12}'.format('Size (bytes)', report['bytes']),
+            '{0:<30} {1:>12}'.format('Size after gzip (bytes)', report['gzip_bytes']),
+            '{0:<30} {1:>12}'.format('Documents (bytes)', report['docs_bytes']),
+            '{0:<30} {1:>12}'.format('Prebuilt index (bytes)', report['index_bytes']),
+            '{0:<30} {1:>12}'.format('Entries', report['entries']),
+            '{0:<30} {1:>12}'.format('Pages', report['pages']),
+            '{0:<30} {1:>12}'.format('Sections', report['sections']),
+            '{0:<30} {1:>12}'.format('Vocabulary (terms)', report['vocabulary']),
+        ]
+        for title, key in (('pages', 'largest_pages'), ('sections', 'largest_sections')):
+            lines.append('')
+            lines.append('Largest {0} {1} by text (bytes):'.format(len(report[key]), title))
+            for item in report[key]:
+                lines.append('{0:>12}  {1}'.format(item['bytes'], item['location']))
+        return lines
+
+
+# The manifest of the search index, relative to which the search.js of the
+# builtin themes finds the index files.
+MANIFEST_PATH = os.path.join('mkdocs', 'search', 'manifest.json')
+
+MANIFEST_VERSION = 1
+
+
+def shard_key(term):
+    """
+    Return the first character of a term, which names the shard the term is
+    in. A character outside the Basic Multilingual Plane is a surrogate pair
+    in JavaScript, as on narrow builds of Python 2, so it is kept whole the
+    same way as the search.js of the builtin themes does.
+    """
+    if '\ud800' <= term[0] <= '\udbff' and len(term) > 1:
+        return term[:2]
+    return term[0]
+
+
+def generate_manifest():
+    """
+    Return the manifest of a search index which isn't sharded, which points
+    to the whole index.
+    """
+    return _dumps({'version': MANIFEST_VERSION, 'index': '../search_index.json'})
+
+
+class ShardedSearchIndexWriter(object):
+    """
+    Writes the search index as shards, so a browser only fetches the parts
+    of the index which a query needs.
+
+    Each term is kept in the shard of its first character, see `shard_key`,
+    along with the documents which contain it and the frequency of the term
+    in each of them, as in the prebuilt lunr.js index. A query term and all terms it is
+    a prefix of are therefore in the same shard. The title, location and a
+    summary of the documents are written in chunks of `docs_per_chunk`, so
+    only the chunks of the documents in the results are fetched. The
+    manifest lists the shards, the number of documents and the pipeline of
+    the terms, see `index_pipeline`.
+
+    The chunks of documents are written while the entries are added, but the
+    terms of all of them and the prebuilt lunr.js index are kept in memory
+    until the shards are written, so memory use grows with the size of the
+    site.
+    """
+
+    docs_per_chunk = 500
+    summary_length = 200
+
+    def __init__(self, output_dir, normalize=DEFAULT_NORMALIZE):
+        self.output_dir = output_dir
+        self.outputs = {}
+        self._index = lunr_index.Index(index_pipeline(normalize))
+        self._postings = {}
+        self._docs = []
+        self._count = 0
+
+    def _write(self, name, data):
+        output_path = os.path.join(self.output_dir, name)
+        self.outputs[output_path] = utils.write_file(
+            _dumps(data).encode('utf-8'), output_path, skip_unchanged=True)
+
+    def _write_docs(self):
+        chunk = (self._count - 1) // self.docs_per_chunk
+        self._write('docs-{0}.json'.format(chunk), self._docs)
+        self._docs = []
+
+    def extend(self, entries):
+        """
+        Add the entries of one or more pages.
+        """
+        for doc in index_documents(entries):
+            self._docs.append({
+                'title': doc['title'],
+                'location': doc['location'],
+                'summary': doc['text'][:self.summary_length],
+            })
+            for term, tf in self._index.term_frequencies(doc):
+                self._postings.setdefault(term, []).append([self._count, round(tf, 4)])
+            self._count += 1
+            if len(self._docs) == self.docs_per_chunk:
+                self._write_docs()
+
+    def close(self):
+        """
+        Write the shards and the manifest. Return a dictionary of the paths of
+        the files, with True if a file was written and False if it was
+        unchanged.
+        """
+        if self._docs:
+            self._write_docs()
+
+        shards = {}
+        for term, postings in self._postings.items():
+            shards.setdefault(shard_key(term), {})[term] = postings
+        self._postings = None
+        for key, terms in shards.items():
+            self._write('terms-{0}.json'.format(key), terms)
+
+        self._write('manifest.json', {
+            'version': MANIFEST_VERSION,
+            'docs': {'count': self._count, 'chunk_size': self.docs_per_chunk},
+            'shards': sorted(shards),
+            'pipeline': [name for name, _ in self._index.pipeline],
+        })
+        return self.outputs
+
+
 class HTMLStripper(HTMLParser):
     """
     A simple HTML parser that stores all of the data within tags
@@ -142,26 +562,91 @@ class ContentSection(object):
         ])
 
 
+_escaped_re = re.compile(r'%s(\d+)%s' % (md_util.STX, md_util.ETX))
+
+
+def _unescape(match):
+    char = md_util.int2str(int(match.group(1)))
+    if char in '<&':
+        # This would be markup in the HTML.
+        raise ValueError(char)
+    return char
+
+
 class ContentParser(HTMLParser):
     """
     Given a block of HTML, group the content under the preceding
     heading tags which can then be used for creating an index
-    for that section.
+    for that section. The text of the whole block is collected
+    at the same time.
     """
 
     def __init__(self, *args, **kwargs):
 
+        # The text within these tags is skipped.
+        self.exclude_tags = frozenset(kwargs.pop('exclude_tags', ()))
+
         # HTMLParser is a old-style class in Python 2, so
         # super() wont work here.
         HTMLParser.__init__(self, *args, **kwargs)
 
         self.data = []
+        self.text = []
+        self.preface = []
         self.section = None
         self.is_header_tag = False
+        self.excluded = 0
+        # The text since the previous tag, see `handle_data`.
+        self._pending = []
+
+    def feed_tree(self, root):
+        """
+        Feed the element tree Python-Markdown built, rather than the HTML
+        it serialized. The root element itself isn't part of the content.
+
+        Return False if the tree contains placeholders of Python-Markdown,
+        which are only replaced in the HTML. The parser must not be used
+        then.
+        """
+        try:
+            self._feed_text(root.text)
+            for child in root:
+                self._feed_element(child)
+        except ValueError:
+            return False
+        self._flush()
+        return True
+
+    def close(self):
+        HTMLParser.close(self)
+        self._flush()
+
+    def _feed_text(self, text):
+        if text:
+            if md_util.STX in text:
+                text = _escaped_re.sub(_unescape, text)
+                if md_util.STX in text:
+                    raise ValueError(text)
+            self.handle_data(text)
+
+    def _feed_element(self, element):
+        # Comments and processing instructions don't have a tag name.
+        if isinstance(element.tag, utils.string_types):
+            self.handle_starttag(element.tag, list(element.items()))
+            self._feed_text(element.text)
+            for child in element:
+                self._feed_element(child)
+            self.handle_endtag(element.tag)
+        self._feed_text(element.tail)
 
     def handle_starttag(self, tag, attrs):
         """Called at the start of every HTML tag."""
 
+        self._flush()
+        if tag in self.exclude_tags:
+            self.excluded += 1
+            return
+
         # We only care about the opening tag for headings.
         if tag not in (["h%d" % x for x in range(1, 7)]):
             return
@@ -179,22 +664,50 @@ class ContentParser(HTMLParser):
     def handle_endtag(self, tag):
         """Called at the end of every HTML tag."""
 
+        self._flush()
+        if tag in self.exclude_tags:
+            self.excluded = max(0, self.excluded - 1)
+            return
+
         # We only care about the opening tag for headings.
         if tag not in (["h%d" % x for x in range(1, 7)]):
             return
 
         self.is_header_tag = False
 
+    def handle_entityref(self, name):
+        # Only called where HTMLParser doesn't convert references, as on Python 2.
+        self.handle_data(self.unescape('&%s;' % name))
+
+    def handle_charref(self, name):
+        # Only called where HTMLParser doesn't convert references, as on Python 2.
+        self.handle_data(self.unescape('&#%s;' % name))
+
     def handle_data(self, data):
         """
-        Called for the text contents of each tag.
+        Called for the text contents of each tag. On Python 2, the text
+        between two tags can be split in several parts, around the entity and
+        character references, so it is joined again before it is handled.
         """
+        self._pending.append(data)
+
+    def _flush(self):
+        if self._pending:
+            data = ''.join(self._pending)
+            del self._pending[:]
+            self._handle_text(data)
+
+    def _handle_text(self, data):
+        if self.excluded:
+            return
+
+        self.text.append(data)
 
         if self.section is None:
             # This means we have some content at the start of the
-            # HTML before we reach a heading tag. We don't actually
-            # care about that content as it will be added to the
-            # overall page entry in the search. So just skip it.
+            # HTML before we reach a heading tag. It is only part of
+            # the overall page entry in the search.
+            self.preface.append(data)
             return
 
         # If this is a header, then the data is the title.
@@ -0,0 +1,173 @@
+# coding: utf-8
+
+"""
+Answers queries on the search index of a built site in Python, for example to
+serve search results to clients without JavaScript, see `mkdocs serve`.
+
+When `mkdocs/search_index.json` is loaded, the terms of each document are
+taken from its prebuilt lunr.js index, which is built from the full text of
+the pages, rather than from the text of the documents, which may be cut by
+`search_text_length`. The terms are the
+same as those of the lunr.js index the builtin themes search, and like
+lunr.js, a query term also matches the terms it is a prefix of and documents
+must match every term of a query. The results are ranked with Okapi BM25
+rather than the tf-idf of lunr.js.
+"""
+
+from __future__ import division, unicode_literals
+
+import bisect
+import io
+import json
+import math
+
+from mkdocs import lunr_index, search
+
+
+class SearchEngine(object):
+    """
+    An inverted index of the documents of a search index, see
+    `SearchIndex.generate_search_index`. Both the full and the compact format
+    are supported.
+
+    The title of a document counts `title_boost` times, like the boost of the
+    title field in lunr.js.
+
+    If the prebuilt lunr.js `index` of the documents is given, the terms of
+    each document and their frequency are taken from it rather than from the
+    text of the documents. The frequencies are then those of lunr.js, which
+    are weighted by the boost of each field and relative to its length, and
+    the length of a document is its number of distinct terms. The terms of
+    the queries are normalized with the pipeline of the index.
+    """
+
+    k1 = 1.2
+    b = 0.75
+    title_boost = 10
+    summary_length = 200
+
+    def __init__(self, docs, index=None):
+        self.docs = []
+        self._index = lunr_index.Index()
+        self._postings = {}
+        self._lengths = []
+
+        if index is None:
+            self._add_documents(docs)
+        else:
+            self._load_index(docs, index)
+
+        self._terms = sorted(self._postings)
+        self._average_length = sum(self._lengths) / (len(self._lengths) or 1)
+
+    def _add_documents(self, docs):
+        for position, doc in enumerate(search.index_documents(docs)):
+            self.docs.append(doc)
+            counts = {}
+            title_terms = self._index.terms(doc['title'])
+            text_terms = self._index.terms(doc['text'])
+            for term in title_terms:
+                counts[term] = counts.get(term, 0) + self.title_boost
+            for term in text_terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                self._postings.setdefault(term, []).append((position, count))
+            self._lengths.append(len(title_terms) * self.title_boost + len(text_terms))
+
+    def _load_index(self, docs, index):
+        # The queries are run through the pipeline of the index.
+        self._index = lunr_index.Index(lunr_index.load_pipeline(index['pipeline']))
+
+        # lunr.js refers to the documents by their location, and like
+        # `lunr.Index.add`, a document replaces any earlier one with the same
+        # location.
+        positions = {}
+        for doc in search.index_documents(docs):
+            if doc['location'] in positions:
+                self.docs[positions[doc['location']]] = doc
+            else:
+                positions[doc['location']] = len(self.docs)
+                self.docs.append(doc)
+
+        store = index['documentStore']['store']
+        self._lengths = [len(store.get(doc['location'], ())) for doc in self.docs]
+
+        nodes = [('', index['tokenStore']['root'])]
+        while nodes:
+            prefix, node = nodes.pop()
+            for key, child in node.items():
+                if key == 'docs':
+                    continue
+                term = prefix + key
+                postings = [(positions[ref], child['docs'][ref]['tf'])
+                            for ref in sorted(child['docs']) if ref in positions]
+                if postings:
+                    self._postings[term] = postings
+                nodes.append((term, child))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the documents of the search index at `path`, along with its
+        prebuilt lunr.js index.
+        """
+        with io.open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['docs'], data.get('index'))
+
+    def _expand(self, query_term):
+        """
+        Yield the terms of the index which start with the query term.
+        """
+        position = bisect.bisect_left(self._terms, query_term)
+        while position < len(self._terms) and self._terms[position].startswith(query_term):
+            yield self._terms[position]
+            position += 1
+
+    def _score(self, query_term):
+        """
+        Return a dict of the score of each document matching a query term.
+        """
+        count = len(self.docs)
+        scores = {}
+        for term in self._expand(query_term):
+            # Longer terms which start with the query term count less.
+            similarity = 1
+            if term != query_term:
+                similarity = 1 / math.log(max(3, len(term) - len(query_term)))
+            postings = self._postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                norm = 1 - self.b + self.b * self._lengths[doc] / self._average_length
+                score = idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                scores[doc] = scores.get(doc, 0) + score * similarity
+        return scores
+
+    def search(self, query, limit=None):
+        """
+        Return the documents matching all terms of the query, best first, as a
+        list of dicts with the title, location, a summary and the score of
+        each. At most `limit` documents are returned, unless it is None.
+        """
+        scores = None
+        for query_term in set(self._index.terms(query)):
+            term_scores = self._score(query_term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = dict((doc, score + term_scores[doc])
+                              for doc, score in scores.items() if doc in term_scores)
+            if not scores:
+                return []
+        if scores is None:
+            return []
+
+        ranked = sorted(scores, key=lambda doc: (-scores[doc], doc))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [{
+            'title': self.docs[doc]['title'],
+            'location': self.docs[doc]['location'],
+            'summary': self.docs[doc]['text'][:self.summary_length],
+            'score': round(scores[doc], 4),
+        } for doc in ranked]
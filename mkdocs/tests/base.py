@@ -10,7 +10,7 @@ def dedent(text):
 
 
 def markdown_to_toc(markdown_source):
-    md = markdown.Markdown(extensions=['toc'])
+    extension = toc.TableOfContentsExtension()
+    md = markdown.Markdown(extensions=['toc', extension])
     md.convert(markdown_source)
-    toc_output = md.toc
-    return toc.TableOfContents(toc_output)
+    return extension.table_of_contents()
@@ -6,6 +6,7 @@ import os
 import shutil
 import tempfile
 import unittest
+import markdown
 import mock
 
 try:
@@ -15,9 +16,9 @@ except ImportError:
     pass
 
 
-from mkdocs import nav, config
+from mkdocs import nav, config, relative_path_ext, search, timing
 from mkdocs.commands import build
-from mkdocs.exceptions import MarkdownNotFound
+from mkdocs.exceptions import AnchorNotFound, MarkdownNotFound, SearchIndexTooLarge
 from mkdocs.tests.base import dedent
 
 
@@ -105,6 +106,39 @@ class BuildTests(unittest.TestCase):
         html, toc, meta = build.convert_markdown(md_text, load_config())
         self.assertEqual(html.strip(), expected.strip())
 
+    def test_link_cache(self):
+        pages = [
+            'index.md',
+            'sub/first.md',
+            'sub/second.md',
+        ]
+        site_navigation = nav.SiteNavigation(pages)
+
+        expected_results = (
+            '<p><a href="sub/first/">Link</a></p>',
+            '<p><a href="./">Link</a></p>',
+            '<p><a href="../first/">Link</a></p>',
+        )
+
+        resolved_links = relative_path_ext.LinkCache()
+        with mock.patch('mkdocs.relative_path_ext.resolved_links', resolved_links):
+            for (page, expected) in zip(site_navigation.walk_pages(), expected_results):
+                md_text = '[Link](%s)' % ('sub/first.md' if page.input_path == 'index.md' else 'first.md')
+                html, _, _ = build.convert_markdown(md_text, load_config(), site_navigation=site_navigation)
+                self.assertEqual(html, expected)
+            # The pages of the same directory share the link.
+            self.assertEqual((resolved_links.hits, resolved_links.misses), (1, 2))
+
+            # Broken links are reported for each page containing them.
+            for page in site_navigation.walk_pages():
+                if page.input_path != 'index.md':
+                    self.assertRaises(MarkdownNotFound, build.convert_markdown, '[Link](missing.md)',
+                                      load_config({'strict': True}), site_navigation=site_navigation)
+            self.assertEqual((resolved_links.hits, resolved_links.misses), (2, 3))
+
+            resolved_links.clear()
+            self.assertEqual((resolved_links.hits, resolved_links.misses, len(resolved_links)), (0, 0, 0))
+
     def test_convert_internal_media(self):
         """Test relative image URL's are the same for different base_urls"""
         pages = [
@@ -201,6 +235,75 @@ class BuildTests(unittest.TestCase):
         html, toc, meta = build.convert_markdown(md_text, load_config(), site_navigation=site_navigation)
         self.assertEqual(html.strip(), expected.strip())
 
+    def test_convert_markdown_cached(self):
+        md_text = 'An [internal link](internal.md) to another document.'
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cfg = load_config({'cache_dir': cache_dir})
+            converter = build.get_converter(cfg)
+            site_navigation = nav.SiteNavigation(['index.md', 'internal.md', 'other.md'])
+            expected = []
+            for page in site_navigation.walk_pages():
+                expected.append(build.convert_markdown(
+                    md_text, cfg, site_navigation, converter)[0])
+
+            converter = build.get_converter(cfg)
+            with mock.patch.object(converter.md, 'convert') as mock_convert:
+                for i, page in enumerate(site_navigation.walk_pages()):
+                    html, toc, meta = build.convert_markdown(
+                        md_text, cfg, site_navigation, converter)
+                    self.assertEqual(html, expected[i])
+            self.assertFalse(mock_convert.called)
+            self.assertEqual(expected[2], '<p>An <a href="../internal/">internal link</a> to another document.</p>')
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_converter_reset(self):
+        converter = build.get_converter(load_config({'markdown_extensions': ['abbr']}))
+
+        html, toc, meta = build.convert_markdown(dedent("""
+            title: First
+
+            # Heading
+
+            *[HTML]: Hyper Text Markup Language
+            HTML [link](other.md)
+        """), load_config(), converter=converter)
+        self.assertEqual(meta, {'title': ['First']})
+        self.assertEqual(str(toc).strip(), 'Heading - #heading')
+        self.assertIn('<abbr title="Hyper Text Markup Language">HTML</abbr>', html)
+
+        html, toc, meta = build.convert_markdown('HTML [link](#anchor)', load_config(), converter=converter)
+        self.assertEqual(html, '<p>HTML <a href="#anchor">link</a></p>')
+        self.assertEqual(meta, {})
+        self.assertEqual(str(toc), '')
+
+    def test_converter_tree(self):
+        converter = build.get_converter(load_config())
+
+        html, toc, meta = converter.convert(dedent("""
+            Intro \\*text\\*
+
+            # Heading
+
+            Some *content* & `code <x>`.
+        """))
+        self.assertIsNotNone(converter.tree)
+
+        html_parser = search.ContentParser()
+        html_parser.feed(html)
+        html_parser.close()
+        tree_parser = search.ContentParser()
+        self.assertTrue(tree_parser.feed_tree(converter.tree))
+        # Only whitespace around the content differs.
+        self.assertEqual([(s.id, s.title, ' '.join(s.text).strip()) for s in tree_parser.data],
+                         [(s.id, s.title, ' '.join(s.text).strip()) for s in html_parser.data])
+        self.assertEqual('\n'.join(tree_parser.text).strip(), '\n'.join(html_parser.text).strip())
+
+        # Raw HTML is only inserted in the serialized HTML.
+        converter.convert('<div>Raw</div>\n\nText')
+        self.assertIsNone(converter.tree)
+
     def test_ignore_email_links(self):
         md_text = 'A <autolink@example.com> and an [link](mailto:example@example.com).'
         expected = ''.join([
@@ -369,6 +472,435 @@ class BuildTests(unittest.TestCase):
             shutil.rmtree(docs_dir)
             shutil.rmtree(site_dir)
 
+    @mock.patch.dict(os.environ, {'SOURCE_DATE_EPOCH': '123'})
+    def test_rebuild_skips_unchanged_files(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            for path in ['index.md', 'about.md', 'img.png']:
+                with open(os.path.join(docs_dir, path), 'w') as f:
+                    f.write('# Heading\n')
+            cfg = load_config({
+                'docs_dir': docs_dir,
+                'site_dir': site_dir
+            })
+            build.build(cfg)
+
+            site_files = []
+            for dirpath, dirnames, filenames in os.walk(site_dir):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    os.utime(path, (0, 0))
+                    site_files.append(path)
+            with open(os.path.join(site_dir, 'stale.html'), 'w') as f:
+                f.write('stale')
+            with open(os.path.join(docs_dir, 'about.md'), 'w') as f:
+                f.write('# Changed\n')
+
+            build.build(cfg)
+
+            changed = sorted(os.path.relpath(path, site_dir) for path in site_files
+                             if os.path.getmtime(path) != 0)
+            self.assertEqual(changed, [
+                '.mkdocs_build_state.json',
+                os.path.join('about', 'index.html'),
+                os.path.join('mkdocs', 'search_index.json'),
+            ])
+            self.assertFalse(os.path.exists(os.path.join(site_dir, 'stale.html')))
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
+    def test_rebuild_compares_media_files_by_stat(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(docs_dir, 'index.md'), 'w') as f:
+                f.write('# Heading\n')
+            with open(os.path.join(docs_dir, 'img.png'), 'w') as f:
+                f.write('image')
+            cfg = load_config({
+                'docs_dir': docs_dir,
+                'site_dir': site_dir
+            })
+            build.build(cfg)
+            self.assertAlmostEqual(os.path.getmtime(os.path.join(site_dir, 'img.png')),
+                                   os.path.getmtime(os.path.join(docs_dir, 'img.png')), places=3)
+
+            # The copies have the size and modification time of their source,
+            # so their content isn't read again. Only the search index, which
+            # is written again, is compared by content.
+            with mock.patch('filecmp._do_cmp', return_value=True) as mock_do_cmp:
+                build.build(cfg)
+            self.assertEqual([c[0][1] for c in mock_do_cmp.call_args_list],
+                             [os.path.join(site_dir, search.INDEX_PATH)])
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
+    def test_build_timer(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            for path in ['index.md', 'about.md']:
+                with open(os.path.join(docs_dir, path), 'w') as f:
+                    f.write('# Heading\n')
+            cfg = load_config({
+                'docs_dir': docs_dir,
+                'site_dir': site_dir
+            })
+            timer = timing.BuildTimer()
+            build.build(cfg, timer=timer)
+
+            self.assertEqual(sorted(timer.pages), ['about.md', 'index.md'])
+            for stage in ['media', 'templates', 'page', 'markdown', 'render',
+                          'write', 'search', 'search_index', 'clean']:
+                self.assertTrue(stage in timer.stages, stage)
+            self.assertEqual(sorted(timer.pages['index.md']),
+                             ['markdown', 'page', 'render', 'search', 'write'])
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
+    @mock.patch.dict(os.environ, {'SOURCE_DATE_EPOCH': '123'})
+    def test_nav_fragments_match_templates(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            pages = ['index.md', 'a/one.md', 'a/two.md', 'a/b/three.md', 'c/four.md']
+            for path in pages:
+                if not os.path.isdir(os.path.join(docs_dir, os.path.dirname(path))):
+                    os.makedirs(os.path.join(docs_dir, os.path.dirname(path)))
+                with open(os.path.join(docs_dir, path), 'w') as f:
+                    f.write('# Heading\n\n## Sub heading\n')
+            pages_config = [
+                {'Home': 'index.md'},
+                {'A': ['a/one.md', {'B': ['a/two.md', 'a/b/three.md']}]},
+                {'C': ['c/four.md']},
+            ]
+
+            def read_site():
+                site = {}
+                for path in pages:
+                    path = os.path.join(site_dir, os.path.splitext(path)[0], 'index.html')
+                    if path.endswith(os.path.join('index', 'index.html')):
+                        path = os.path.join(site_dir, 'index.html')
+                    with open(path, 'rb') as f:
+                        site[path] = f.read()
+                return site
+
+            fragments = []
+            render = nav.NavFragments._render
+
+            def spy_render(*args):
+                fragment = render(*args)
+                fragments.append(fragment)
+                return fragment
+
+            for theme in ['mkdocs', 'readthedocs']:
+                cfg = load_config({
+                    'docs_dir': docs_dir,
+                    'site_dir': site_dir,
+                    'pages': pages_config,
+                    'theme': theme,
+                })
+                with mock.patch.object(nav.NavFragments, 'wrap'):
+                    build.build(cfg)
+                expected = read_site()
+                with mock.patch.object(nav.NavFragments, '_render', spy_render):
+                    build.build(cfg)
+                self.assertEqual(read_site(), expected)
+                self.assertTrue(any(fragment is not None for fragment in fragments))
+                del fragments[:]
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
+    @mock.patch.dict(os.environ, {'SOURCE_DATE_EPOCH': '123'})
+    def test_parallel_build_matches_serial(self):
+        docs_dir = tempfile.mkdtemp()
+        serial_dir = tempfile.mkdtemp()
+        parallel_dir = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(docs_dir, 'sub'))
+            for path in ['index.md', 'about.md', 'sub/index.md', 'sub/page.md']:
+                with open(os.path.join(docs_dir, path), 'w') as f:
+                    f.write(dedent("""
+                        # Heading
+
+                        A [link](../index.md) and ![img](img.png)
+
+                        ## Sub heading
+
+                        Some text.
+                    """))
+            for site_dir, jobs in ((serial_dir, 1), (parallel_dir, 2)):
+                cfg = load_config({
+                    'docs_dir': docs_dir,
+                    'site_dir': site_dir
+                })
+                build.build(cfg, jobs=jobs)
+
+            serial_files = []
+            for dirpath, dirnames, filenames in os.walk(serial_dir):
+                # The build state records the site_dir.
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for filename in filenames:
+                    if filename.startswith('.'):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    serial_files.append(os.path.relpath(path, serial_dir))
+            for path in serial_files:
+                with open(os.path.join(serial_dir, path), 'rb') as f:
+                    serial_content = f.read()
+                with open(os.path.join(parallel_dir, path), 'rb') as f:
+                    self.assertEqual(f.read(), serial_content, path)
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(serial_dir)
+            shutil.rmtree(parallel_dir)
+
+    def test_dirty_build_only_changed_pages(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        theme_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        try:
+            for path in ['index.md', 'about.md']:
+                with open(os.path.join(docs_dir, path), 'w') as f:
+                    f.write('# Heading')
+            with open(os.path.join(theme_dir, 'main.html'), 'w') as f:
+                f.write('{{ page.content }}')
+
+            def build_pages(dirty):
+                cfg = load_config({
+                    'docs_dir': docs_dir,
+                    'site_dir': site_dir,
+                    'theme_dir': theme_dir,
+                    'cache_dir': cache_dir,
+                })
+                with mock.patch('mkdocs.commands.build._build_page',
+                                wraps=build._build_page) as mock_build_page:
+                    build.build(cfg, dirty=dirty)
+                return sorted(c[0][0].input_path for c in mock_build_page.call_args_list)
+
+            self.assertEqual(build_pages(dirty=False), ['about.md', 'index.md'])
+            # The search entries of the pages are only stored by dirty builds.
+            self.assertEqual(build_pages(dirty=True), ['about.md', 'index.md'])
+            self.assertEqual(build_pages(dirty=True), [])
+
+            with open(os.path.join(docs_dir, 'about.md'), 'w') as f:
+                f.write('# Changed')
+            self.assertEqual(build_pages(dirty=True), ['about.md'])
+
+            with open(os.path.join(theme_dir, 'main.html'), 'w') as f:
+                f.write('<div>{{ page.content }}</div>')
+            self.assertEqual(build_pages(dirty=True), ['about.md', 'index.md'])
+
+            os.remove(os.path.join(site_dir, 'index.html'))
+            self.assertEqual(build_pages(dirty=True), ['index.md'])
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+            shutil.rmtree(theme_dir)
+            shutil.rmtree(cache_dir)
+
+    def test_release_page_content(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(docs_dir, 'index.md'), 'w') as f:
+                f.write('# Heading\n\nText')
+
+            cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir})
+            site_navigation = nav.SiteNavigation(cfg['pages'])
+            page = site_navigation.pages[0]
+            released = []
+            release_content = nav.ItemView.release_content
+
+            def release(view):
+                released.append((view, view.content, view.toc))
+                release_content(view)
+
+            with mock.patch.object(nav.ItemView, 'release_content', autospec=True,
+                                   side_effect=release):
+                result = build._build_and_index_page(page, cfg, site_navigation,
+                                                     build.get_environment(cfg), False)
+            self.assertIn('Text', result['entries'][0]['text'])
+            with open(os.path.join(site_dir, 'index.html')) as f:
+                self.assertIn('<p>Text</p>', f.read())
+            # The rendered content isn't kept by the view of the page once it
+            # is written.
+            self.assertEqual(len(released), 1)
+            view, content, table_of_contents = released[0]
+            self.assertIs(view.item, page)
+            self.assertIn('<p>Text</p>', content)
+            self.assertEqual(len(table_of_contents.items), 1)
+            self.assertIsNone(view.content)
+            self.assertIsNone(view.toc)
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
+    def test_dirty_build_search_index(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        try:
+            for path in ['index.md', 'about.md']:
+                with open(os.path.join(docs_dir, path), 'w') as f:
+                    f.write('# Heading\n\nText of {0}'.format(path))
+
+            def build_search_index(dirty):
+                cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir,
+                                   'cache_dir': cache_dir})
+                build.build(cfg, dirty=dirty)
+                with open(os.path.join(site_dir, 'mkdocs', 'search_index.json')) as f:
+                    return f.read()
+
+            full = build_search_index(dirty=False)
+            self.assertIn('Text of about.md', full)
+            self.assertEqual(build_search_index(dirty=True), full)
+
+            with open(os.path.join(docs_dir, 'about.md'), 'w') as f:
+                f.write('# Heading\n\nChanged')
+            changed = build_search_index(dirty=True)
+            self.assertIn('Text of index.md', changed)
+            self.assertIn('Changed', changed)
+            self.assertNotIn('Text of about.md', changed)
+            self.assertEqual(build_search_index(dirty=False), changed)
+
+            # Pages without stored search entries are built again.
+            shutil.rmtree(os.path.join(cache_dir, 'search_entries'))
+            with mock.patch('mkdocs.commands.build._build_page',
+                            wraps=build._build_page) as mock_build_page:
+                self.assertEqual(build_search_index(dirty=True), changed)
+            self.assertEqual(mock_build_page.call_count, 2)
+            # The entries are kept out of the site.
+            self.assertFalse(any(name.startswith('.mkdocs_search') for name in os.listdir(site_dir)))
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+            shutil.rmtree(cache_dir)
+
+    def test_anchor_links(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(docs_dir, 'index.md'), 'w') as f:
+                f.write('[Valid](about.md#heading) [broken](about.md#missing) [page](about.md)')
+            with open(os.path.join(docs_dir, 'about.md'), 'w') as f:
+                f.write('# Heading\n\n[Broken](index.md#missing)')
+
+            cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir, 'strict': True})
+            with self.assertRaises(AnchorNotFound) as cm:
+                build.build(cfg)
+            self.assertEqual(cm.exception.message.splitlines()[1:], [
+                '  - "index.md" links to "about.md#missing"',
+                '  - "about.md" links to "index.md#missing"',
+            ])
+
+            # Unless strict, a single warning is logged.
+            cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir,
+                               'cache_dir': cache_dir})
+            with mock.patch('mkdocs.relative_path_ext.log') as mock_log:
+                build.build(cfg, dirty=True)
+            self.assertEqual(mock_log.warning.call_count, 1)
+
+            # A dirty build checks the links of the pages it doesn't build.
+            with open(os.path.join(docs_dir, 'about.md'), 'w') as f:
+                f.write('# Heading')
+            with mock.patch('mkdocs.commands.build._build_page',
+                            wraps=build._build_page) as mock_build_page:
+                with mock.patch('mkdocs.relative_path_ext.log') as mock_log:
+                    build.build(cfg, dirty=True)
+            self.assertEqual(mock_build_page.call_count, 1)
+            self.assertEqual(mock_log.warning.call_args[0][0].splitlines()[1:], [
+                '  - "index.md" links to "about.md#missing"',
+            ])
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+            shutil.rmtree(cache_dir)
+
+    def test_anchor_links_ids(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(docs_dir, 'index.md'), 'w') as f:
+                f.write(dedent("""
+                    [Heading](about.md#heading)
+                    [Attribute](about.md#custom)
+                    [Name](about.md#raw-name)
+                    [Block](about.md#raw-block)
+                    [Broken](about.md#missing)
+                    """))
+            with open(os.path.join(docs_dir, 'about.md'), 'w') as f:
+                f.write(dedent("""
+                    # Heading
+
+                    Some text.
+                    {: #custom }
+                    """))
+
+            # IDs from extensions are found in the element tree of the page.
+            cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir,
+                               'markdown_extensions': ['attr_list']})
+            with mock.patch('mkdocs.relative_path_ext.log') as mock_log:
+                build.build(cfg)
+            self.assertEqual(mock_log.warning.call_args[0][0].splitlines()[1:], [
+                '  - "index.md" links to "about.md#raw-name"',
+                '  - "index.md" links to "about.md#raw-block"',
+                '  - "index.md" links to "about.md#missing"',
+            ])
+
+            # Raw HTML is searched for IDs and the names of anchors.
+            with open(os.path.join(docs_dir, 'about.md'), 'a') as f:
+                f.write('\n\n<div id="raw-block"><a name=\'raw-name\'></a></div>\n')
+            with mock.patch('mkdocs.relative_path_ext.log') as mock_log:
+                build.build(cfg)
+            self.assertEqual(mock_log.warning.call_args[0][0].splitlines()[1:], [
+                '  - "index.md" links to "about.md#missing"',
+            ])
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
+    def test_page_anchors(self):
+        html = ('<h1 id="heading">Heading</h1>\n'
+                '<p class="x" ID=upper>Text <a name="named" href="#heading">link</a></p>\n'
+                '<div name="ignored" id=""></div>\n'
+                '<pre><code>&lt;a id="code"&gt;</code></pre>')
+        self.assertEqual(relative_path_ext.page_anchors(html), set(['heading', 'upper', 'named']))
+        tree = markdown.util.etree.fromstring(
+            '<div><h1 id="heading">Heading</h1><p name="ignored">Text <a name="named">link</a></p></div>')
+        self.assertEqual(relative_path_ext.page_anchors('', tree), set(['heading', 'named']))
+
+    def test_search_index_budget(self):
+        docs_dir = tempfile.mkdtemp()
+        site_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(docs_dir, 'index.md'), 'w') as f:
+                f.write('# Heading\n\nSome text.')
+
+            cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir,
+                               'search_index_budget': 100})
+            self.assertRaises(SearchIndexTooLarge, build.build, cfg)
+            # The development server only warns.
+            build.build(cfg, live_server=True)
+
+            size = os.path.getsize(os.path.join(site_dir, search.INDEX_PATH))
+            cfg = load_config({'docs_dir': docs_dir, 'site_dir': site_dir,
+                               'search_index_budget': size})
+            with mock.patch('mkdocs.commands.build.log') as mock_log:
+                build.build(cfg, search_report=True)
+            logged = [c[0][0] for c in mock_log.info.call_args_list]
+            self.assertIn('Largest 1 pages by text (bytes):', logged)
+        finally:
+            shutil.rmtree(docs_dir)
+            shutil.rmtree(site_dir)
+
     def test_strict_mode_valid(self):
         pages = [
             'index.md',
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+import os
+import shutil
+import tempfile
+import unittest
+
+import jinja2
+import mock
+
+from mkdocs import cache, nav, toc
+from mkdocs.tests.build_tests import load_config
+
+
+class TemplateFingerprintsTests(unittest.TestCase):
+
+    def get_fingerprints(self, templates):
+        env = jinja2.Environment(loader=jinja2.DictLoader(templates))
+        return cache.TemplateFingerprints(env)
+
+    def test_referenced_templates(self):
+        templates = {
+            'main.html': '{% extends "base.html" %}',
+            'base.html': '{% include "nav.html" %}',
+            'nav.html': 'nav',
+            'other.html': 'other',
+        }
+        fingerprint = self.get_fingerprints(templates).fingerprint('main.html')
+
+        templates['other.html'] = 'changed'
+        self.assertEqual(self.get_fingerprints(templates).fingerprint('main.html'), fingerprint)
+
+        templates['nav.html'] = 'changed'
+        self.assertNotEqual(self.get_fingerprints(templates).fingerprint('main.html'), fingerprint)
+
+    def test_dynamic_include(self):
+        templates = {
+            'main.html': '{% include page.template %}',
+            'other.html': 'other',
+        }
+        fingerprint = self.get_fingerprints(templates).fingerprint('main.html')
+
+        templates['other.html'] = 'changed'
+        self.assertNotEqual(self.get_fingerprints(templates).fingerprint('main.html'), fingerprint)
+
+    def test_missing_template(self):
+        fingerprints = self.get_fingerprints({'main.html': '{% include "missing.html" %}'})
+        self.assertEqual(fingerprints.fingerprint('main.html'), fingerprints.fingerprint('main.html'))
+
+
+class BuildStateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.site_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.site_dir)
+
+    def test_save_and_load(self):
+        state = cache.BuildState(self.site_dir)
+        state.update('index.md', {'source': 'a'})
+        state.update('about.md', {'source': 'b'})
+        state.prune(['index.md'])
+        state.save()
+
+        state = cache.BuildState.load(self.site_dir)
+        self.assertEqual(state.pages, {'index.md': {'source': 'a'}})
+        self.assertTrue(state.is_current('index.md', {'source': 'a'}))
+        self.assertFalse(state.is_current('index.md', {'source': 'c'}))
+        self.assertFalse(state.is_current('about.md', {'source': 'b'}))
+
+    def test_save_and_load_anchors(self):
+        state = cache.BuildState(self.site_dir)
+        state.update_anchors('index.md', ['b', 'a'], [('about.md', 'c')])
+        state.update_anchors('about.md', ['c'], [])
+        state.prune(['index.md'])
+        state.save()
+
+        state = cache.BuildState.load(self.site_dir)
+        self.assertEqual(state.get_anchors('index.md'), (['a', 'b'], [['about.md', 'c']]))
+        self.assertIsNone(state.get_anchors('about.md'))
+
+    def test_load_invalid(self):
+        with open(os.path.join(self.site_dir, cache.BuildState.filename), 'w') as f:
+            f.write('not json')
+        self.assertEqual(cache.BuildState.load(self.site_dir).pages, {})
+
+    def test_load_missing(self):
+        self.assertEqual(cache.BuildState.load(self.site_dir).pages, {})
+
+
+class SearchEntryStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_set_and_get(self):
+        store = cache.SearchEntryStore(self.cache_dir)
+        entries = [{'location': '/', 'title': 'Home', 'text': 'Text'}]
+        self.assertFalse(store.has('index.md', {'source': 'a'}))
+        self.assertEqual(store.get('index.md', {'source': 'a'}), None)
+
+        store.set('index.md', {'source': 'a'}, entries)
+        self.assertTrue(store.has('index.md', {'source': 'a'}))
+        self.assertEqual(store.get('index.md', {'source': 'a'}), entries)
+        self.assertEqual(store.get('index.md', {'source': 'b'}), None)
+        self.assertEqual(store.get('about.md', {'source': 'a'}), None)
+
+    def test_prune(self):
+        store = cache.SearchEntryStore(self.cache_dir)
+        store.prune([])
+        store.set('index.md', {'source': 'a'}, [])
+        store.set('index.md', {'source': 'b'}, [])
+        store.set('about.md', {'source': 'a'}, [])
+        store.prune([('index.md', {'source': 'b'})])
+        self.assertFalse(store.has('index.md', {'source': 'a'}))
+        self.assertTrue(store.has('index.md', {'source': 'b'}))
+        self.assertFalse(store.has('about.md', {'source': 'a'}))
+        self.assertEqual(len(os.listdir(store.directory)), 1)
+
+    def test_search_entry_dir(self):
+        config = load_config({'cache_dir': self.cache_dir, 'site_dir': 'site'})
+        directory = cache.search_entry_dir(config)
+        self.assertEqual(os.path.dirname(directory), os.path.join(self.cache_dir, 'search_entries'))
+        config = load_config({'cache_dir': self.cache_dir, 'site_dir': 'other'})
+        self.assertNotEqual(cache.search_entry_dir(config), directory)
+
+
+class MarkdownCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_set_and_get(self):
+        markdown_cache = cache.MarkdownCache(self.cache_dir, load_config())
+        heading = toc.AnchorLink('A', '#a')
+        heading.children.append(toc.AnchorLink('B', '#b'))
+        heading.active = True
+        table_of_contents = toc.TableOfContents('', items=[heading])
+        markdown_cache.set('# A\n## B', '<h1 id="a">A</h1>', ['a.md'],
+                           table_of_contents, {'title': ['A']})
+
+        html, links, table_of_contents, meta = markdown_cache.get('# A\n## B')
+        self.assertEqual(html, '<h1 id="a">A</h1>')
+        self.assertEqual(links, ['a.md'])
+        self.assertEqual(meta, {'title': ['A']})
+        self.assertEqual(str(table_of_contents).strip(), 'A - #a\n    B - #b')
+        self.assertTrue(table_of_contents.items[0].active)
+
+        self.assertEqual(markdown_cache.get('# Other'), None)
+
+    def test_markdown_extensions(self):
+        config = load_config()
+        cache.MarkdownCache(self.cache_dir, config).set(
+            'text', '<p>text</p>', [], toc.TableOfContents(''), {})
+
+        config['markdown_extensions'].append('admonition')
+        self.assertEqual(cache.MarkdownCache(self.cache_dir, config).get('text'), None)
+
+
+class TemplateLoaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.theme_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.theme_dir, 'main.html'), 'w') as f:
+            f.write('custom')
+        config = load_config({'cache_dir': self.cache_dir})
+        self.searchpath = [self.theme_dir] + config['theme_dir'] + [config['mkdocs_templates']]
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.theme_dir)
+
+    def get_environment(self):
+        return jinja2.Environment(
+            loader=cache.TemplateLoader(self.searchpath, self.cache_dir),
+            bytecode_cache=jinja2.FileSystemBytecodeCache(self.cache_dir))
+
+    def test_precompiled_builtin_templates(self):
+        blocks = self.get_environment().get_template('base.html').blocks
+
+        env = self.get_environment()
+        with mock.patch.object(env, 'compile', wraps=env.compile) as mock_compile:
+            self.assertEqual(sorted(env.get_template('base.html').blocks), sorted(blocks))
+            self.assertEqual(env.get_template('sitemap.xml').filename,
+                             os.path.join(self.searchpath[-1], 'sitemap.xml'))
+        self.assertEqual(mock_compile.call_count, 1)
+
+    def test_invalid_precompiled_template(self):
+        self.get_environment().get_template('sitemap.xml')
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith('mkdocs_'):
+                with open(os.path.join(self.cache_dir, filename), 'wb') as f:
+                    f.write(b'invalid')
+
+        env = self.get_environment()
+        with mock.patch.object(env, 'compile', wraps=env.compile) as mock_compile:
+            env.get_template('sitemap.xml')
+            self.get_environment().get_template('sitemap.xml')
+        self.assertEqual(mock_compile.call_count, 1)
+
+    def test_theme_dir_override(self):
+        env = self.get_environment()
+        self.assertEqual(env.loader._find_builtin('main.html'), None)
+        self.assertEqual(env.get_template('main.html').render(), 'custom')
+
+        with open(os.path.join(self.theme_dir, 'main.html'), 'w') as f:
+            f.write('changed')
+        self.assertEqual(self.get_environment().get_template('main.html').render(), 'changed')
+
+    def test_no_cache_dir(self):
+        loader = cache.TemplateLoader(self.searchpath)
+        env = jinja2.Environment(loader=loader)
+        env.get_template('base.html')
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_template_cache_dir(self):
+        config = load_config({'cache_dir': self.cache_dir})
+        self.assertEqual(cache.template_cache_dir(config), os.path.join(self.cache_dir, 'jinja'))
+        self.assertTrue(os.path.isdir(os.path.join(self.cache_dir, 'jinja')))
+
+
+class FingerprintTests(unittest.TestCase):
+
+    def test_nav_fingerprint(self):
+        fingerprint = cache.nav_fingerprint(nav.SiteNavigation(['index.md', 'about.md']))
+        self.assertEqual(cache.nav_fingerprint(nav.SiteNavigation(['index.md', 'about.md'])), fingerprint)
+        self.assertNotEqual(cache.nav_fingerprint(nav.SiteNavigation(['index.md', 'other.md'])), fingerprint)
+        self.assertNotEqual(cache.nav_fingerprint(nav.SiteNavigation([{'Accueil é': 'index.md'}])),
+                            cache.nav_fingerprint(nav.SiteNavigation([{'Accueil e': 'index.md'}])))
+
+    def test_config_fingerprint(self):
+        fingerprint = cache.config_fingerprint(load_config({'site_dir': 'site'}))
+        self.assertEqual(cache.config_fingerprint(load_config({'site_dir': 'other'})), fingerprint)
+        self.assertNotEqual(cache.config_fingerprint(load_config({'site_dir': 'site', 'strict': True})),
+                            fingerprint)
+
+    def test_file_hash(self):
+        self.assertEqual(cache.file_hash('/no/such/file'), None)
+        self.assertEqual(cache.file_hash(__file__), cache.file_hash(__file__))
@@ -11,6 +11,7 @@ import io
 from click.testing import CliRunner
 
 from mkdocs import __main__ as cli
+from mkdocs import timing
 
 PY3 = sys.version_info[0] == 3
 
@@ -33,7 +34,9 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme=None,
             theme_dir=None,
-            livereload='livereload'
+            livereload='livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -65,7 +68,9 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme=None,
             theme_dir=None,
-            livereload='livereload'
+            livereload='livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -81,7 +86,9 @@ class CLITests(unittest.TestCase):
             strict=True,
             theme=None,
             theme_dir=None,
-            livereload='livereload'
+            livereload='livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -97,7 +104,9 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme='readthedocs',
             theme_dir=None,
-            livereload='livereload'
+            livereload='livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -113,7 +122,9 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme=None,
             theme_dir='custom',
-            livereload='livereload'
+            livereload='livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -129,7 +140,9 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme=None,
             theme_dir=None,
-            livereload='livereload'
+            livereload='livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -145,7 +158,9 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme=None,
             theme_dir=None,
-            livereload='no-livereload'
+            livereload='no-livereload',
+            jobs=1,
+            profile=None
         )
 
     @mock.patch('mkdocs.commands.serve.serve', autospec=True)
@@ -161,7 +176,27 @@ class CLITests(unittest.TestCase):
             strict=None,
             theme=None,
             theme_dir=None,
-            livereload='dirty'
+            livereload='dirty',
+            jobs=1,
+            profile=None
+        )
+
+    @mock.patch('mkdocs.commands.serve.serve', autospec=True)
+    def test_serve_jobs(self, mock_serve):
+
+        result = self.runner.invoke(
+            cli.cli, ["serve", '--jobs', '4'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        mock_serve.assert_called_once_with(
+            config_file=None,
+            dev_addr=None,
+            strict=None,
+            theme=None,
+            theme_dir=None,
+            livereload='livereload',
+            jobs=4,
+            profile=None
         )
 
     @mock.patch('mkdocs.config.load_config', autospec=True)
@@ -176,6 +211,7 @@ class CLITests(unittest.TestCase):
         args, kwargs = mock_build.call_args
         self.assertTrue('dirty' in kwargs)
         self.assertFalse(kwargs['dirty'])
+        self.assertEqual(kwargs['jobs'], 1)
         mock_load_config.assert_called_once_with(
             config_file=None,
             strict=None,
@@ -296,6 +332,61 @@ class CLITests(unittest.TestCase):
             site_dir='custom'
         )
 
+    @mock.patch('mkdocs.commands.build.build', autospec=True)
+    def test_build_jobs(self, mock_build):
+
+        result = self.runner.invoke(
+            cli.cli, ['build', '--jobs', '4'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(mock_build.call_count, 1)
+        args, kwargs = mock_build.call_args
+        self.assertEqual(kwargs['jobs'], 4)
+
+    @mock.patch('mkdocs.timing.BuildTimer.write', autospec=True)
+    @mock.patch('mkdocs.config.load_config', autospec=True)
+    @mock.patch('mkdocs.commands.build.build', autospec=True)
+    def test_build_profile(self, mock_build, mock_load_config, mock_write):
+
+        result = self.runner.invoke(
+            cli.cli, ['build', '--profile', 'profile.json'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(mock_build.call_count, 1)
+        args, kwargs = mock_build.call_args
+        self.assertTrue(isinstance(kwargs['timer'], timing.BuildTimer))
+        self.assertTrue('config' in kwargs['timer'].stages)
+        mock_write.assert_called_once_with(kwargs['timer'], 'profile.json')
+
+    @mock.patch('mkdocs.commands.build.build', autospec=True)
+    def test_build_search_report(self, mock_build):
+
+        result = self.runner.invoke(
+            cli.cli, ['build', '--search-report'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        args, kwargs = mock_build.call_args
+        self.assertTrue(kwargs['search_report'])
+
+    @mock.patch('mkdocs.commands.build.build', autospec=True)
+    def test_build_no_profile(self, mock_build):
+
+        result = self.runner.invoke(
+            cli.cli, ['build'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        args, kwargs = mock_build.call_args
+        self.assertEqual(kwargs['timer'], None)
+
+    @mock.patch('mkdocs.commands.build.build', autospec=True)
+    def test_build_invalid_jobs(self, mock_build):
+
+        result = self.runner.invoke(
+            cli.cli, ['build', '--jobs', '0'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 2)
+        self.assertEqual(mock_build.call_count, 0)
+
     @mock.patch('mkdocs.commands.build.build', autospec=True)
     def test_build_verbose(self, mock_build):
 
@@ -474,3 +565,17 @@ class CLITests(unittest.TestCase):
         self.assertEqual(g_kwargs['force'], True)
         self.assertEqual(mock_build.call_count, 1)
         self.assertEqual(mock_load_config.call_count, 1)
+
+    @mock.patch('mkdocs.config.load_config', autospec=True)
+    @mock.patch('mkdocs.commands.build.build', autospec=True)
+    @mock.patch('mkdocs.commands.gh_deploy.gh_deploy', autospec=True)
+    def test_gh_deploy_jobs(self, mock_gh_deploy, mock_build, mock_load_config):
+
+        result = self.runner.invoke(
+            cli.cli, ['gh-deploy', '--jobs', '4'], catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(mock_gh_deploy.call_count, 1)
+        self.assertEqual(mock_build.call_count, 1)
+        b_args, b_kwargs = mock_build.call_args
+        self.assertEqual(b_kwargs['jobs'], 4)
@@ -344,6 +344,23 @@ class ThemeTest(unittest.TestCase):
                           option.validate, "mkdocs2")
 
 
+class ChoicesTest(unittest.TestCase):
+
+    def test_valid(self):
+
+        option = config_options.Choices(['a', 'b'], default=[])
+        self.assertEqual(option.validate(['b', 'a']), ['b', 'a'])
+        self.assertEqual(option.validate(None), [])
+
+    def test_invalid(self):
+
+        option = config_options.Choices(['a', 'b'])
+        self.assertRaises(config_options.ValidationError,
+                          option.validate, ['a', 'c'])
+        self.assertRaises(config_options.ValidationError,
+                          option.validate, 'a')
+
+
 class ExtrasTest(unittest.TestCase):
 
     def test_provided(self):
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+import json
+import unittest
+
+from mkdocs import lunr_index, search
+
+
+class LunrIndexTests(unittest.TestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(lunr_index.tokenize(' Foo bar-Baz\n qux '), ['foo', 'bar', 'baz', 'qux'])
+        self.assertEqual(lunr_index.tokenize(None), [])
+
+    def test_trimmer(self):
+        self.assertEqual(lunr_index.trimmer('(hello),'), 'hello')
+        self.assertEqual(lunr_index.trimmer('__init__'), '__init__')
+        # Like in JavaScript, only ASCII letters are word characters.
+        self.assertEqual(lunr_index.trimmer('café'), 'caf')
+        self.assertEqual(lunr_index.trimmer('...'), '')
+
+    def test_stemmer(self):
+        words = {
+            'consign': 'consign',
+            'consigned': 'consign',
+            'consigning': 'consign',
+            'consignment': 'consign',
+            'caresses': 'caress',
+            'ponies': 'poni',
+            'relational': 'relat',
+            'hopping': 'hop',
+            'filing': 'file',
+            'happy': 'happi',
+            'yield': 'yield',
+            'controll': 'control',
+            'is': 'is',
+        }
+        for word, stem in words.items():
+            self.assertEqual(lunr_index.stemmer(word), stem, word)
+
+    def test_pipeline(self):
+        index = lunr_index.Index()
+        self.assertEqual(index._run_pipeline(['the', 'building', '...', 'pages']), ['build', 'page'])
+
+    def test_index(self):
+        index = lunr_index.Index()
+        index.add({'title': 'Build', 'text': 'Build the pages', 'location': '/'})
+        index.add({'title': 'Pages', 'text': 'Some pages', 'location': '/pages/'})
+        data = index.to_json()
+
+        self.assertEqual(data['version'], '0.7.0')
+        self.assertEqual(data['ref'], 'location')
+        self.assertEqual(data['pipeline'], ['trimmer', 'stopWordFilter', 'stemmer'])
+        self.assertEqual(data['corpusTokens'], ['build', 'page'])
+        self.assertEqual(data['documentStore'], {
+            'store': {'/': ['build', 'page'], '/pages/': ['page']},
+            'length': 2
+        })
+        self.assertEqual(data['tokenStore']['length'], 3)
+
+        root = data['tokenStore']['root']
+        page = root['p']['a']['g']['e']
+        self.assertEqual(page['docs'], {
+            '/': {'ref': '/', 'tf': 0.5},
+            '/pages/': {'ref': '/pages/', 'tf': 11.0},
+        })
+        build = root['b']['u']['i']['l']['d']
+        self.assertEqual(build['docs'], {'/': {'ref': '/', 'tf': 10.5}})
+
+    def test_search_index(self):
+        index = search.SearchIndex()
+        index.extend([{'title': 'Home', 'text': 'Welcome', 'location': '/'}])
+        data = json.loads(index.generate_search_index())
+
+        self.assertEqual(data['docs'], [{'title': 'Home', 'text': 'Welcome', 'location': '/'}])
+        self.assertEqual(data['index']['corpusTokens'], ['home', 'welcom'])
@@ -236,6 +236,83 @@ class SiteNavigationTests(unittest.TestCase):
         for index, page in enumerate(site_navigation.walk_pages()):
             self.assertEqual(str(site_navigation).strip(), expected[index])
 
+    def test_view_indented_toc(self):
+        pages = [
+            {'Home': 'index.md'},
+            {'API Guide': [
+                {'Running': 'api-guide/running.md'},
+                {'Testing': 'api-guide/testing.md'},
+            ]},
+        ]
+        expected = [
+            dedent("""
+                Home - / [*]
+                API Guide
+                    Running - /api-guide/running/
+                    Testing - /api-guide/testing/
+            """),
+            dedent("""
+                Home - /
+                API Guide [*]
+                    Running - /api-guide/running/ [*]
+                    Testing - /api-guide/testing/
+            """),
+            dedent("""
+                Home - /
+                API Guide [*]
+                    Running - /api-guide/running/
+                    Testing - /api-guide/testing/ [*]
+            """),
+        ]
+        site_navigation = nav.SiteNavigation(pages)
+        views = [site_navigation.view(page) for page in site_navigation.pages]
+        for index, view in enumerate(views):
+            self.assertEqual(str(view).strip(), expected[index])
+        # The shared navigation state is left untouched.
+        self.assertFalse(any(page.active for page in site_navigation.pages))
+        self.assertEqual(site_navigation.url_context.base_path, '/')
+
+    def test_view_page_state(self):
+        site_navigation = nav.SiteNavigation(['index.md', 'about.md'])
+        page = site_navigation.pages[0]
+        first = site_navigation.view(page).page
+        second = site_navigation.view(page).page
+        first.content = 'First'
+        self.assertEqual(first.content, 'First')
+        self.assertIsNone(second.content)
+        self.assertIsNone(page.content)
+
+        first.release_content()
+        self.assertIsNone(first.content)
+
+    def test_view_urls(self):
+        pages = [
+            'index.md',
+            'about.md',
+            'sub/page.md',
+        ]
+        site_navigation = nav.SiteNavigation(pages)
+        view = site_navigation.view(site_navigation.pages[2])
+
+        self.assertEqual(view.homepage.url, '../..')
+        self.assertEqual([p.url for p in view.pages], ['../..', '../../about/', './'])
+        self.assertEqual(view.page.previous_page.url, '../../about/')
+        self.assertEqual(view.page.previous_page, site_navigation.pages[1])
+        self.assertEqual(view.file_context.current_file, os.path.normpath('sub/page.md'))
+        self.assertEqual(site_navigation.homepage.url, '.')
+
+    def test_view_url_context(self):
+        pages = [
+            'index.md',
+            'about.md',
+        ]
+        site_navigation = nav.SiteNavigation(pages)
+        url_context = nav.URLContext(base_path='/docs/', force_abs_urls=True)
+        view = site_navigation.view(url_context=url_context)
+
+        self.assertEqual([p.url for p in view.pages], ['/docs/', '/docs/about/'])
+        self.assertFalse(any(p.active for p in view.pages))
+
     def test_base_url(self):
         pages = [
             'index.md'
@@ -254,6 +331,81 @@ class SiteNavigationTests(unittest.TestCase):
         url = site_navigation.url_context.make_relative('/user-guide/styling-your-docs/')
         self.assertEqual(url, '../styling-your-docs/')
 
+    def test_relative_url_cache(self):
+        relative_urls = nav.RelativeURLCache(maxsize=2)
+        with mock.patch('mkdocs.nav.relative_urls', relative_urls):
+            url_context = nav.URLContext()
+            url_context.set_current_url('/user-guide/configuration/')
+            self.assertEqual(url_context.make_relative('/about/'), '../../about/')
+            self.assertEqual(url_context.make_relative('/about/'), '../../about/')
+            self.assertEqual((relative_urls.hits, relative_urls.misses), (1, 1))
+
+            # The base path, URL and force_abs_urls are all part of the key.
+            url_context.force_abs_urls = True
+            self.assertEqual(url_context.make_relative('/about/'), '/user-guide/configuration/about/')
+            url_context.force_abs_urls = False
+            url_context.set_current_url('/user-guide/')
+            self.assertEqual(url_context.make_relative('/about/'), '../about/')
+            self.assertEqual((relative_urls.hits, relative_urls.misses), (1, 3))
+            self.assertEqual(len(relative_urls), 1)
+
+            relative_urls.clear()
+            self.assertEqual((relative_urls.hits, relative_urls.misses, len(relative_urls)), (0, 0, 0))
+
+    def test_relpath(self):
+        for path, start in [
+            ('/a/b/', '/a'),
+            ('/a/', '/a'),
+            ('/a/b/c', '/a/d/e'),
+            ('/', '/a/b'),
+            ('//a/./b', '/a//'),
+            ('/a/../b', '/c'),
+            ('img/a.png', '/a'),
+        ]:
+            self.assertEqual(nav._relpath(path, start), os.path.relpath(path, start), (path, start))
+
+    def test_view_page_urls(self):
+        site_navigation = nav.SiteNavigation(['index.md', 'about.md', 'sub/page.md'])
+        view = site_navigation.view(site_navigation.pages[2])
+        self.assertEqual(view.page_urls, {
+            '/': '../..',
+            '/about/': '../../about/',
+            '/sub/page/': './',
+        })
+
+    def test_page_lookups(self):
+        pages = [
+            'index.md',
+            {'API Guide': [
+                {'Running': 'api-guide/running.md'},
+                {'Testing': 'api-guide/testing.md'},
+            ]},
+            {'About': 'about.md'},
+        ]
+        site_navigation = nav.SiteNavigation(pages)
+        running = site_navigation.pages[1]
+        running_path = os.path.join('api-guide', 'running.md')
+        testing_path = os.path.join('api-guide', 'testing.md')
+        self.assertIs(site_navigation.pages_by_input_path[running_path], running)
+        self.assertIs(site_navigation.pages_by_url['/api-guide/running/'], running)
+        self.assertIs(site_navigation.pages_by_output_path[os.path.join('api-guide', 'running', 'index.html')],
+                      running)
+        self.assertEqual(site_navigation.source_files,
+                         set(['index.md', running_path, testing_path, 'about.md']))
+
+        neighbourhood = site_navigation.neighbourhood(testing_path)
+        self.assertIs(neighbourhood.previous_page, running)
+        self.assertIs(neighbourhood.next_page, site_navigation.pages[3])
+        self.assertIs(neighbourhood.parent, site_navigation.nav_items[1])
+        self.assertEqual(neighbourhood.siblings, site_navigation.pages[1:3])
+
+        neighbourhood = site_navigation.neighbourhood('index.md')
+        self.assertIsNone(neighbourhood.previous_page)
+        self.assertIsNone(neighbourhood.parent)
+        self.assertIs(neighbourhood.siblings, site_navigation.nav_items)
+
+        self.assertIsNone(site_navigation.neighbourhood('missing.md'))
+
     def test_generate_site_navigation(self):
         """
         Verify inferring page titles based on the filename
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tornado import testing, web
+
+from mkdocs import search
+from mkdocs.commands import build, serve
+from mkdocs.search_engine import SearchEngine
+from mkdocs.tests.build_tests import load_config
+
+
+DOCS = [
+    {'title': 'Home', 'text': 'Welcome to the documentation of the project.', 'location': '/'},
+    {'title': 'Themes', 'text': 'Choose a theme for the documentation.', 'location': '/themes/'},
+    {'title': 'Theme directory', 'text': 'A directory of custom templates.', 'location': '/themes/#theme-directory'},
+    {'title': 'Deploying', 'text': 'Deploy the built site.', 'location': '/deploying/'},
+]
+
+
+class SearchEngineTests(unittest.TestCase):
+
+    def locations(self, results):
+        return [result['location'] for result in results]
+
+    def test_search(self):
+        engine = SearchEngine(DOCS)
+        self.assertEqual(self.locations(engine.search('deploy')), ['/deploying/'])
+        # The title counts more than the text.
+        self.assertEqual(self.locations(engine.search('documentation')), ['/', '/themes/'])
+        self.assertEqual(self.locations(engine.search('themes')),
+                         ['/themes/', '/themes/#theme-directory'])
+
+    def test_search_all_terms(self):
+        engine = SearchEngine(DOCS)
+        self.assertEqual(self.locations(engine.search('theme directory')),
+                         ['/themes/#theme-directory'])
+        self.assertEqual(engine.search('theme deploy'), [])
+        self.assertEqual(engine.search('missing'), [])
+
+    def test_search_prefix(self):
+        engine = SearchEngine(DOCS)
+        results = engine.search('dep')
+        self.assertEqual(self.locations(results), ['/deploying/'])
+        self.assertTrue(results[0]['score'] < engine.search('deploy')[0]['score'])
+
+    def test_search_no_terms(self):
+        engine = SearchEngine(DOCS)
+        self.assertEqual(engine.search(''), [])
+        # Stop words are not indexed.
+        self.assertEqual(engine.search('the'), [])
+
+    def test_search_limit(self):
+        engine = SearchEngine(DOCS)
+        results = engine.search('documentation', limit=1)
+        self.assertEqual(results, [{
+            'title': 'Home',
+            'location': '/',
+            'summary': 'Welcome to the documentation of the project.',
+            'score': results[0]['score'],
+        }])
+
+    def test_compact_index(self):
+        docs = [
+            {'title': 'Themes', 'text': '', 'location': '/themes/', 'sections': 1},
+            {'title': 'Theme directory', 'text': 'A directory of custom templates.',
+             'location': '/themes/#theme-directory'},
+        ]
+        # The text of the section is part of the page too.
+        engine = SearchEngine(docs)
+        self.assertEqual(sorted(self.locations(engine.search('templates'))),
+                         ['/themes/', '/themes/#theme-directory'])
+
+    def test_load(self):
+        index = search.SearchIndex()
+        index.extend(DOCS)
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(site_dir, 'search_index.json')
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(index.generate_search_index())
+            engine = SearchEngine.load(path)
+            self.assertEqual(self.locations(engine.search('deploy')), ['/deploying/'])
+            self.assertEqual(self.locations(engine.search('themes')),
+                             ['/themes/', '/themes/#theme-directory'])
+            self.assertEqual(engine.search('theme deploy'), [])
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_load_text_length(self):
+        index = search.SearchIndex(text_length=10, normalize=['stem'])
+        index.extend(DOCS)
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(site_dir, 'search_index.json')
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(index.generate_search_index())
+            # The terms are taken from the prebuilt index of the full text.
+            engine = SearchEngine.load(path)
+            self.assertEqual(self.locations(engine.search('templates')),
+                             ['/themes/#theme-directory'])
+            self.assertEqual(sorted(self.locations(engine.search('documentation'))),
+                             ['/', '/themes/'])
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_load_normalize(self):
+        docs = [{'title': 'Home', 'text': 'They  agreed to the terms.', 'location': '/'}]
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(site_dir, 'search_index.json')
+            for normalize in (['whitespace', 'stop_words', 'stem'], ['whitespace']):
+                index = search.SearchIndex(normalize=normalize)
+                index.extend(docs)
+                with io.open(path, 'w', encoding='utf-8') as f:
+                    f.write(index.generate_search_index())
+                engine = SearchEngine.load(path)
+                # The word is stemmed once, in the index and in the query.
+                results = engine.search('agreed')
+                self.assertEqual(self.locations(results), ['/'])
+                self.assertEqual(results[0]['summary'], 'They agreed to the terms.')
+            # Without stop words, they are searched too.
+            self.assertEqual(self.locations(engine.search('the')), ['/'])
+        finally:
+            shutil.rmtree(site_dir)
+
+
+class SearchHandlerTests(testing.AsyncHTTPTestCase):
+
+    def setUp(self):
+        self.docs_dir = tempfile.mkdtemp()
+        self.site_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.docs_dir, 'index.md'), 'w') as f:
+            f.write('# Heading\n\nA long paragraph which ends with a zebra.')
+        cfg = load_config({'docs_dir': self.docs_dir, 'site_dir': self.site_dir,
+                           'search_text_length': 20})
+        build.build(cfg)
+        super(SearchHandlerTests, self).setUp()
+
+    def tearDown(self):
+        super(SearchHandlerTests, self).tearDown()
+        shutil.rmtree(self.docs_dir)
+        shutil.rmtree(self.site_dir)
+
+    def get_app(self):
+        return web.Application([(r'/search', serve._get_search_handler(self.site_dir))])
+
+    def test_search_text_length(self):
+        response = self.fetch('/search?q=zebra')
+        self.assertEqual(response.code, 200)
+        results = json.loads(response.body.decode('utf-8'))['results']
+        self.assertEqual(sorted(result['location'] for result in results), ['/', '/#heading'])
+        self.assertEqual(results[0]['summary'], 'A long paragraph whi')
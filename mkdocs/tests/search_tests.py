@@ -2,8 +2,15 @@
 # coding: utf-8
 
 from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
+from markdown import util as md_util
+
 from mkdocs import nav
 from mkdocs import search
 from mkdocs.tests.base import dedent, markdown_to_toc
@@ -36,6 +43,19 @@ class SearchTests(unittest.TestCase):
             title="Title"
         )])
 
+    def test_content_parser_references(self):
+
+        parser = search.ContentParser()
+
+        parser.feed('<h1>A &amp; B</h1>Some &lt;x&gt; &#38; y')
+        parser.close()
+
+        self.assertEquals(parser.data, [search.ContentSection(
+            text=["Some <x> & y"],
+            id_=None,
+            title="A & B"
+        )])
+
     def test_content_parser_no_id(self):
 
         parser = search.ContentParser()
@@ -70,6 +90,62 @@ class SearchTests(unittest.TestCase):
 
         self.assertEquals(parser.data, [])
 
+    def test_content_parser_text(self):
+
+        parser = search.ContentParser()
+
+        parser.feed('Before <h1 id="title">Title</h1><p>TEST</p>')
+        parser.close()
+
+        self.assertEquals(parser.text, ["Before ", "Title", "TEST"])
+
+    def test_content_parser_tree(self):
+
+        root = md_util.etree.Element('div')
+        root.text = 'Before '
+        heading = md_util.etree.SubElement(root, 'h1', id='title')
+        heading.text = 'Title'
+        paragraph = md_util.etree.SubElement(root, 'p')
+        paragraph.text = 'TEST '
+        escaped = md_util.etree.SubElement(paragraph, 'em')
+        escaped.text = '%s42%s' % (md_util.STX, md_util.ETX)
+        escaped.tail = ' & more'
+
+        parser = search.ContentParser()
+
+        self.assertTrue(parser.feed_tree(root))
+        self.assertEquals(parser.text, ["Before ", "Title", "TEST ", "*", " & more"])
+        self.assertEquals(parser.data, [search.ContentSection(
+            text=["TEST ", "*", " & more"],
+            id_="title",
+            title="Title"
+        )])
+
+    def test_content_parser_exclude_tags(self):
+
+        html = '<h1 id="title">Title</h1><p>TEST</p><pre><code>x = 1</code></pre><p>More</p>'
+
+        parser = search.ContentParser(exclude_tags=['pre'])
+        parser.feed(html)
+        parser.close()
+        self.assertEquals(parser.text, ["Title", "TEST", "More"])
+        self.assertEquals(parser.data[0].text, ["TEST", "More"])
+
+        root = md_util.etree.fromstring('<div>' + html + '</div>')
+        parser = search.ContentParser(exclude_tags=['pre'])
+        self.assertTrue(parser.feed_tree(root))
+        self.assertEquals(parser.text, ["Title", "TEST", "More"])
+
+    def test_content_parser_tree_placeholder(self):
+
+        root = md_util.etree.Element('div')
+        paragraph = md_util.etree.SubElement(root, 'p')
+        paragraph.text = md_util.HTML_PLACEHOLDER % 0
+
+        parser = search.ContentParser()
+
+        self.assertFalse(parser.feed_tree(root))
+
     def test_find_toc_by_id(self):
         """
         Test finding the relevant TOC item by the tag ID.
@@ -146,3 +222,262 @@ class SearchTests(unittest.TestCase):
             self.assertEqual(index._entries[3]['title'], "Heading 3")
             self.assertEqual(strip_whitespace(index._entries[3]['text']), "Content3")
             self.assertEqual(index._entries[3]['location'], "{0}#heading-3".format(loc))
+
+    def test_create_compact_search_index(self):
+
+        html_content = """
+        <p>Intro</p>
+        <h1 id="heading-1">Heading 1</h1>
+        <p>Content 1</p>
+        <h2>Heading 2</h2>
+        <p>Content 2</p>
+        """
+        site_navigation = nav.SiteNavigation([{'Home': 'index.md'}])
+        page = site_navigation.pages[0]
+        toc = markdown_to_toc("# Heading 1")
+
+        full_index = search.SearchIndex()
+        full_index.add_entry_from_context(page, html_content, toc)
+        index = search.SearchIndex(compact=True)
+        index.add_entry_from_context(page, html_content, toc)
+
+        # The section without an ID isn't in the table of contents, so its
+        # text is kept in the entry of the page.
+        self.assertEqual(len(index.entries), 2)
+        self.assertEqual(index.entries[0]['title'], 'Home')
+        self.assertEqual(strip_whitespace(index.entries[0]['text']), 'IntroHeading2Content2')
+        self.assertEqual(index.entries[0]['sections'], 1)
+        self.assertEqual(index.entries[1], full_index.entries[1])
+
+        self.assertEqual(index.generate_lunr_index(), full_index.generate_lunr_index())
+
+    def test_normalize_text(self):
+
+        text = 'The  themes of\n\nthe site, and -- more.'
+        self.assertEqual(search.normalize_text(text, []), text)
+        self.assertEqual(search.normalize_text(text, ['whitespace']),
+                         'The themes of the site, and -- more.')
+        # Stop words and stemming only apply to the terms of the index.
+        self.assertEqual(search.normalize_text(text, ['stop_words', 'stem']), text)
+        self.assertEqual(search.normalize_text(text, ['whitespace', 'stem']),
+                         'The themes of the site, and -- more.')
+
+    def test_index_pipeline(self):
+
+        entries = [
+            {'title': 'Home', 'text': 'The themes', 'location': '/'},
+        ]
+        index = search.SearchIndex(normalize=['whitespace'])
+        index.extend(entries)
+        data = json.loads(index.generate_search_index())
+        self.assertEqual(data['index']['pipeline'], ['trimmer'])
+        self.assertEqual(data['index']['corpusTokens'], ['home', 'the', 'themes'])
+
+        index = search.SearchIndex()
+        index.extend(entries)
+        data = json.loads(index.generate_search_index())
+        self.assertEqual(data['index']['pipeline'], ['trimmer', 'stopWordFilter', 'stemmer'])
+        self.assertEqual(data['index']['corpusTokens'], ['home', 'theme'])
+        self.assertEqual(data['docs'], entries)
+
+    def test_search_index_normalize(self):
+
+        entries = [
+            {'title': 'Home', 'text': 'Welcome  to\nthe site', 'location': '/'},
+        ]
+        normalize = ['whitespace', 'stop_words', 'stem']
+        index = search.SearchIndex(normalize=normalize, text_length=10)
+        index.extend(entries)
+        data = json.loads(index.generate_search_index())
+        self.assertEqual(data['docs'], [{'title': 'Home', 'text': 'Welcome to', 'location': '/'}])
+
+        # The index is built from the full text.
+        full_index = search.SearchIndex()
+        full_index.extend(entries)
+        self.assertEqual(data['index'], json.loads(full_index.generate_search_index())['index'])
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(site_dir, 'search_index.json')
+            writer = search.SearchIndexWriter(output_path, text_length=10, normalize=normalize)
+            writer.extend(entries)
+            writer.close()
+            with io.open(output_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), index.generate_search_index())
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_search_index_text_length(self):
+
+        entries = [
+            {'title': 'Home', 'text': 'Welcome home', 'location': '/'},
+        ]
+        index = search.SearchIndex(text_length=7)
+        index.extend(entries)
+        data = json.loads(index.generate_search_index())
+        self.assertEqual(data['docs'], [{'title': 'Home', 'text': 'Welcome', 'location': '/'}])
+
+        full_index = search.SearchIndex()
+        full_index.extend(entries)
+        self.assertEqual(data['index'], json.loads(full_index.generate_search_index())['index'])
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(site_dir, 'search_index.json')
+            writer = search.SearchIndexWriter(output_path, text_length=7)
+            writer.extend(entries)
+            writer.close()
+            with io.open(output_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), index.generate_search_index())
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_search_index_writer(self):
+
+        entries = [
+            {'title': 'Home', 'text': 'Welcome', 'location': '/'},
+            {'title': 'Heading', 'text': 'Caf\xe9 content', 'location': '/#heading'},
+        ]
+        index = search.SearchIndex()
+        index.extend(entries)
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(site_dir, 'mkdocs', 'search_index.json')
+            writer = search.SearchIndexWriter(output_path)
+            writer.extend(entries[:1])
+            writer.extend(entries[1:])
+            self.assertTrue(writer.close())
+
+            with io.open(output_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), index.generate_search_index())
+            self.assertEqual(os.listdir(os.path.dirname(output_path)), ['search_index.json'])
+
+            # An unchanged index isn't written again.
+            os.utime(output_path, (0, 0))
+            writer = search.SearchIndexWriter(output_path)
+            writer.extend(entries)
+            self.assertFalse(writer.close())
+            self.assertEqual(os.path.getmtime(output_path), 0)
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_search_index_writer_discard(self):
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(site_dir, 'search_index.json')
+            writer = search.SearchIndexWriter(output_path)
+            writer.extend([{'title': 'Home', 'text': 'Welcome', 'location': '/'}])
+            writer.discard()
+            self.assertEqual(os.listdir(site_dir), [])
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_search_index_writer_empty(self):
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(site_dir, 'search_index.json')
+            writer = search.SearchIndexWriter(output_path)
+            self.assertTrue(writer.close())
+            with io.open(output_path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['docs'], [])
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_sharded_search_index_writer(self):
+
+        # "About" is a stop word.
+        entries = [
+            {'title': 'Home', 'text': 'Welcome home', 'location': '/'},
+            {'title': 'About', 'text': 'About the project', 'location': '/about/'},
+            {'title': 'License', 'text': 'The license of the project', 'location': '/license/'},
+        ]
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            writer = search.ShardedSearchIndexWriter(site_dir)
+            writer.docs_per_chunk = 2
+            writer.extend(entries[:1])
+            writer.extend(entries[1:])
+            outputs = writer.close()
+
+            self.assertEqual(sorted(os.path.basename(path) for path in outputs), [
+                'docs-0.json', 'docs-1.json', 'manifest.json', 'terms-h.json', 'terms-l.json',
+                'terms-p.json', 'terms-w.json'
+            ])
+            self.assertTrue(all(outputs.values()))
+
+            def load(name):
+                with io.open(os.path.join(site_dir, name), encoding='utf-8') as f:
+                    return json.load(f)
+
+            manifest = load('manifest.json')
+            self.assertEqual(manifest['docs'], {'count': 3, 'chunk_size': 2})
+            self.assertEqual(manifest['shards'], ['h', 'l', 'p', 'w'])
+            self.assertEqual(manifest['pipeline'], ['trimmer', 'stopWordFilter', 'stemmer'])
+
+            self.assertEqual(load('docs-1.json'), [
+                {'title': 'License', 'location': '/license/', 'summary': 'The license of the project'}
+            ])
+            self.assertEqual(load('terms-p.json'), {'project': [[1, 1.0], [2, 0.5]]})
+            self.assertEqual(load('terms-h.json'), {'home': [[0, 10.5]]})
+
+            # Unchanged files aren't written again.
+            writer = search.ShardedSearchIndexWriter(site_dir)
+            writer.docs_per_chunk = 2
+            writer.extend(entries)
+            self.assertFalse(any(writer.close().values()))
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_shard_key(self):
+
+        self.assertEqual(search.shard_key('project'), 'p')
+        self.assertEqual(search.shard_key('caf\xe9'), 'c')
+        # A character outside the Basic Multilingual Plane is kept whole,
+        # also on narrow builds of Python 2.
+        self.assertEqual(search.shard_key('\U0001f600smile'), '\U0001f600')
+        self.assertEqual(search.shard_key('\U00020000'), '\U00020000')
+
+    def test_search_index_report(self):
+
+        entries = [
+            {'title': 'Home', 'text': 'Welcome home', 'location': '/'},
+            {'title': 'Heading', 'text': 'Caf\xe9', 'location': '/#heading'},
+            {'title': 'About', 'text': 'About the project', 'location': '/about/'},
+        ]
+        index = search.SearchIndex()
+        index.extend(entries)
+
+        site_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(site_dir, 'search_index.json')
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(index.generate_search_index())
+
+            report = search.SearchIndexReport(path).report(count=1)
+            self.assertEqual(report['bytes'], os.path.getsize(path))
+            self.assertTrue(0 < report['gzip_bytes'] < report['bytes'])
+            self.assertTrue(report['docs_bytes'] + report['index_bytes'] < report['bytes'])
+            self.assertEqual(report['entries'], 3)
+            self.assertEqual(report['pages'], 2)
+            self.assertEqual(report['sections'], 1)
+            # "about" and "the" are stop words.
+            self.assertEqual(report['vocabulary'], 5)
+            self.assertEqual(report['largest_pages'], [{'location': '/about/', 'bytes': 17}])
+            self.assertEqual(report['largest_sections'], [{'location': '/#heading', 'bytes': 5}])
+
+            summary = search.SearchIndexReport(path).summary(count=1)
+            self.assertIn('Largest 1 pages by text (bytes):', summary)
+            self.assertEqual(summary[-1], '           5  /#heading')
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_generate_manifest(self):
+
+        self.assertEqual(json.loads(search.generate_manifest()), {
+            'version': 1,
+            'index': '../search_index.json'
+        })
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mkdocs import timing
+
+
+class TimingTests(unittest.TestCase):
+
+    def test_timed(self):
+        timings = {}
+        with timing.timed(timings, 'stage'):
+            pass
+        with timing.timed(timings, 'stage'):
+            pass
+        self.assertEqual(list(timings), ['stage'])
+        self.assertEqual(len(timings['stage']), 2)
+        self.assertTrue(timings['stage'][0] >= 0)
+
+    def test_timed_disabled(self):
+        with timing.timed(None, 'stage'):
+            pass
+
+    def test_timed_error(self):
+        timings = {}
+        try:
+            with timing.timed(timings, 'stage'):
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertTrue('stage' in timings)
+
+    def test_report(self):
+        timer = timing.BuildTimer()
+        timer.add_page('fast.md', {'page': [0.5, 0.25], 'markdown': [0.25, 0.25]})
+        timer.add_page('slow.md', {'page': [2.0, 1.0], 'render': [1.0, 0.5]})
+        report = timer.report()
+
+        self.assertEqual([page['path'] for page in report['pages']], ['slow.md', 'fast.md'])
+        self.assertEqual(report['pages'][0]['wall'], 2.0)
+        self.assertEqual(report['pages'][0]['stages'], {'render': {'wall': 1.0, 'cpu': 0.5}})
+        self.assertEqual(report['stages']['page'], {'wall': 2.5, 'cpu': 1.25})
+        self.assertEqual(sorted(report['total']), ['cpu', 'wall'])
+
+    def test_summary(self):
+        timer = timing.BuildTimer()
+        for index in range(5):
+            timer.add_page('page{0}.md'.format(index), {'page': [index, index]})
+        lines = timer.summary(count=2)
+
+        self.assertTrue('Slowest 2 pages:' in lines)
+        self.assertTrue(lines[-2].endswith('page4.md'))
+        self.assertTrue(lines[-1].endswith('page3.md'))
+
+    def test_write(self):
+        site_dir = tempfile.mkdtemp()
+        try:
+            timer = timing.BuildTimer()
+            timer.add_page('index.md', {'page': [1.0, 1.0]})
+            path = os.path.join(site_dir, 'profile.json')
+            timer.write(path)
+
+            with io.open(path, encoding='utf-8') as f:
+                report = json.load(f)
+            self.assertEqual(report['pages'][0]['path'], 'index.md')
+        finally:
+            shutil.rmtree(site_dir)
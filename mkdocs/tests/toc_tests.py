@@ -4,7 +4,10 @@
 from __future__ import unicode_literals
 import unittest
 
+import markdown
+
 from mkdocs.tests.base import dedent, markdown_to_toc
+from mkdocs.toc import AnchorLink, TableOfContents, TableOfContentsExtension, anchor_map
 
 
 class TableOfContentsTests(unittest.TestCase):
@@ -132,3 +135,60 @@ class TableOfContentsTests(unittest.TestCase):
         """)
         toc = markdown_to_toc(md)
         self.assertEqual(str(toc).strip(), expected)
+
+    def test_anchors(self):
+        md = dedent("""
+        # Heading 1
+        ## Heading 2
+        ### Heading 3
+        # Heading 4
+        """)
+        toc = markdown_to_toc(md)
+        self.assertEqual(sorted(toc.anchors), ['heading-1', 'heading-2', 'heading-3', 'heading-4'])
+        self.assertEqual(toc.anchors['heading-3'].title, 'Heading 3')
+        self.assertTrue(toc.anchors is toc.anchors)
+
+    def test_extension_matches_html(self):
+        # Markdown 2.5 doesn't set the table of contents when the marker is used.
+        md = dedent("""
+        # A & B <em>raw</em> &copy; \\_x\\_
+        ### Skip `code` *em*
+        ## Two
+        #### Four
+        ## Two
+        # Back &amp; forth < > "q"
+        ## [Link](http://example.com)
+
+        Setext
+        ======
+        """)
+        configs = [{}, {'permalink': True}, {'anchorlink': True}]
+        if markdown.version_info >= (2, 6):
+            configs.append({'baselevel': 2})
+        for config in configs:
+            extension = TableOfContentsExtension()
+            converter = markdown.Markdown(extensions=['toc', 'attr_list', extension],
+                                          extension_configs={'toc': config})
+            converter.convert(md)
+            self.assertEqual(str(extension.table_of_contents()), str(TableOfContents(converter.toc)))
+            self.assertTrue(extension.items[0].active)
+
+    def test_extension_reset(self):
+        extension = TableOfContentsExtension()
+        converter = markdown.Markdown(extensions=['toc', extension])
+        converter.convert('# Heading')
+        self.assertEqual(len(extension.items), 1)
+        converter.reset()
+        converter.convert('')
+        self.assertEqual(extension.items, [])
+
+    def test_extension_without_toc(self):
+        extension = TableOfContentsExtension()
+        markdown.Markdown(extensions=[extension]).convert('# Heading')
+        self.assertEqual(extension.items, [])
+
+    def test_anchor_map_first_item(self):
+        first = AnchorLink('First', '#same')
+        first.children = [AnchorLink('Child', '#same')]
+        second = AnchorLink('Second', '#same')
+        self.assertTrue(anchor_map([first, second])['same'] is first)
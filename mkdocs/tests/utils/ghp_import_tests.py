@@ -106,6 +106,26 @@ class UtilsTests(unittest.TestCase):
         finally:
             shutil.rmtree(directory)
 
+    @mock.patch('mkdocs.utils.ghp_import.start_commit')
+    @mock.patch('mkdocs.utils.ghp_import.add_file')
+    @mock.patch('subprocess.Popen', auto_spec=True)
+    def test_run_import_exclude(self, mock_popen, mock_add_file, mock_start_commit):
+
+        directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(directory, 'sub'))
+        for path in ['file', 'state', os.path.join('sub', 'state')]:
+            open(os.path.join(directory, path), 'a').close()
+
+        try:
+            mock_popen.return_value.wait.return_value = 0
+            ghp_import.run_import(directory, 'fake-branch-name', 'test message',
+                                  False, exclude=['state'])
+
+            added = sorted(c[0][2] for c in mock_add_file.call_args_list)
+            self.assertEqual(added, ['file', 'sub/state'])
+        finally:
+            shutil.rmtree(directory)
+
     @mock.patch('mkdocs.utils.ghp_import.try_rebase', return_value=True)
     @mock.patch('mkdocs.utils.ghp_import.get_prev_commit', return_value='sha')
     @mock.patch('mkdocs.utils.ghp_import.get_config', return_value='config')
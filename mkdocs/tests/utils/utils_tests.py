@@ -5,6 +5,8 @@ from __future__ import unicode_literals
 
 import mock
 import os
+import shutil
+import tempfile
 import unittest
 
 from mkdocs import nav, utils, exceptions
@@ -248,3 +250,58 @@ class UtilsTests(unittest.TestCase):
         config = utils.yaml_load(yaml_src)
         self.assertTrue(isinstance(config['key'], utils.text_type))
         self.assertTrue(isinstance(config['key2'][0], utils.text_type))
+
+    def test_write_file_skip_unchanged(self):
+        site_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(site_dir, 'sub', 'index.html')
+            self.assertTrue(utils.write_file(b'content', path, skip_unchanged=True))
+            os.utime(path, (0, 0))
+
+            self.assertFalse(utils.write_file(b'content', path, skip_unchanged=True))
+            self.assertEqual(os.path.getmtime(path), 0)
+
+            self.assertTrue(utils.write_file(b'changed', path, skip_unchanged=True))
+            self.assertTrue(utils.write_file(b'changed', path))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'changed')
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_copy_file_skip_unchanged(self):
+        site_dir = tempfile.mkdtemp()
+        try:
+            source_path = os.path.join(site_dir, 'source.css')
+            output_path = os.path.join(site_dir, 'css', 'output.css')
+            with open(source_path, 'wb') as f:
+                f.write(b'a {}')
+            self.assertTrue(utils.copy_file(source_path, output_path, skip_unchanged=True))
+            self.assertAlmostEqual(os.path.getmtime(output_path), os.path.getmtime(source_path), places=3)
+            os.utime(output_path, (0, 0))
+
+            self.assertFalse(utils.copy_file(source_path, output_path, skip_unchanged=True))
+            self.assertEqual(os.path.getmtime(output_path), 0)
+
+            with open(source_path, 'wb') as f:
+                f.write(b'b {}')
+            self.assertTrue(utils.copy_file(source_path, output_path, skip_unchanged=True))
+            with open(output_path, 'rb') as f:
+                self.assertEqual(f.read(), b'b {}')
+        finally:
+            shutil.rmtree(site_dir)
+
+    def test_remove_stale_files(self):
+        site_dir = tempfile.mkdtemp()
+        try:
+            for path in ['index.html', 'stale.html', '.hidden', 'css/base.css',
+                         'old/index.html', 'old/.hidden']:
+                path = os.path.join(site_dir, path)
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                open(path, 'w').close()
+
+            keep = [os.path.join(site_dir, 'index.html'), os.path.join(site_dir, 'css', 'base.css')]
+            self.assertEqual(utils.remove_stale_files(site_dir, keep), 3)
+            self.assertEqual(sorted(os.listdir(site_dir)), ['.hidden', 'css', 'index.html'])
+        finally:
+            shutil.rmtree(site_dir)
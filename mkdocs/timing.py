@@ -0,0 +1,129 @@
+# coding: utf-8
+
+"""
+Deals with timing the stages of a build, see the `--profile` option.
+
+The wall and CPU time is recorded for each stage of the build and for each
+page. Stages may be nested, for example the `markdown` stage of a page is also
+part of the `page` stage. When pages are built by several worker processes,
+the times of the page stages are the sum over all the workers.
+"""
+
+from __future__ import unicode_literals
+
+import contextlib
+import json
+import logging
+import time
+import timeit
+
+from mkdocs import utils
+
+log = logging.getLogger(__name__)
+
+try:
+    _cpu_time = time.process_time
+except AttributeError:  # pragma: no cover
+    # Python 2, where time.clock returns the CPU time on Unix.
+    _cpu_time = time.clock
+
+
+@contextlib.contextmanager
+def timed(timings, stage):
+    """
+    Add the wall and CPU time spent in the block to `timings[stage]`, a list
+    of the two totals in seconds. Nothing is recorded if `timings` is None.
+    """
+    if timings is None:
+        yield
+        return
+
+    wall, cpu = timeit.default_timer(), _cpu_time()
+    try:
+        yield
+    finally:
+        total = timings.setdefault(stage, [0.0, 0.0])
+        total[0] += timeit.default_timer() - wall
+        total[1] += _cpu_time() - cpu
+
+
+def _times(total):
+    return {'wall': round(total[0], 6), 'cpu': round(total[1], 6)}
+
+
+class BuildTimer(object):
+    """
+    The timings of the stages of a build and of each page.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.pages = {}
+        self._start = (timeit.default_timer(), _cpu_time())
+        self._total = None
+
+    def add_page(self, input_path, timings):
+        """
+        Add the timings of the stages of a single page.
+        """
+        self.pages[input_path] = timings
+        for stage, (wall, cpu) in timings.items():
+            total = self.stages.setdefault(stage, [0.0, 0.0])
+            total[0] += wall
+            total[1] += cpu
+
+    def stop(self):
+        self._total = [timeit.default_timer() - self._start[0],
+                       _cpu_time() - self._start[1]]
+
+    def report(self):
+        if self._total is None:
+            self.stop()
+        pages = sorted(self.pages.items(),
+                       key=lambda item: item[1].get('page', [0.0])[0],
+                       reverse=True)
+        return {
+            'total': _times(self._total),
+            'stages': dict((stage, _times(total)) for stage, total in self.stages.items()),
+            'pages': [
+                dict(_times(timings.get('page', [0.0, 0.0])), path=path, stages=dict(
+                    (stage, _times(total)) for stage, total in timings.items()
+                    if stage != 'page'))
+                for path, timings in pages
+            ],
+        }
+
+    def write(self, output_path):
+        """
+        Write the report as JSON to `output_path` and log a summary of it.
+        """
+        output = json.dumps(self.report(), indent=4, sort_keys=True)
+        utils.write_file(output.encode('utf-8'), output_path)
+        for line in self.summary():
+            log.info(line)
+        log.info("Wrote the build profile to %s", output_path)
+
+    def summary(self, count=20):
+        """
+        Return a table of the times of the stages and the slowest pages, as a
+        list of lines.
+        """
+        report = self.report()
+        lines = ['{0:<30} {1:>10} {2:>10}'.format('Stage', 'Wall (s)', 'CPU (s)')]
+        for stage, times in sorted(report['stages'].items(), key=lambda item: -item[1]['wall']):
+            lines.append('{0:<30} {1:>10.3f} {2:>10.3f}'.format(stage, times['wall'], times['cpu']))
+        lines.append('{0:<30} {1:>10.3f} {2:>10.3f}'.format(
+            'total', report['total']['wall'], report['total']['cpu']))
+
+        lines.append('')
+        lines.append('Slowest {0} pages:'.format(min(count, len(report['pages']))))
+        lines.append('{0:>10} {1:>10} {2:>10} {3:>10}  {4}'.format(
+            'Wall (s)', 'CPU (s)', 'Markdown', 'Render', 'Page'))
+        for page in report['pages'][:count]:
+            stages = page['stages']
+            lines.append('{0:>10.3f} {1:>10.3f} {2:>10.3f} {3:>10.3f}  {4}'.format(
+                page['wall'], page['cpu'],
+                stages.get('markdown', {}).get('wall', 0.0),
+                stages.get('render', {}).get('wall', 0.0),
+                page['path']))
+        return lines
@@ -3,19 +3,29 @@
 """
 Deals with generating the per-page table of contents.
 
-For the sake of simplicity we use an existing markdown extension to generate
-an HTML table of contents, and then parse that into the underlying data.
+The Markdown `toc` extension assigns an ID to each heading and builds the
+table of contents as HTML. Rather than parsing that HTML again, the
+`TableOfContentsExtension` collects the same items from the headings in the
+element tree, right after the `toc` extension has run.
 
-The steps we take to generate a table of contents are:
-
-* Pre-process the markdown, injecting a [TOC] marker.
-* Generate HTML from markdown.
-* Post-process the HTML, spliting the content and the table of contents.
-* Parse table of contents HTML into the underlying data structure.
+A table of contents can still be parsed from the HTML the `toc` extension
+generated, see `TableOfContents`.
 """
 
 from __future__ import unicode_literals
 
+import re
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import etree
+
+try:                                                                # pragma: no cover
+    from markdown.extensions.toc import nest_toc_tokens             # noqa
+except ImportError:                                                 # pragma: no cover
+    # TODO: Remove when requiring Markdown 2.6, which renamed it.
+    from markdown.extensions.toc import order_toc_list as nest_toc_tokens  # noqa
+
 try:                                    # pragma: no cover
     from html.parser import HTMLParser  # noqa
 except ImportError:                     # pragma: no cover
@@ -25,13 +35,29 @@ except ImportError:                     # pragma: no cover
 class TableOfContents(object):
     """
     Represents the table of contents for a given page.
+
+    The table of contents is either parsed from the HTML generated by the
+    Markdown `toc` extension or given as a list of `AnchorLink` instances.
     """
-    def __init__(self, html):
-        self.items = _parse_html_table_of_contents(html)
+    def __init__(self, html, items=None):
+        if items is None:
+            items = _parse_html_table_of_contents(html)
+        self.items = items
+        self._anchors = None
 
     def __iter__(self):
         return iter(self.items)
 
+    @property
+    def anchors(self):
+        """
+        A dictionary of the `AnchorLink` instances by the HTML ID they link to,
+        see `anchor_map`. It is built the first time it is used.
+        """
+        if self._anchors is None:
+            self._anchors = anchor_map(self.items)
+        return self._anchors
+
     def __str__(self):
         return ''.join([str(item) for item in self])
 
@@ -40,9 +66,12 @@ class AnchorLink(object):
     """
     A single entry in the table of contents.
     """
+    __slots__ = ('title', 'url', 'children', 'active')
+
     def __init__(self, title, url):
         self.title, self.url = title, url
         self.children = []
+        self.active = False
 
     def __str__(self):
         return self.indent_print()
@@ -55,6 +84,21 @@ class AnchorLink(object):
         return ret
 
 
+def anchor_map(items):
+    """
+    Return a dictionary of the given `AnchorLink` instances and all of their
+    children by the HTML ID they link to. If several items link to the same
+    ID, the first one in the table of contents is used.
+    """
+    anchors = {}
+    pending = list(reversed(items))
+    while pending:
+        item = pending.pop()
+        anchors.setdefault(item.url[1:], item)
+        pending.extend(reversed(item.children))
+    return anchors
+
+
 class TOCParser(HTMLParser):
 
     def __init__(self):
@@ -95,6 +139,127 @@ class TOCParser(HTMLParser):
         self.handle_data("&%s;" % ref)
 
 
+# The headings the `toc` treeprocessor includes in the table of contents.
+_HEADER_RE = re.compile('[Hh][123456]')
+
+
+def _itertext(element):
+    """
+    Yield the text of an element and all of its children, in document order.
+    """
+    # TODO: Remove when dropping Python 2.6. Replace this with element.itertext()
+    if hasattr(element, 'itertext'):
+        for text in element.itertext():
+            yield text
+        return
+    if callable(element.tag):
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        for text in _itertext(child):
+            yield text
+        if child.tail:
+            yield child.tail
+
+
+class _AnchorLinkTreeprocessor(Treeprocessor):
+    """
+    Collects the table of contents from the headings, which the `toc`
+    treeprocessor has given their IDs and levels.
+    """
+
+    def __init__(self, md, extension):
+        Treeprocessor.__init__(self, md)
+        self.extension = extension
+
+    def _title(self, heading, toc_processor):
+        """
+        Return the title of a heading as it would be parsed from the HTML of
+        the table of contents, where it is escaped and the placeholders of
+        Python-Markdown are replaced.
+        """
+        # The permalink is added to the heading after its title is taken.
+        permalink = None
+        # Markdown 2.3 doesn't support permalinks.
+        use_permalinks = getattr(toc_processor, 'use_permalinks', False)
+        if use_permalinks and len(heading) and heading[-1].get('class') == 'headerlink':
+            permalink = heading[-1]
+        parts = [heading.text or '']
+        for child in heading:
+            if child is not permalink:
+                parts.extend(_itertext(child))
+            parts.append(child.tail or '')
+        link = etree.Element('a')
+        link.text = ''.join(parts).strip()
+
+        link = self.markdown.serializer(link)
+        for postprocessor in self.markdown.postprocessors.values():
+            link = postprocessor.run(link)
+        title = link[len('<a>'):-len('</a>')]
+        if '<' in title:
+            # Raw HTML in the heading, of which only the text is kept.
+            parser = TOCParser()
+            parser.feed('<a>' + title + '</a>')
+            title = parser.title
+        return title
+
+    def run(self, root):
+        toc_processor = self.markdown.treeprocessors['toc']
+        tokens = []
+        # TODO: Remove when dropping Python 2.6. Replace this with root.iter()
+        iterate = root.iter if hasattr(root, 'iter') else root.getiterator
+        for element in iterate():
+            # Comments don't have a tag name, but a factory function.
+            if (not callable(element.tag) and
+                    _HEADER_RE.match(element.tag) and 'id' in element.attrib):
+                title = self._title(element, toc_processor)
+                if title:
+                    tokens.append({
+                        'level': int(element.tag[-1]),
+                        'id': element.get('id'),
+                        'name': title,
+                    })
+        self.extension.items = _anchor_links(nest_toc_tokens(tokens))
+        if self.extension.items:
+            # For the table of contents, always mark the first element as
+            # active.
+            self.extension.items[0].active = True
+
+
+def _anchor_links(tokens):
+    items = []
+    for token in tokens:
+        item = AnchorLink(token['name'], '#' + token['id'])
+        item.children = _anchor_links(token['children'])
+        items.append(item)
+    return items
+
+
+class TableOfContentsExtension(Extension):
+    """
+    A Markdown extension which collects the table of contents of each page
+    from its element tree, as `items`, a list of `AnchorLink` instances. It
+    must be added after the `toc` extension, without which the table of
+    contents is always empty.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TableOfContentsExtension, self).__init__(*args, **kwargs)
+        self.items = []
+
+    def extendMarkdown(self, md, md_globals):
+        md.registerExtension(self)
+        if 'toc' in md.treeprocessors:
+            md.treeprocessors.add('mkdocs_toc', _AnchorLinkTreeprocessor(md, self), '>toc')
+
+    def reset(self):
+        self.items = []
+
+    def table_of_contents(self):
+        return TableOfContents('', items=self.items)
+
+
 def _parse_html_table_of_contents(html):
     """
     Given a table of contents string that has been automatically generated by
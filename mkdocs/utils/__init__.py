@@ -9,6 +9,7 @@ and structure of the site and pages in the site.
 
 from __future__ import unicode_literals
 
+import filecmp
 import logging
 import markdown
 import os
@@ -42,6 +43,10 @@ else:                           # pragma: no cover
 
 log = logging.getLogger(__name__)
 
+# Matches the path of an index.md file which is in a directory, using either
+# path separator.
+_SUB_INDEX_RE = re.compile(r'.*(?:\\|/)index.md$')
+
 
 def yaml_load(source, loader=yaml.Loader):
     """
@@ -100,25 +105,51 @@ def reduce_list(data_set):
             item not in seen and not seen.add(item)]
 
 
-def copy_file(source_path, output_path):
+def copy_file(source_path, output_path, skip_unchanged=False):
     """
     Copy source_path to output_path, making sure any parent directories exist.
-    """
+
+    With `skip_unchanged`, an existing output_path which is the same as the
+    source is left untouched. Files with the same size and modification time
+    are assumed to be the same, otherwise their content is compared. The
+    modification time is copied with the file, so the next build only needs
+    to compare them with `os.stat`. Return True if the file was copied.
+    """
+    if skip_unchanged and os.path.isfile(output_path):
+        source_stat = os.stat(source_path)
+        output_stat = os.stat(output_path)
+        # Python 2 only copies the modification time to the microsecond.
+        if (source_stat.st_size == output_stat.st_size and
+                abs(source_stat.st_mtime - output_stat.st_mtime) < 0.001):
+            return False
+        if filecmp.cmp(source_path, output_path, shallow=False):
+            return False
 
     output_dir = os.path.dirname(output_path)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    shutil.copy(source_path, output_path)
+    shutil.copy2(source_path, output_path)
+    return True
 
 
-def write_file(content, output_path):
+def write_file(content, output_path, skip_unchanged=False):
     """
     Write content to output_path, making sure any parent directories exist.
+
+    With `skip_unchanged`, an existing output_path with the same content is
+    left untouched. Return True if the file was written.
     """
+    if (skip_unchanged and os.path.isfile(output_path) and
+            os.path.getsize(output_path) == len(content)):
+        with open(output_path, 'rb') as f:
+            if f.read() == content:
+                return False
+
     output_dir = os.path.dirname(output_path)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     open(output_path, 'wb').write(content)
+    return True
 
 
 def clean_directory(directory):
@@ -142,16 +173,51 @@ def clean_directory(directory):
             os.unlink(path)
 
 
-def copy_media_files(from_dir, to_dir, exclude=None, dirty=False):
+def remove_stale_files(directory, keep):
     """
-    Recursively copy all files except markdown and exclude[ed] files into another directory.
+    Remove all files from a directory recursively, except for the paths in
+    `keep`, and then any directories left empty. Like `clean_directory`,
+    hidden entries in the directory are left alone. Return the number of
+    files removed.
+    """
+    if not os.path.exists(directory):
+        return 0
+
+    keep = set(os.path.normpath(path) for path in keep)
+    removed = 0
+    for entry in os.listdir(directory):
+        if entry.startswith('.'):
+            continue
+
+        path = os.path.join(directory, entry)
+        if not os.path.isdir(path):
+            if os.path.normpath(path) not in keep:
+                os.unlink(path)
+                removed += 1
+            continue
+
+        for (dirpath, dirnames, filenames) in os.walk(path, topdown=False):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                if os.path.normpath(file_path) not in keep:
+                    os.unlink(file_path)
+                    removed += 1
+            if not os.listdir(dirpath):
+                os.rmdir(dirpath)
+    return removed
+
+
+def media_files(from_dir, exclude=None):
+    """
+    Recursively find all files except markdown and exclude[ed] files in a
+    directory. Return a list of (source_path, relative_path) tuples.
 
     `exclude` accepts a list of Unix shell-style wildcards (`['*.py', '*.pyc']`).
     Note that `exclude` only operates on file names, not directories.
     """
+    files = []
     for (source_dir, dirnames, filenames) in os.walk(from_dir, followlinks=True):
         relative_path = os.path.relpath(source_dir, from_dir)
-        output_dir = os.path.normpath(os.path.join(to_dir, relative_path))
 
         # Filter file names using Unix pattern matching
         # Always filter file names starting with a '.'
@@ -167,13 +233,26 @@ def copy_media_files(from_dir, to_dir, exclude=None, dirty=False):
         for filename in filenames:
             if not is_markdown_file(filename):
                 source_path = os.path.join(source_dir, filename)
-                output_path = os.path.join(output_dir, filename)
+                files.append((source_path, os.path.normpath(os.path.join(relative_path, filename))))
+    return files
+
 
-                # Do not copy when using --dirty if the file has not been modified
-                if dirty and (modified_time(source_path) < modified_time(output_path)):
-                    continue
+def copy_media_files(from_dir, to_dir, exclude=None, dirty=False):
+    """
+    Recursively copy all files except markdown and exclude[ed] files into another directory.
+
+    `exclude` accepts a list of Unix shell-style wildcards (`['*.py', '*.pyc']`).
+    Note that `exclude` only operates on file names, not directories.
+    """
+    for source_path, relative_path in media_files(from_dir, exclude):
+        output_path = os.path.join(to_dir, relative_path)
+
+        # Do not copy when using --dirty if the file has not been modified.
+        # Copies keep the modification time of the source, see `copy_file`.
+        if dirty and (modified_time(source_path) <= modified_time(output_path)):
+            continue
 
-                copy_file(source_path, output_path)
+        copy_file(source_path, output_path)
 
 
 def get_html_path(path):
@@ -334,7 +413,7 @@ def create_relative_media_url(nav, url):
     # correctly for images in the same directory as the markdown. I think this
     # is due to us moving it into a directory with index.html, but I'm not sure
     # win32 platform uses backslash "\". eg. "\level1\level2"
-    notindex = re.match(r'.*(?:\\|/)index.md$', nav.file_context.current_file) is None
+    notindex = _SUB_INDEX_RE.match(nav.file_context.current_file) is None
 
     if notindex and nav.url_context.base_path != '/' and relative_url.startswith("./"):
         relative_url = ".%s" % relative_url
@@ -361,19 +440,19 @@ def convert_markdown(markdown_source, extensions=None, extension_configs=None):
     `extensions` is an optional sequence of Python Markdown extensions to add
     to the default set.
     """
+    toc_extension = toc.TableOfContentsExtension()
     md = markdown.Markdown(
-        extensions=extensions or [],
+        extensions=list(extensions or []) + [toc_extension],
         extension_configs=extension_configs or {}
     )
     html_content = md.convert(markdown_source)
 
-    # On completely blank markdown files, no Meta or tox properties are added
-    # to the generated document.
+    # On completely blank markdown files, no Meta properties are added to the
+    # generated document.
     meta = getattr(md, 'Meta', {})
-    toc_html = getattr(md, 'toc', '')
 
-    # Post process the generated table of contents into a data structure
-    table_of_contents = toc.TableOfContents(toc_html)
+    # The table of contents is collected from the headings by the extension.
+    table_of_contents = toc_extension.table_of_contents()
 
     return (html_content, table_of_contents, meta)
 
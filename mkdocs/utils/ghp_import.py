@@ -137,7 +137,7 @@ def gitpath(fname):
     return "/".join(norm.split(os.path.sep))
 
 
-def run_import(srcdir, branch, message, nojekyll):
+def run_import(srcdir, branch, message, nojekyll, exclude=()):
     cmd = ['git', 'fast-import', '--date-format=raw', '--quiet']
     kwargs = {"stdin": sp.PIPE}
     if sys.version_info >= (3, 2, 0):
@@ -149,6 +149,8 @@ def run_import(srcdir, branch, message, nojekyll):
             fpath = os.path.join(path, fn)
             fpath = normalize_path(fpath)
             gpath = gitpath(os.path.relpath(fpath, start=srcdir))
+            if gpath.split('/', 1)[0] in exclude:
+                continue
             add_file(pipe, fpath, gpath)
     if nojekyll:
         add_nojekyll(pipe)
@@ -158,14 +160,19 @@ def run_import(srcdir, branch, message, nojekyll):
         sys.stdout.write(enc("Failed to process commit.\n"))
 
 
-def ghp_import(directory, message, remote='origin', branch='gh-pages', force=False):
+def ghp_import(directory, message, remote='origin', branch='gh-pages', force=False,
+               exclude=()):
+    """
+    Commit the directory to the branch and push it. The files and directories
+    at the top of the directory which are named in `exclude` are left out.
+    """
 
     if not try_rebase(remote, branch):
         log.error("Failed to rebase %s branch.", branch)
 
     nojekyll = True
 
-    run_import(directory, branch, message, nojekyll)
+    run_import(directory, branch, message, nojekyll, exclude)
 
     cmd = ['git', 'push', remote, branch]
 